@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Phagetrix performance benchmarks.
+
+Measures generator construction, codon queries, end-to-end optimisation,
+input parsing and output rendering, recording the best wall time and the
+peak traced memory of each case. Results can be saved as a JSON baseline
+and later runs compared against it.
+
+Run with: python benchmarks/run.py [--baseline benchmarks/baseline.json]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import python_codon_tables as pct
+
+from phagetrix import api
+from phagetrix.constants import VALID_AMINO_ACIDS, degenerate
+from phagetrix.core import DegenerateCodonGenerator
+from phagetrix.output import OutputFormatter
+from phagetrix.parser import InputParser
+
+SPECIES = ["e_coli_316407", "h_sapiens_9606", "s_cerevisiae_4932"]
+SEQUENCE_LENGTHS = [100, 1_000, 10_000]
+QUERY_COUNT = 10_000
+PARSE_LINES = 20_000
+RENDER_LENGTH = 300
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# Peak memory below this is too small to compare reliably
+MIN_COMPARED_BYTES = 64 * 1024
+
+# A case prepares its inputs once and returns the function to measure,
+# along with the number of operations one call performs. Anything to undo
+# afterwards (temporary directories, environment changes) goes on the stack.
+Case = Callable[[contextlib.ExitStack], tuple[Callable[[], object], int]]
+
+
+def _random_targets(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        "".join(rng.sample(VALID_AMINO_ACIDS, rng.randint(1, 6))) for _ in range(count)
+    ]
+
+
+def _random_design(length: int, seed: int = 0) -> tuple[str, dict[int, str]]:
+    rng = random.Random(seed)
+    sequence = "".join(rng.choice(VALID_AMINO_ACIDS) for _ in range(length))
+    variations = {
+        pos: sequence[pos - 1] + "".join(rng.sample(VALID_AMINO_ACIDS, 3))
+        for pos in range(1, length + 1, 10)
+    }
+    return sequence, variations
+
+
+@contextlib.contextmanager
+def _temporary_cache() -> Any:
+    """Point the persisted generator tables at a throw-away directory."""
+    previous = os.environ.get("PHAGETRIX_CACHE_DIR")
+    with tempfile.TemporaryDirectory(prefix="phagetrix-bench-") as cache_dir:
+        os.environ["PHAGETRIX_CACHE_DIR"] = cache_dir
+        try:
+            yield cache_dir
+        finally:
+            if previous is None:
+                del os.environ["PHAGETRIX_CACHE_DIR"]
+            else:
+                os.environ["PHAGETRIX_CACHE_DIR"] = previous
+
+
+def construct_case(company: str, species: str) -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        table = pct.get_codons_table(species)
+        return (
+            lambda: DegenerateCodonGenerator(dict(degenerate[company]), table),
+            1,
+        )
+
+    return setup
+
+
+def load_case(company: str) -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        table = pct.get_codons_table("e_coli_316407")
+        cache_dir = stack.enter_context(_temporary_cache())
+        # Persist the tables once; every measured call loads them
+        DegenerateCodonGenerator(dict(degenerate[company]), table, cache_dir=cache_dir)
+        return (
+            lambda: DegenerateCodonGenerator(
+                dict(degenerate[company]), table, cache_dir=cache_dir
+            ),
+            1,
+        )
+
+    return setup
+
+
+def query_case(company: str) -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        targets = _random_targets(QUERY_COUNT)
+        # No memo, so every query searches the mask index; only the queries
+        # are timed, not building the generator
+        generator = DegenerateCodonGenerator(
+            dict(degenerate[company]),
+            pct.get_codons_table("e_coli_316407"),
+            memo_size=0,
+        )
+        generator._ensure_index()
+
+        def run() -> None:
+            for target in targets:
+                generator.get_best_degenerate_codon(target)
+
+        return run, QUERY_COUNT
+
+    return setup
+
+
+def optimize_case(length: int) -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        stack.enter_context(_temporary_cache())
+        sequence, variations = _random_design(length)
+        api.get_generator()  # Measure optimisation, not the first build
+        return lambda: api.optimize_codons(sequence, variations), length
+
+    return setup
+
+
+def parse_case() -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        sequence, variations = _random_design(PARSE_LINES)
+        lines = [sequence] + [
+            f"{sequence[pos - 1]}{pos}{aas}" for pos, aas in variations.items()
+        ]
+        lines += ["# offset = 10"] * (PARSE_LINES - len(lines))
+        parser = InputParser(max_lines=None, max_sequence_length=None)
+        return lambda: parser.parse(lines), len(lines)
+
+    return setup
+
+
+def render_case() -> Case:
+    def setup(stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+        stack.enter_context(_temporary_cache())
+        sequence, variations = _random_design(RENDER_LENGTH)
+        generator = api.get_generator()
+        formatter = OutputFormatter()
+        config = {"offset": 0.0}
+
+        def run() -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                formatter.format_results(sequence, variations, config, generator)
+
+        return run, RENDER_LENGTH
+
+    return setup
+
+
+def all_cases() -> dict[str, Case]:
+    cases: dict[str, Case] = {}
+    for company in degenerate:
+        for species in SPECIES:
+            cases[f"construct/{company}/{species}"] = construct_case(company, species)
+        cases[f"load/{company}"] = load_case(company)
+        cases[f"query/{company}"] = query_case(company)
+    for length in SEQUENCE_LENGTHS:
+        cases[f"optimize/{length}"] = optimize_case(length)
+    cases[f"parse/{PARSE_LINES}"] = parse_case()
+    cases[f"render/{RENDER_LENGTH}"] = render_case()
+    return cases
+
+
+def measure(case: Case, repeat: int) -> dict[str, Any]:
+    """Best wall time over ``repeat`` runs, then peak memory of one run."""
+    with contextlib.ExitStack() as stack:
+        return _measure(*case(stack), repeat)
+
+
+def _measure(run: Callable[[], object], operations: int, repeat: int) -> dict[str, Any]:
+    run()  # Warm up caches and lazy imports
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    # Tracing slows everything down, so memory gets a run of its own
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    return {
+        "seconds": seconds,
+        "ops_per_second": operations / seconds,
+        "peak_bytes": peak,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Describe every case slower or larger than its baseline by ``threshold``."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["seconds"] > previous["seconds"] * (1 + threshold):
+            regressions.append(
+                f"{name}: time {previous['seconds']:.4g}s -> {current['seconds']:.4g}s"
+            )
+        peak, previous_peak = current["peak_bytes"], previous["peak_bytes"]
+        compared = max(peak, previous_peak) >= MIN_COMPARED_BYTES
+        if compared and peak > previous_peak * (1 + threshold):
+            regressions.append(f"{name}: memory {previous_peak:,} B -> {peak:,} B")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", default="", help="Only run cases containing this")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help=f"Baseline JSON to compare against (default: {DEFAULT_BASELINE.name})",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write this run's results to the baseline file",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slow-down that counts as a regression"
+        f" (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument("--output", type=Path, help="Also write results here")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, Any]] = {}
+    for name, case in all_cases().items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(case, args.repeat)
+        result = results[name]
+        rate = result["ops_per_second"]
+        print(
+            f"{name:40s} {result['seconds'] * 1000:10.2f} ms"
+            f" {rate:14,.0f} ops/s {result['peak_bytes'] / 1024:12,.0f} KiB"
+        )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    status = 0
+    if not args.save_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
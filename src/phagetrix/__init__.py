@@ -14,44 +14,139 @@ Quick Start:
 For more examples, see: https://github.com/retospect/phagetrix
 """
 
-from importlib.metadata import version
-
-# High-level API (recommended for most users)
-from .api import (
-    calculate_library_stats,
-    get_available_companies,
-    get_available_species,
-    get_available_species_with_aliases,
-    get_degenerate_codons,
-    optimize,  # Short alias
-    optimize_codons,
-    parse_file,  # Short alias
-    parse_phagetrix_file,
-)
-from .constants import SPECIES_ALIASES, VALID_AMINO_ACIDS, degenerate
-
-# Low-level API (for advanced users)
-from .core import DegenerateCodonGenerator
-from .output import OutputFormatter
-from .parser import InputParser
-
-__version__ = version("phagetrix")
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from . import metrics as metrics
+
+    # High-level API (recommended for most users)
+    from .api import (
+        GeneratorRegistry,
+        calculate_library_stats,
+        expected_coverage,
+        get_available_companies,
+        get_available_species,
+        get_available_species_with_aliases,
+        get_candidates,
+        get_degenerate_codons,
+        get_generator,
+        get_lookup_table,
+        optimize,  # Short alias
+        optimize_codons,
+        optimize_many,
+        parse_file,  # Short alias
+        parse_lines,
+        parse_phagetrix_file,
+        parse_stream,
+        register_vendor,
+    )
+    from .budget import optimize_for_budget
+    from .constants import SPECIES_ALIASES, VALID_AMINO_ACIDS, degenerate
+
+    # Low-level API (for advanced users)
+    from .core import DegenerateCodonGenerator
+    from .decode import decode_oligo, iter_decoded
+    from .lookup import CodonLookupTable
+    from .mixture import find_codon_mixture
+    from .ngs import count_variants
+    from .output import OutputFormatter
+    from .parser import InputParser, ParseError
+    from .sampling import sample_library
+
+# Submodules, their dependencies (python_codon_tables, quantiphy) and the
+# package version are only loaded when first used, which keeps
+# "import phagetrix" and the command line start-up fast.
+_LAZY_ATTRIBUTES = {
+    "calculate_library_stats": "api",
+    "expected_coverage": "api",
+    "GeneratorRegistry": "api",
+    "get_available_companies": "api",
+    "get_available_species": "api",
+    "get_available_species_with_aliases": "api",
+    "get_candidates": "api",
+    "get_degenerate_codons": "api",
+    "get_generator": "api",
+    "get_lookup_table": "api",
+    "optimize": "api",
+    "optimize_codons": "api",
+    "optimize_many": "api",
+    "parse_file": "api",
+    "parse_lines": "api",
+    "parse_phagetrix_file": "api",
+    "parse_stream": "api",
+    "register_vendor": "api",
+    "degenerate": "constants",
+    "SPECIES_ALIASES": "constants",
+    "VALID_AMINO_ACIDS": "constants",
+    "DegenerateCodonGenerator": "core",
+    "optimize_for_budget": "budget",
+    "decode_oligo": "decode",
+    "iter_decoded": "decode",
+    "CodonLookupTable": "lookup",
+    "find_codon_mixture": "mixture",
+    "count_variants": "ngs",
+    "OutputFormatter": "output",
+    "InputParser": "parser",
+    "ParseError": "parser",
+    "sample_library": "sampling",
+}
+# Submodules reachable as attributes without importing them first
+_LAZY_SUBMODULES = {"metrics"}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from importlib.metadata import version
+
+        value: Any = version("phagetrix")
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | _LAZY_SUBMODULES | {"__version__"})
+
 
 # Public API - what users see with "from phagetrix import *"
 __all__ = [
     "SPECIES_ALIASES",
     "VALID_AMINO_ACIDS",
+    "CodonLookupTable",
     "DegenerateCodonGenerator",
+    "GeneratorRegistry",
     "InputParser",
     "OutputFormatter",
+    "ParseError",
     "calculate_library_stats",
+    "count_variants",
+    "decode_oligo",
     "degenerate",
+    "expected_coverage",
+    "find_codon_mixture",
     "get_available_companies",
     "get_available_species",
     "get_available_species_with_aliases",
+    "get_candidates",
     "get_degenerate_codons",
+    "get_generator",
+    "get_lookup_table",
+    "iter_decoded",
     "optimize",
     "optimize_codons",
+    "optimize_for_budget",
+    "optimize_many",
     "parse_file",
+    "parse_lines",
     "parse_phagetrix_file",
+    "parse_stream",
+    "register_vendor",
+    "sample_library",
 ]
@@ -4,13 +4,31 @@ High-level API for Phagetrix - Easy-to-use interface for library users.
 This module provides simple, convenient functions for common use cases.
 """
 
-from typing import Any
-
-import python_codon_tables as pct
-
-from .constants import SPECIES_ALIASES, VALID_AMINO_ACIDS, degenerate
+import io
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping, Sequence
+from functools import partial
+from pathlib import Path
+from typing import IO, Any
+
+from . import metrics
+from .cache import default_cache_dir, persistence_enabled
+from .constants import SPECIES_ALIASES, VALID_AMINO_ACIDS, degenerate, trimer_blocks
 from .core import DegenerateCodonGenerator
-from .parser import InputParser
+from .diversity import (
+    COVERAGE_TARGETS,
+    library_coverage,
+    library_diversity,
+    position_distributions,
+)
+from .lookup import CodonLookupTable
+from .mixture import MAX_MIXTURE_CODONS, find_codon_mixture
+from .parser import DEFAULT_MAX_LINES, DEFAULT_MAX_SEQUENCE_LENGTH, InputParser
 
 
 def _resolve_species_alias(species: str) -> str:
@@ -18,12 +36,235 @@ def _resolve_species_alias(species: str) -> str:
     return SPECIES_ALIASES.get(species, species)
 
 
+class GeneratorRegistry:
+    """
+    Bounded, thread-safe cache of built codon generators.
+
+    Building a DegenerateCodonGenerator enumerates every degenerate codon,
+    which costs far more than the queries made against it. The registry
+    keeps the most recently used generators keyed by (company, species)
+    and hands out the shared instance; generators are read-only once built.
+    A missing generator is built by one thread without holding the
+    registry lock, so a slow build does not hold up other keys.
+    With ``persist``, built tables are also written to the user cache
+    directory, so later processes load them instead of enumerating the
+    codons again; by default that follows the ``PHAGETRIX_PERSIST``
+    environment variable. A cache directory that cannot be written is
+    skipped.
+    """
+
+    def __init__(self, maxsize: int = 8, persist: bool | None = None) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.persist = persist
+        self._generators: OrderedDict[tuple[str, str], DegenerateCodonGenerator] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Keys being built -> lock held by their builder
+        self._building: dict[tuple[str, str], threading.Lock] = {}
+        # Bumped by discard and clear, so builds started before are not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self, company: str = "IDT", species: str = "e_coli"
+    ) -> DegenerateCodonGenerator:
+        """
+        Return the generator for a company and species, building it if needed.
+
+        Args:
+            company: DNA synthesis company ("IDT", "Eurofins", or "NEB")
+            species: Species for codon usage (aliases are resolved)
+
+        Returns:
+            The shared DegenerateCodonGenerator
+        """
+        if company not in degenerate:
+            available = ", ".join(degenerate.keys())
+            raise ValueError(f"Unknown company '{company}'. Available: {available}")
+
+        key = (company, _resolve_species_alias(species))
+        with self._lock:
+            generator = self._hit(key)
+            if generator is not None:
+                return generator
+            # One builder per key; other keys stay available meanwhile
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Another thread may have built it while this one waited
+                generator = self._hit(key)
+                if generator is not None:
+                    return generator
+                self.misses += 1
+                generation = self._generation
+            try:
+                generator = self._build(company, species, key[1])
+            finally:
+                with self._lock:
+                    if self._building.get(key) is build_lock:
+                        del self._building[key]
+
+            with self._lock:
+                # A generator built before discard or clear may be stale;
+                # it still answers this call but is not cached
+                if generation == self._generation:
+                    self._generators[key] = generator
+                    if len(self._generators) > self.maxsize:
+                        self._generators.popitem(last=False)
+                        self.evictions += 1
+            return generator
+
+    def _hit(self, key: tuple[str, str]) -> DegenerateCodonGenerator | None:
+        """Cached generator for a key, counted as a hit; needs the lock."""
+        generator = self._generators.get(key)
+        if generator is not None:
+            self.hits += 1
+            self._generators.move_to_end(key)
+        return generator
+
+    def _build(
+        self, company: str, species: str, full_species: str
+    ) -> DegenerateCodonGenerator:
+        """Build a generator from the vendor and species tables."""
+        import python_codon_tables as pct
+
+        try:
+            with metrics.timer("codon_table"):
+                codon_frequency = pct.get_codons_table(full_species)
+        except Exception as e:
+            raise ValueError(f"Unknown species '{species}': {e}") from e
+        persist = persistence_enabled() if self.persist is None else self.persist
+        with metrics.timer("generator_build"):
+            return DegenerateCodonGenerator(
+                degenerate_bases=degenerate[company],
+                codon_frequency=codon_frequency,
+                cache_dir=default_cache_dir() if persist else None,
+                trimers=trimer_blocks.get(company),
+            )
+
+    def discard(self, company: str) -> None:
+        """Drop the cached generators of one company, for every species."""
+        with self._lock:
+            for key in [key for key in self._generators if key[0] == company]:
+                del self._generators[key]
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Drop all cached generators and reset the counters."""
+        with self._lock:
+            self._generators.clear()
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self) -> dict[str, int]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, evictions, size and maxsize
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._generators),
+                "maxsize": self.maxsize,
+            }
+
+    def memo_info(self) -> dict[str, int]:
+        """
+        Get the query memo statistics summed over the cached generators.
+
+        Returns:
+            Dictionary with hits, misses and size
+        """
+        with self._lock:
+            generators = list(self._generators.values())
+        totals = {"hits": 0, "misses": 0, "size": 0}
+        for generator in generators:
+            info = generator.memo_info()
+            for field in totals:
+                totals[field] += info[field]
+        return totals
+
+
+# Process-wide registry used by the high-level functions
+generator_registry = GeneratorRegistry()
+metrics.register_cache("generator_registry", generator_registry.info)
+metrics.register_cache("codon_memo", generator_registry.memo_info)
+
+
+def get_generator(
+    company: str = "IDT", species: str = "e_coli"
+) -> DegenerateCodonGenerator:
+    """
+    Get a shared, already-built codon generator.
+
+    Args:
+        company: DNA synthesis company ("IDT", "Eurofins", or "NEB")
+        species: Species for codon usage ("e_coli", "h_sapiens_9606", etc.)
+
+    Returns:
+        DegenerateCodonGenerator from the process-wide registry
+
+    Example:
+        >>> generator = get_generator("IDT", "e_coli")
+        >>> print(generator.get_best_degenerate_codon("HQ"))
+        'CAK'
+    """
+    return generator_registry.get(company, species)
+
+
+def get_candidates(
+    amino_acids: str,
+    k: int | None = 10,
+    objectives: Sequence[str] | None = None,
+    company: str = "IDT",
+    species: str = "e_coli",
+) -> list[dict[str, Any]]:
+    """
+    Get alternative degenerate codons for a set of amino acids.
+
+    Args:
+        amino_acids: Amino acids the codons must code for
+        k: Most candidates returned (None for all)
+        objectives: Return the Pareto front over these objectives instead
+            of the k best codons. Available: "amino_acids" (number coded,
+            including stop), "expanded_codon_count", "on_target" (fraction
+            of expanded codons coding requested amino acids),
+            "stop_fraction" and "usage" (host codon usage)
+        company: DNA synthesis company
+        species: Species for codon usage
+
+    Returns:
+        Candidates in ranking order, each a dictionary with "codon" and the
+        value of every objective; the first of the k best is the codon
+        ``optimize_codons`` picks
+
+    Example:
+        >>> [c["codon"] for c in get_candidates("HQ", k=3)]
+        ['CAK', 'CAS', 'CAW']
+        >>> front = get_candidates("AGVIL", objectives=["on_target", "usage"])
+    """
+    return get_generator(company, species).get_candidates(amino_acids, k, objectives)
+
+
 def optimize_codons(
     sequence: str,
     variations: dict[int, str],
     company: str = "IDT",
     species: str = "e_coli",
     offset: int = 0,
+    max_codons_per_position: int = 1,
 ) -> dict[str, Any]:
     """
     Optimize degenerate codons for a protein sequence.
@@ -38,14 +279,22 @@ def optimize_codons(
         company: DNA synthesis company ("IDT", "Eurofins", or "NEB")
         species: Species for codon usage ("e_coli", "h_sapiens_9606", etc.)
         offset: Position offset for numbering (default 0)
+        max_codons_per_position: Allow mixtures of up to this many degenerate
+                   codons (split-pool synthesis) at varied positions where a
+                   single codon is not fully on target (1 to 4, default 1)
 
     Returns:
         Dictionary containing:
         - "sequence": Original amino acid sequence
         - "degenerate_codons": List of optimized degenerate codons
         - "final_sequence": DNA sequence ready for synthesis
-        - "efficiency": List of on-target percentages for each position
+        - "efficiency": List of on-target percentages for each position, of
+          the mixture where one is used
         - "variations": Applied variations
+        - "mixtures": Position -> codon mixture (codons, ratios, on_target,
+          efficiency) for positions where a mixture beats the single codon;
+          "degenerate_codons" and "final_sequence" keep the single codon
+          there, for synthesis without split pools
 
     Example:
         >>> result = optimize_codons(
@@ -76,21 +325,22 @@ def optimize_codons(
             if aa not in VALID_AMINO_ACIDS:
                 raise ValueError(f"Invalid amino acid '{aa}' in variations")
 
-    # Resolve species alias and get codon frequency table
-    resolved_species = _resolve_species_alias(species)
-    try:
-        codon_frequency = pct.get_codons_table(resolved_species)
-    except Exception as e:
-        raise ValueError(f"Unknown species '{species}': {e}") from e
+    if not 1 <= max_codons_per_position <= MAX_MIXTURE_CODONS:
+        raise ValueError(
+            f"max_codons_per_position must be between 1 and {MAX_MIXTURE_CODONS}"
+        )
 
-    # Generate optimized codons
-    generator = DegenerateCodonGenerator(
-        degenerate_bases=degenerate[company], codon_frequency=codon_frequency
-    )
+    # Get the shared generator for this company and species
+    generator = get_generator(company, species)
 
     codons = []
     efficiency = []
+    mixtures: dict[int, dict[str, Any]] = {}
 
+    # Positions are timed one by one only while metrics are collected
+    timed = metrics.is_enabled()
+    longest = 0.0
+    started = previous = time.perf_counter()
     for i, aa in enumerate(sequence):
         pos = i + 1
         target_aas = variations.get(pos, aa)
@@ -107,18 +357,123 @@ def optimize_codons(
         total = sum(meta["aas"].values())
         efficiency.append(round(100 * on_target_total / total) if total > 0 else 0)
 
+        # Try a codon mixture where the single codon wastes material
+        if (
+            max_codons_per_position > 1
+            and pos in variations
+            and on_target_total < total
+        ):
+            mixture = find_codon_mixture(
+                generator, target_aas, max_codons=max_codons_per_position
+            )
+            if len(mixture["codons"]) > 1 and (
+                mixture["on_target"] > on_target_total / total
+            ):
+                mixtures[pos] = mixture
+                efficiency[-1] = mixture["efficiency"]
+        if timed:
+            now = time.perf_counter()
+            longest = max(longest, now - previous)
+            previous = now
+    metrics.record(
+        "codon_selection", time.perf_counter() - started, len(sequence), longest
+    )
+
     return {
         "sequence": sequence,
         "degenerate_codons": codons,
         "final_sequence": "".join(codons),
         "efficiency": efficiency,
         "variations": dict(variations),
+        "mixtures": mixtures,
         "company": company,
         "species": species,
         "offset": str(offset),
     }
 
 
+def optimize_many(
+    designs: Iterable[tuple[str, dict[int, str]]],
+    company: str = "IDT",
+    species: str = "e_coli",
+    workers: int | None = None,
+    chunksize: int | None = None,
+    max_codons_per_position: int = 1,
+) -> list[dict[str, Any]]:
+    """
+    Optimize degenerate codons for many designs, using several processes.
+
+    Every worker process builds the generator for the company and species
+    once and reuses it for all of its designs. Designs are sent to the
+    workers in chunks to keep inter-process overhead low.
+
+    Args:
+        designs: Iterable of (sequence, variations) pairs
+        company: DNA synthesis company ("IDT", "Eurofins", or "NEB")
+        species: Species for codon usage ("e_coli", "h_sapiens_9606", etc.)
+        workers: Number of worker processes (default: number of CPUs);
+                 1 runs everything in the calling process
+        chunksize: Designs per task sent to a worker (default: spread the
+                   designs over about four tasks per worker)
+        max_codons_per_position: Passed on to optimize_codons
+
+    Returns:
+        List of optimize_codons results, in the order of the designs
+
+    Example:
+        >>> results = optimize_many(
+        ...     [("ACDEF", {1: "AG"}), ("GHIKL", {2: "HK"})], workers=2
+        ... )
+        >>> print([r["final_sequence"] for r in results])
+    """
+    designs = list(designs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    # Validate company and species once, and warm the generator that forked
+    # workers inherit
+    get_generator(company, species)
+
+    optimize = partial(
+        _optimize_design,
+        company=company,
+        species=species,
+        max_codons_per_position=max_codons_per_position,
+    )
+    workers = min(workers, len(designs))
+    if workers <= 1:
+        return [optimize(design) for design in designs]
+
+    if chunksize is None:
+        chunksize = max(1, len(designs) // (workers * 4))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=get_generator, initargs=(company, species)
+    ) as executor:
+        return list(executor.map(optimize, designs, chunksize=chunksize))
+
+
+def _optimize_design(
+    design: tuple[str, dict[int, str]],
+    company: str,
+    species: str,
+    max_codons_per_position: int,
+) -> dict[str, Any]:
+    """Optimize one (sequence, variations) design; runs in worker processes."""
+    sequence, variations = design
+    return optimize_codons(
+        sequence,
+        variations,
+        company=company,
+        species=species,
+        max_codons_per_position=max_codons_per_position,
+    )
+
+
 def parse_phagetrix_file(
     file_path: str,
 ) -> tuple[str, dict[int, str], dict[str, float]]:
@@ -137,12 +492,70 @@ def parse_phagetrix_file(
         >>> print(f"Variations: {vars}")
     """
     with open(file_path) as f:
-        lines = f.readlines()
+        return parse_stream(f)
+
+
+def parse_lines(
+    lines: str | Iterable[str],
+    max_lines: int | None = DEFAULT_MAX_LINES,
+    max_sequence_length: int | None = DEFAULT_MAX_SEQUENCE_LENGTH,
+) -> tuple[str, dict[int, str], dict[str, float]]:
+    """
+    Parse Phagetrix input that is already in memory.
+
+    Args:
+        lines: The whole input as one string, or an iterable of lines
+        max_lines: Most input lines accepted (None for no limit)
+        max_sequence_length: Longest sequence accepted (None for no limit)
+
+    Returns:
+        Tuple of (sequence, variations, config)
 
-    parser = InputParser()
+    Raises:
+        ParseError: With every problem found in the input
+
+    Example:
+        >>> seq, vars, config = parse_lines("VLAYMVAQVQ\nA3AGVIL\n")
+    """
+    if isinstance(lines, str):
+        lines = io.StringIO(lines)
+    parser = InputParser(max_lines=max_lines, max_sequence_length=max_sequence_length)
     return parser.parse(lines)
 
 
+def parse_stream(
+    source: IO[str] | str | Path,
+    max_lines: int | None = DEFAULT_MAX_LINES,
+    max_sequence_length: int | None = DEFAULT_MAX_SEQUENCE_LENGTH,
+) -> tuple[str, dict[int, str], dict[str, float]]:
+    """
+    Parse Phagetrix input from an open file, a path or standard input.
+
+    The input is read line by line and never held in memory as a whole.
+
+    Args:
+        source: A text file object, a file path, or "-" for stdin
+        max_lines: Most input lines accepted (None for no limit)
+        max_sequence_length: Longest sequence accepted (None for no limit)
+
+    Returns:
+        Tuple of (sequence, variations, config)
+
+    Raises:
+        ParseError: With every problem found in the input
+
+    Example:
+        >>> seq, vars, config = parse_stream("-", max_lines=None)
+    """
+    limits = {"max_lines": max_lines, "max_sequence_length": max_sequence_length}
+    if source == "-":
+        return parse_lines(sys.stdin, **limits)
+    if isinstance(source, str | Path):
+        with open(source) as f:
+            return parse_lines(f, **limits)
+    return parse_lines(source, **limits)
+
+
 def get_available_companies() -> list[str]:
     """
     Get list of supported DNA synthesis companies.
@@ -170,6 +583,8 @@ def get_available_species() -> list[str]:
         >>> print(species[:3])
         ['e_coli_316407', 'h_sapiens_9606', 's_cerevisiae_4932']
     """
+    import python_codon_tables as pct
+
     return list(pct.available_codon_tables_names)
 
 
@@ -185,6 +600,8 @@ def get_available_species_with_aliases() -> list[str]:
         >>> print('e_coli' in species)  # True
         >>> print('e_coli_316407' in species)  # True
     """
+    import python_codon_tables as pct
+
     species_list = list(pct.available_codon_tables_names)
     aliases = list(SPECIES_ALIASES.keys())
     return sorted(set(species_list + aliases))
@@ -212,8 +629,144 @@ def get_degenerate_codons(company: str = "IDT") -> dict[str, str]:
     return degenerate[company].copy()
 
 
+def _check_block_name(block_name: str, bases: Iterable[str]) -> None:
+    """
+    Reject a trimer block name a final sequence could not be split by.
+
+    Every block is one letter distinct from the vendor's bases, so reading a
+    sequence letter by letter tells blocks and base codons apart.
+    """
+    if len(block_name) != 1:
+        raise ValueError(f"Trimer block '{block_name}' must be a single letter")
+    if block_name in bases:
+        raise ValueError(
+            f"Trimer block '{block_name}' has the name of a degenerate base"
+        )
+
+
+def register_vendor(
+    name: str,
+    degenerate_bases: Mapping[str, str] | None = None,
+    trimers: Mapping[str, Iterable[str] | Mapping[str, int]] | None = None,
+    replace: bool = False,
+) -> None:
+    """
+    Make a custom DNA synthesis vendor available as a company.
+
+    Besides single-base mixes, a vendor can offer codon-level building
+    blocks: trimer phosphoramidite mixes, custom codon sets and blends in
+    unequal amounts. A block lists its codons (equimolar), or maps each
+    codon to an integer weight giving its relative amount. Blocks are
+    candidates next to every combination of the degenerate bases, and are
+    chosen whenever they cover the requested amino acids with the fewest
+    extra amino acids and permutations.
+
+    Args:
+        name: Vendor name, used as ``company`` everywhere else
+        degenerate_bases: Single-letter symbol -> concrete bases it mixes
+            (default: none, so only A, C, G and T)
+        trimers: Block name -> codons, or block name -> codon -> weight; a
+            block name is a single character, from all of Unicode, that is
+            not one of the bases
+        replace: Allow replacing a vendor that is already available
+
+    Example:
+        >>> register_vendor(
+        ...     "TrimerCo",
+        ...     get_degenerate_codons("IDT"),
+        ...     trimers={"X": ["GCT", "GAT", "TTT"], "Z": {"GCT": 2, "GGT": 1}},
+        ... )
+        >>> optimize_codons("ACDEF", {1: "ADF"}, company="TrimerCo")[
+        ...     "degenerate_codons"
+        ... ][0]
+        'X'
+    """
+    if not name:
+        raise ValueError("Vendor name must not be empty")
+    if name in degenerate and not replace:
+        raise ValueError(f"Company '{name}' already exists; pass replace=True")
+
+    bases: dict[str, str] = {}
+    for symbol, concrete in (degenerate_bases or {}).items():
+        if len(symbol) != 1:
+            raise ValueError(f"Degenerate base '{symbol}' must be a single letter")
+        if not concrete or set(concrete) - set("ACGT"):
+            raise ValueError(
+                f"Degenerate base '{symbol}' must stand for some of A, C, G, T,"
+                f" got '{concrete}'"
+            )
+        if symbol in "ACGT" and concrete != symbol:
+            raise ValueError(f"Base '{symbol}' cannot stand for '{concrete}'")
+        bases[symbol] = "".join(dict.fromkeys(concrete))
+
+    symbols = set(bases) | set("ACGT")
+    blocks: dict[str, dict[str, int]] = {}
+    for block_name, codons in (trimers or {}).items():
+        _check_block_name(block_name, symbols)
+        weights = (
+            dict(codons) if isinstance(codons, Mapping) else dict.fromkeys(codons, 1)
+        )
+        if not weights:
+            raise ValueError(f"Trimer block '{block_name}' has no codons")
+        for codon, weight in weights.items():
+            if len(codon) != 3 or set(codon) - set("ACGT"):
+                raise ValueError(
+                    f"Trimer block '{block_name}' has an invalid codon '{codon}'"
+                )
+            if not isinstance(weight, int) or isinstance(weight, bool) or weight < 1:
+                raise ValueError(
+                    f"Weight of {codon} in trimer block '{block_name}' must be a"
+                    f" positive integer, got {weight!r}"
+                )
+        # Equal proportions describe the same blend however they are scaled
+        divisor = math.gcd(*weights.values())
+        blocks[block_name] = {
+            codon: weight // divisor for codon, weight in weights.items()
+        }
+
+    degenerate[name] = bases
+    if blocks:
+        trimer_blocks[name] = blocks
+    else:
+        trimer_blocks.pop(name, None)
+    generator_registry.discard(name)
+
+
+def get_lookup_table(
+    company: str = "IDT",
+    species: str = "e_coli",
+    cache_dir: str | Path | None = None,
+) -> CodonLookupTable:
+    """
+    Get the precomputed answer table for a company and species.
+
+    The first call solves every possible amino acid set and writes the
+    result to the cache directory; later calls, in any process, map the
+    existing file. The file name is derived from a hash of the degenerate
+    bases and the codon table, so changed inputs produce a new table.
+
+    Args:
+        company: DNA synthesis company
+        species: Species for codon usage
+        cache_dir: Directory for table files (default: user cache directory)
+
+    Returns:
+        A memory-mapped CodonLookupTable
+
+    Example:
+        >>> table = get_lookup_table("IDT", "e_coli")
+        >>> print(table.get_best_degenerate_codon("HQ"))
+        'CAK'
+    """
+    generator = get_generator(company, species)
+    return CodonLookupTable.for_generator(generator, cache_dir=cache_dir)
+
+
 def calculate_library_stats(
-    sequence: str, variations: dict[int, str], company: str = "IDT"
+    sequence: str,
+    variations: dict[int, str],
+    company: str = "IDT",
+    species: str = "e_coli",
 ) -> dict[str, Any]:
     """
     Calculate theoretical statistics for a degenerate library.
@@ -222,18 +775,24 @@ def calculate_library_stats(
         sequence: Amino acid sequence
         variations: Position variations
         company: DNA synthesis company
+        species: Species for codon usage ("e_coli", "h_sapiens_9606", etc.)
 
     Returns:
-        Dictionary with library statistics
+        Dictionary with library statistics. "diversity" counts DNA
+        combinations; "distinct_variants", "effective_diversity",
+        "entropy_bits" and the other entries of
+        ``diversity.library_diversity`` describe the protein variants.
 
     Example:
         >>> stats = calculate_library_stats("ACDEF", {1: "AG", 3: "DEF"})
         >>> print(f"Theoretical diversity: {stats['diversity']}")
+        >>> print(f"Protein variants: {stats['distinct_variants']}")
         >>> print(f"Material needed: {stats['material_amount']}")
     """
     # Get codon generator
-    generator = DegenerateCodonGenerator(degenerate_bases=degenerate[company])
+    generator = get_generator(company, species)
 
+    started = time.perf_counter()
     total_combinations = 1
     codons_used = []
 
@@ -249,23 +808,64 @@ def calculate_library_stats(
         combinations = sum(meta["aas"].values())
         total_combinations *= combinations
 
-    # Calculate material requirements (simplified)
+    diversity = library_diversity(position_distributions(generator, codons_used))
+    metrics.record("statistics", time.perf_counter() - started)
+
+    # Calculate material requirements (simplified). True division of Python
+    # ints is correctly rounded, so libraries with more combinations than a
+    # float can hold underflow to 0.0 instead of overflowing
     avogadro = 6.02214076e23
     one_particle_in_moles = 1.0 / avogadro
-    material_moles = (
-        one_particle_in_moles / total_combinations if total_combinations > 0 else 0
-    )
+    probability_single = 1 / total_combinations if total_combinations > 0 else 0
+    material_moles = one_particle_in_moles * probability_single
 
     return {
         "diversity": total_combinations,
-        "probability_single": 1.0 / total_combinations if total_combinations > 0 else 0,
+        "probability_single": probability_single,
         "material_moles": material_moles,
         "material_amount": f"{material_moles:.2e} M" if material_moles > 0 else "N/A",
         "codons_used": codons_used,
         "final_sequence": "".join(codons_used),
+        **diversity,
     }
 
 
+def expected_coverage(
+    result: dict[str, Any],
+    transformants: int,
+    targets: tuple[float, ...] = COVERAGE_TARGETS,
+) -> dict[str, Any]:
+    """
+    Expected protein-level coverage of a designed library.
+
+    Every variant's probability follows from the amino acid counts of its
+    codons (and mixture ratios), so rare variants are accounted for
+    instead of assuming all DNA combinations are equally likely.
+
+    Args:
+        result: An ``optimize_codons`` result
+        transformants: Number of transformants N
+        targets: Coverage fractions to report the required N for
+
+    Returns:
+        Dictionary with "expected_variants", "coverage" and
+        "transformants_needed" (target fraction -> N) among others; see
+        ``diversity.library_coverage``
+
+    Example:
+        >>> result = optimize_codons("ACDEF", {1: "AG", 3: "DEF"})
+        >>> coverage = expected_coverage(result, 100)
+        >>> print(f"{coverage['coverage']:.1%} of variants seen")
+        >>> print(f"95% needs {coverage['transformants_needed'][0.95]:,.0f}")
+    """
+    generator = get_generator(result["company"], result["species"])
+    with metrics.timer("statistics"):
+        distributions = position_distributions(
+            generator, result["degenerate_codons"], result.get("mixtures")
+        )
+        return library_coverage(distributions, transformants, targets)
+
+
 # Convenience aliases for common use cases
 optimize = optimize_codons  # Short alias
 parse_file = parse_phagetrix_file  # Short alias
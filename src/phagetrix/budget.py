@@ -0,0 +1,211 @@
+"""
+Fitting a design into a maximum library size.
+
+Transformation efficiency caps how many clones a library can have, so a
+design whose degenerate codons multiply to more combinations than that
+must give up some of its requested amino acids. Each varied position can
+keep any subset of its amino acids, which costs the expanded codon count
+of the codon chosen for that subset; the library size is the product over
+positions and the number of intended variants the product of kept amino
+acids. Choosing one option per position is a multiple-choice knapsack,
+solved exactly here by dynamic programming over the Pareto front of
+(library size, intended variants) pairs. Both are exact integers, and the
+front stays small because codon counts are products of few distinct
+factors.
+"""
+
+from typing import Any
+
+from . import api
+from .core import DegenerateCodonGenerator
+
+MEASURES = ("dna", "protein")
+
+# One way of handling a position: (cost, intended amino acids, amino acid
+# mask kept, codon)
+_Option = tuple[int, int, int, str]
+
+
+def position_options(
+    generator: DegenerateCodonGenerator, requested: str, measure: str = "dna"
+) -> list[_Option]:
+    """
+    Cheapest codon for every number of requested amino acids kept.
+
+    Only subsets some codon covers without further requested amino acids
+    are considered, and each is served by the codon ``optimize_codons``
+    would pick for it. Options that cost more without keeping more are
+    dropped.
+
+    Args:
+        generator: The codon generator to choose from
+        requested: Amino acids requested at the position
+        measure: "dna" to count expanded codons, "protein" to count amino
+            acids (including stop) a codon produces
+
+    Returns:
+        (cost, amino acids kept, mask kept, codon) tuples, cheapest first
+        and keeping strictly more amino acids each
+    """
+    target = generator.get_amino_acid_mask(requested)
+    generator._ensure_index()
+    reduced_sets = {mask & target for mask in generator.mask_index} - {0}
+
+    best: dict[int, tuple[int, Any, int, str]] = {}
+    for reduced in reduced_sets:
+        codon = generator._search(reduced, requested)
+        mask = generator.codon_masks[codon]
+        kept = mask & target
+        cost = (
+            generator.expanded_counts[codon] if measure == "dna" else mask.bit_count()
+        )
+        option = (cost, generator._rank_key(codon), kept, codon)
+        value = kept.bit_count()
+        if value not in best or option < best[value]:
+            best[value] = option
+
+    options: list[_Option] = []
+    for value in sorted(best, reverse=True):
+        cost, _, kept, codon = best[value]
+        if not options or cost < options[-1][0]:
+            options.append((cost, value, kept, codon))
+    options.reverse()
+    return options
+
+
+def optimize_for_budget(
+    sequence: str,
+    variations: dict[int, str],
+    max_library_size: int,
+    company: str = "IDT",
+    species: str = "e_coli",
+    offset: int = 0,
+    measure: str = "dna",
+) -> dict[str, Any]:
+    """
+    Keep as many requested variants as fit into a maximum library size.
+
+    Args:
+        sequence: Protein sequence (single letter amino acid codes)
+        variations: Position (1-based) -> requested amino acids
+        max_library_size: Largest library that can be made, for example
+            the number of transformants
+        company: DNA synthesis company
+        species: Species for codon usage
+        offset: Position numbering offset, as for ``optimize_codons``
+        measure: "dna" limits the number of DNA combinations, "protein"
+            the number of distinct protein variants
+
+    Returns:
+        The ``optimize_codons`` result for the reduced variations, plus
+        "budget", a dictionary containing:
+        - "max_library_size" and "measure": The limits solved for
+        - "library_size": Size of the chosen library
+        - "intended_variants": Combinations of kept amino acids
+        - "requested_variants": Combinations of all requested amino acids
+        - "coverage": intended_variants / requested_variants
+        - "dropped": Position -> requested amino acids left out
+        - "front": Every best trade-off within the limit, as dictionaries
+          of "library_size" and "intended_variants", smallest first
+
+    Example:
+        >>> result = optimize_for_budget(
+        ...     "ACDEFGHIK", {2: "ACDEFGHIKLMNPQRSTVWY", 5: "FWY"}, 100
+        ... )
+        >>> result["budget"]["library_size"] <= 100
+        True
+    """
+    if measure not in MEASURES:
+        raise ValueError(
+            f"Unknown measure '{measure}'. Available: {', '.join(MEASURES)}"
+        )
+    if max_library_size < 1:
+        raise ValueError(f"max_library_size must be at least 1, got {max_library_size}")
+
+    # Validates the design and sizes the unreduced library
+    api.optimize_codons(sequence, variations, company, species, offset)
+    generator = api.get_generator(company, species)
+
+    positions = sorted(variations)
+    options_by_target: dict[str, list[_Option]] = {}
+    position_choices = []
+    fixed_size = 1
+    for pos, aa in enumerate(sequence, start=1):
+        if pos in variations:
+            continue
+        codon = generator.get_best_degenerate_codon(aa)
+        fixed_size *= (
+            generator.expanded_counts[codon]
+            if measure == "dna"
+            else generator.codon_masks[codon].bit_count()
+        )
+    if fixed_size > max_library_size:
+        raise ValueError(
+            f"The constant positions alone make {fixed_size} combinations,"
+            f" more than {max_library_size}"
+        )
+    for pos in positions:
+        requested = variations[pos]
+        key = "".join(sorted(set(requested)))
+        if not key:
+            raise ValueError(f"Position {pos} requests no amino acids")
+        if key not in options_by_target:
+            options_by_target[key] = position_options(generator, requested, measure)
+        position_choices.append(options_by_target[key])
+
+    # Pareto front of (size, variants) after each position, with the
+    # previous front entry and option that produced each point
+    front: list[tuple[int, int, int, int]] = [(fixed_size, 1, -1, -1)]
+    history = []
+    for options in position_choices:
+        merged = []
+        for index, (size, variants, _, _) in enumerate(front):
+            for choice, (cost, value, _, _) in enumerate(options):
+                total = size * cost
+                if total > max_library_size:
+                    break  # Options only get more expensive
+                merged.append((total, -variants * value, index, choice))
+        merged.sort()
+        front = []
+        for total, negative, index, choice in merged:
+            if not front or -negative > front[-1][1]:
+                front.append((total, -negative, index, choice))
+        history.append(front)
+
+    # The last point keeps the most variants; walk back to its choices
+    kept: dict[int, str] = {}
+    dropped: dict[int, str] = {}
+    index = len(front) - 1
+    for pos, options, stage in zip(
+        reversed(positions), reversed(position_choices), reversed(history), strict=True
+    ):
+        _, _, index, choice = stage[index]
+        mask = options[choice][2]
+        requested = variations[pos]
+        kept[pos] = "".join(aa for aa in requested if generator.aa_bits[aa] & mask)
+        dropped[pos] = "".join(
+            aa for aa in requested if not generator.aa_bits[aa] & mask
+        )
+
+    library_size, intended = front[-1][0], front[-1][1]
+    requested_variants = 1
+    for pos in positions:
+        requested_variants *= len(set(variations[pos]))
+
+    result = api.optimize_codons(
+        sequence, dict(sorted(kept.items())), company, species, offset
+    )
+    result["budget"] = {
+        "max_library_size": max_library_size,
+        "measure": measure,
+        "library_size": library_size,
+        "intended_variants": intended,
+        "requested_variants": requested_variants,
+        "coverage": intended / requested_variants,
+        "dropped": {pos: aas for pos, aas in sorted(dropped.items()) if aas},
+        "front": [
+            {"library_size": size, "intended_variants": variants}
+            for size, variants, _, _ in front
+        ],
+    }
+    return result
@@ -0,0 +1,41 @@
+"""Location of the on-disk cache shared by phagetrix processes."""
+
+import os
+from pathlib import Path
+
+
+def default_cache_dir() -> Path:
+    """
+    Return the directory used for persisted phagetrix tables.
+
+    The ``PHAGETRIX_CACHE_DIR`` environment variable takes precedence,
+    followed by ``XDG_CACHE_HOME`` (``LOCALAPPDATA`` on Windows) and
+    finally ``~/.cache``.
+
+    Returns:
+        Path of the cache directory (not created by this function)
+    """
+    override = os.environ.get("PHAGETRIX_CACHE_DIR")
+    if override:
+        return Path(override)
+
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base and os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA")
+    if not base:
+        base = str(Path.home() / ".cache")
+    return Path(base) / "phagetrix"
+
+
+def persistence_enabled() -> bool:
+    """
+    Return whether built generator tables are persisted by default.
+
+    Persisting is opt-in: set the ``PHAGETRIX_PERSIST`` environment variable
+    to ``1`` (or ``true``, ``yes``) to write tables to the cache directory.
+
+    Returns:
+        True if the environment asks for persisted tables
+    """
+    value = os.environ.get("PHAGETRIX_PERSIST", "")
+    return value.strip().lower() in {"1", "true", "yes"}
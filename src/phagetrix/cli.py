@@ -1,13 +1,15 @@
 #! python3
 
 import argparse
+import json
+import sys
+from collections.abc import Iterable
+from typing import IO, Any
 
-from quantiphy import Quantity
-
-from . import api
+from . import api, metrics
 from .output import OutputFormatter
+from .parser import DEFAULT_MAX_LINES, DEFAULT_MAX_SEQUENCE_LENGTH
 
-Quantity.set_prefs(output_sf="QRYZEPTGMkmunpfazyrq")
 # From wikipedia
 avogadro = 6.02214076e23
 
@@ -31,49 +33,124 @@ COMMON SPECIES:
   e_coli (default), h_sapiens_9606, s_cerevisiae_4932
   Use --species to see all available options
 
+SERVICE MODE:
+  phagetrix serve [--host 127.0.0.1] [--port 8765] [--warm IDT:e_coli]
+  Answers JSON requests on /optimize, /stats, /parse, /batch and /health
+  with codon generators kept in memory between requests.
+
+DECODE MODE:
+  phagetrix decode [INPUT_FILE] [--positions] [--json]
+  Reads degenerate DNA oligos (FASTA, or one per line) and reports the
+  diversity and amino acid distribution each one encodes.
+
+COUNT MODE:
+  phagetrix count DESIGN_FILE READS.fastq [...] [--variants out.tsv]
+  Counts the protein variants in sequenced clones of a designed library and
+  compares stop codon, off-target and frameshift rates with the design.
+
+STREAM MODE:
+  phagetrix --stream [INPUT_FILE]   (reads stdin when no file is given)
+  Each input line is a JSON design record, for example
+    {"id": "cdr3", "sequence": "VLAYMVAQVQ", "variations": {"3": "AGVIL"}}
+  and each output line is the JSON optimization result for that record
+  (or {"id": ..., "error": ...} if the record is invalid).
+
 For more help: https://github.com/retospect/phagetrix
 Citation: https://doi.org/10.5281/zenodo.7676572
 """
 
 
 def process_request(
-    lines: list[str], company: str = "IDT", species: str = "e_coli"
+    lines: Iterable[str],
+    company: str = "IDT",
+    species: str = "e_coli",
+    max_lines: int | None = DEFAULT_MAX_LINES,
+    max_sequence_length: int | None = DEFAULT_MAX_SEQUENCE_LENGTH,
 ) -> None:
     """Process input lines and generate codon optimization results."""
-    # Parse input using API
-    import os
-    import tempfile
-
-    # Create temporary file for parsing
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".phagetrix") as f:
-        for line in lines:
-            if not line.endswith("\n"):
-                line += "\n"
-            f.write(line)
-        temp_path = f.name
-
-    try:
-        seq, variations, config = api.parse_phagetrix_file(temp_path)
-    finally:
-        os.unlink(temp_path)
+    seq, variations, config = api.parse_lines(
+        lines, max_lines=max_lines, max_sequence_length=max_sequence_length
+    )
 
-    # Format and display output using existing formatter
-    import python_codon_tables as pct
+    # Format and display output using the shared generator
+    generator = api.get_generator(company, species)
 
-    from .core import DegenerateCodonGenerator
+    from quantiphy import Quantity
 
-    # Create generator for formatter compatibility
-    codon_frequency = pct.get_codons_table(species)
-    generator = DegenerateCodonGenerator(
-        degenerate_bases=api.get_degenerate_codons(company),
-        codon_frequency=codon_frequency,
-    )
+    Quantity.set_prefs(output_sf="QRYZEPTGMkmunpfazyrq")
 
     formatter = OutputFormatter(avogadro)
     formatter.format_results(seq, variations, config, generator)
 
 
+def process_stream(
+    infile: IO[str],
+    outfile: IO[str],
+    company: str = "IDT",
+    species: str = "e_coli",
+) -> None:
+    """
+    Optimize newline-delimited JSON design records one line at a time.
+
+    Each record needs "sequence" and may carry "variations" (position ->
+    allowed amino acids), "offset" and "max_codons_per_position". An "id"
+    field is copied to the result. Results are written and flushed as soon
+    as each record is done, so memory use does not grow with the input.
+    """
+    # Build the generator once before the first record arrives
+    api.get_generator(company, species)
+
+    for line_number, line in enumerate(infile, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        record_id: Any = None
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("record must be a JSON object")
+            record_id = record.get("id")
+            result: dict[str, Any] = api.optimize_codons(
+                sequence=record["sequence"],
+                variations={
+                    int(pos): aas for pos, aas in record.get("variations", {}).items()
+                },
+                company=company,
+                species=species,
+                offset=int(record.get("offset", 0)),
+                max_codons_per_position=int(record.get("max_codons_per_position", 1)),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            result = {"error": f"line {line_number}: {message}"}
+
+        if record_id is not None:
+            result = {"id": record_id, **result}
+        outfile.write(json.dumps(result) + "\n")
+        outfile.flush()
+
+
 def main() -> None:
+    # "phagetrix serve ..." runs the HTTP/JSON service instead
+    if sys.argv[1:2] == ["serve"]:
+        from .server import main as serve
+
+        serve(sys.argv[2:])
+        return
+    # "phagetrix decode ..." translates existing degenerate oligos
+    if sys.argv[1:2] == ["decode"]:
+        from .decode import main as decode
+
+        decode(sys.argv[2:])
+        return
+    # "phagetrix count ..." tallies variants in sequenced clones
+    if sys.argv[1:2] == ["count"]:
+        from .ngs import main as count
+
+        count(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Phagetrix - Codon optimization for phage display libraries",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -85,9 +162,16 @@ def main() -> None:
     parser.add_argument(
         "input",
         type=argparse.FileType("r"),
+        nargs="?",
         metavar="INPUT_FILE",
         help="Input file containing sequence and variations",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read JSON design records line by line (from stdin if no input file)"
+        " and write one JSON result per line",
+    )
     parser.add_argument(
         "-c",
         "--company",
@@ -102,9 +186,42 @@ def main() -> None:
         default="e_coli",
     )
 
+    parser.add_argument(
+        "--max-lines",
+        type=int,
+        default=DEFAULT_MAX_LINES,
+        help="Most input lines accepted, 0 for no limit"
+        f" (default: {DEFAULT_MAX_LINES})",
+    )
+    parser.add_argument(
+        "--max-sequence-length",
+        type=int,
+        default=DEFAULT_MAX_SEQUENCE_LENGTH,
+        help="Longest sequence accepted, 0 for no limit"
+        f" (default: {DEFAULT_MAX_SEQUENCE_LENGTH})",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings and cache statistics on stderr",
+    )
+    parser.add_argument(
+        "--persist-tables",
+        action="store_true",
+        help="Write built codon tables to the cache directory for later runs",
+    )
+
     args = parser.parse_args()
+    if args.timings:
+        metrics.enable()
+    if args.persist_tables:
+        api.generator_registry.persist = True
 
     infile = args.input
+    if infile is None:
+        if not args.stream:
+            parser.error("the following arguments are required: INPUT_FILE")
+        infile = sys.stdin
 
     # Validate company parameter using API
     available_companies = api.get_available_companies()
@@ -124,8 +241,19 @@ def main() -> None:
             f"Unknown species '{args.species}'. Use --species to see available options."
         )
 
-    # Read in the input file
-    lines = infile.readlines()
-    infile.close()
-
-    process_request(lines, args.company, args.species)
+    try:
+        if args.stream:
+            process_stream(infile, sys.stdout, args.company, args.species)
+        else:
+            # Parse the input file as it is read
+            with infile:
+                process_request(
+                    infile,
+                    args.company,
+                    args.species,
+                    max_lines=args.max_lines or None,
+                    max_sequence_length=args.max_sequence_length or None,
+                )
+    finally:
+        if args.timings:
+            print(metrics.format_summary(), file=sys.stderr)
@@ -49,9 +49,17 @@ degenerate = {
     },
 }
 
+# Codon-level building blocks of registered vendors (see register_vendor):
+# vendor -> block name -> normal codon -> integer weight
+trimer_blocks: dict[str, dict[str, dict[str, int]]] = {}
+
 # Valid amino acids for validation
 VALID_AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
 
+# Amino acids plus the stop codon; the index of each symbol is its bit
+# position in the amino acid masks used by DegenerateCodonGenerator
+AMINO_ACIDS_WITH_STOP = VALID_AMINO_ACIDS + "*"
+
 # Species aliases for common names
 SPECIES_ALIASES = {
     "e_coli": "e_coli_316407",
@@ -1,36 +1,157 @@
 # Phagetrix library
 
-from collections import defaultdict
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
 from typing import Any
 
-import python_codon_tables as pct
-
-from .constants import degenerate
+from .constants import AMINO_ACIDS_WITH_STOP, VALID_AMINO_ACIDS, degenerate
 
 # TODO: look up UIPAC code for degenerate bases and add it here:
 
+# Bump whenever the ranking in get_best_degenerate_codon changes, so that
+# answers persisted by older versions are not reused
+RANKING_VERSION = 2
+
+# Codon usage frequencies are scaled to integer parts per million, so usage
+# scores add up exactly and rank identically in every backend
+USAGE_SCALE = 1_000_000
+
+# Amino acid -> codons, with usage frequencies as in python_codon_tables
+CodonTable = dict[str, dict[str, float]] | dict[str, list[str]]
+
+# Objectives get_candidates can trade off; the ones listed in
+# MAXIMISED_OBJECTIVES are better when larger, the others when smaller
+CANDIDATE_OBJECTIVES = (
+    "amino_acids",
+    "expanded_codon_count",
+    "on_target",
+    "stop_fraction",
+    "usage",
+)
+MAXIMISED_OBJECTIVES = frozenset({"on_target", "usage"})
+
 
 class DegenerateCodonGenerator:
     # Maintains a list of all the degenerate codons and their associated amino acids
     # Can find the best degenerate codon for a given list of aminoacids
+
+    # Per degenerate codon: amino acid mask, number of normal codons and
+    # summed host usage. Plain dictionaries, or views over persisted tables.
+    codon_masks: Mapping[str, int]
+    expanded_counts: Mapping[str, int]
+    usage_scores: Mapping[str, int]
+
     def __init__(
         self,
         degenerate_bases: dict[str, str] | None = None,
-        codon_frequency: dict[str, list[str]] | None = None,
+        codon_frequency: CodonTable | None = None,
+        memo_size: int = 1024,
+        backend: str = "python",
+        lazy: bool = False,
+        cache_dir: str | Path | None = None,
+        trimers: Mapping[str, Mapping[str, int]] | None = None,
     ) -> None:
+        if memo_size < 0:
+            raise ValueError(f"memo_size must not be negative, got {memo_size}")
+        if lazy and backend != "python":
+            raise ValueError(
+                "Lazy construction is only available with backend='python'"
+            )
+        if trimers and backend != "python":
+            raise ValueError("Trimer blocks are only available with backend='python'")
         if degenerate_bases is not None:
             self.degenerate_bases = degenerate_bases
         else:
             self.degenerate_bases = degenerate["IDT"]
+        self.codon_frequency: CodonTable
         if codon_frequency is not None:
             self.codon_frequency = codon_frequency
         else:
+            import python_codon_tables as pct
+
             self.codon_frequency = pct.get_codons_table("e_coli_316407")
 
         # Add ATGC to the degenerate dictionary
         for base in "ATGC":
             self.degenerate_bases[base] = base
 
+        # Codon-level building blocks (trimer phosphoramidite mixes, custom
+        # codon sets): block name -> normal codon -> integer weight. A block
+        # is one more candidate next to the base combinations; its weights
+        # count like the permutations of a degenerate codon.
+        self.trimers: dict[str, dict[str, int]] = {
+            name: dict(block) for name, block in (trimers or {}).items()
+        }
+
+        # Reverse map the aminoacids from the codon frequency table
+        self.codon_to_aa: dict[str, str] = {}
+
+        for aa, codons in self.codon_frequency.items():
+            for codon in codons:
+                self.codon_to_aa[codon] = aa
+
+        # Host usage of each normal codon relative to its synonyms; tables
+        # without frequencies count every codon as equally used
+        self.codon_usage: dict[str, int] = {}
+        for codons in self.codon_frequency.values():
+            for codon in codons:
+                frequency = codons[codon] if isinstance(codons, dict) else 1.0
+                self.codon_usage[codon] = round(frequency * USAGE_SCALE)
+
+        # Bit assigned to each amino acid in the amino acid masks
+        self.aa_bits: dict[str, int] = {
+            aa: 1 << i for i, aa in enumerate(AMINO_ACIDS_WITH_STOP)
+        }
+
+        # Best codon for each single amino acid, which is what every
+        # non-varied position asks for. Filled in with the mask index.
+        self.single_aa_codons: dict[str, str] = {}
+
+        self.backend = backend
+        self.lazy = lazy
+        self._index_lock = threading.Lock()
+        self._index_ready = False
+        # Per-mask candidate lists, built by the first get_candidates call
+        self._mask_candidates: dict[int, list[tuple[Any, ...]]] | None = None
+        # Codon profiles for mixtures, built by the first find_codon_mixture
+        self._mixture_index: Any = None
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Unknown backend '{backend}'. Available: python, numpy")
+        if lazy:
+            # Only the per-base expansion tables are built now; everything
+            # else is derived from them by the first query
+            self._build_lazy_tables()
+        elif backend == "python" and cache_dir is not None and not self.trimers:
+            # Tables persisted by an earlier process replace the enumeration;
+            # the file is named after the fingerprint, so changed inputs
+            # never match a stale file
+            from .tables import load_tables, save_tables
+
+            if not load_tables(self, cache_dir):
+                self._build_tables()
+                self._build_mask_index()
+                save_tables(self, cache_dir)
+        else:
+            if backend == "python":
+                self._build_tables()
+            else:
+                self._build_matrix_tables()
+            self._build_mask_index()
+
+        # Memo of answered queries keyed by amino acid mask, so "AGVIL",
+        # "LIVGA" and "AAGVIL" share one entry. Least recently used entries
+        # are evicted beyond memo_size; 0 disables the memo.
+        self.memo_size = memo_size
+        self._memo: OrderedDict[int, str] = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def _build_tables(self) -> None:
         # Create a dictionary of all the degenerate codons and
         # their associated amino acids
         # For each degenerate codon, we keep the following
@@ -39,41 +160,146 @@ class DegenerateCodonGenerator:
         #     many times it codes for each in a map
         #   - expanded_codon_count: The number of permutations
         #     of normal codons that it can make
-        self.degenerate_codons: dict[str, dict[str, Any]] = defaultdict(
+        self.degenerate_codons: Mapping[str, dict[str, Any]]
+        degenerate_codons: dict[str, dict[str, Any]] = defaultdict(
             lambda: {"aas": defaultdict(int), "expanded_codon_count": 0}
         )
 
-        # Reverse map the aminoacids from the codon frequency table
-        self.codon_to_aa: dict[str, str] = {}
-
-        for aa, codons in self.codon_frequency.items():
-            for codon in codons:
-                self.codon_to_aa[codon] = aa
-
         # Create a dictionary of all the amino acids and a list of all their
         # associated degenerate codons
         temp_amino_acid_dict: dict[str, list[str]] = defaultdict(list)
-        for base1 in self.degenerate_bases:
-            for base2 in self.degenerate_bases:
-                for base3 in self.degenerate_bases:
-                    degenerate_codon = base1 + base2 + base3
-                    for normalCodon in self.get_normal_codons(degenerate_codon):
-                        aa = self.codon_to_aa[normalCodon]
-                        self.degenerate_codons[degenerate_codon]["aas"][aa] += 1
-
-                        temp_amino_acid_dict[aa].append(degenerate_codon)
-                        self.degenerate_codons[degenerate_codon][
-                            "expanded_codon_count"
-                        ] += 1
+        usage_scores: dict[str, int] = defaultdict(int)
+        for degenerate_codon in self.candidate_codons():
+            for normalCodon in self.get_normal_codons(degenerate_codon):
+                aa = self.codon_to_aa[normalCodon]
+                degenerate_codons[degenerate_codon]["aas"][aa] += 1
+
+                temp_amino_acid_dict[aa].append(degenerate_codon)
+                degenerate_codons[degenerate_codon]["expanded_codon_count"] += 1
+                usage_scores[degenerate_codon] += self.codon_usage[normalCodon]
+
+        self.degenerate_codons = degenerate_codons
 
         # Convert the amioacid list codons to a set
-        self.amino_acid_dict: dict[str, set[str]] = {}
+        self.amino_acid_dict: Mapping[str, set[str]]
+        amino_acid_dict: dict[str, set[str]] = {}
         for aa in temp_amino_acid_dict:
-            self.amino_acid_dict[aa] = set(temp_amino_acid_dict[aa])
+            amino_acid_dict[aa] = set(temp_amino_acid_dict[aa])
+        self.amino_acid_dict = amino_acid_dict
+
+        # One amino acid mask per degenerate codon, with its expanded codon
+        # count and expected host usage (sum over its normal codons)
+        codon_masks: dict[str, int] = {}
+        expanded_counts: dict[str, int] = {}
+        for degenerate_codon, meta in degenerate_codons.items():
+            mask = 0
+            for aa in meta["aas"]:
+                mask |= self.aa_bits[aa]
+            codon_masks[degenerate_codon] = mask
+            expanded_counts[degenerate_codon] = meta["expanded_codon_count"]
+        self.codon_masks = codon_masks
+        self.expanded_counts = expanded_counts
+        self.usage_scores = dict(usage_scores)
+
+    def _build_matrix_tables(self) -> None:
+        # Same tables as _build_tables, derived from the NumPy count matrices;
+        # degenerate_codons entries are materialised on first access.
+        from .matrix import CodonMatrix, DegenerateCodonView
+
+        self.matrix = CodonMatrix(
+            self.degenerate_bases, self.codon_to_aa, self.codon_usage
+        )
+        self.degenerate_codons = DegenerateCodonView(self.matrix)
+        self.amino_acid_dict = self.matrix.amino_acid_codons()
+        self.codon_masks = dict(
+            zip(self.matrix.codons, self.matrix.masks.tolist(), strict=True)
+        )
+        self.expanded_counts = dict(
+            zip(self.matrix.codons, self.matrix.expanded_counts.tolist(), strict=True)
+        )
+        self.usage_scores = dict(
+            zip(self.matrix.codons, self.matrix.usage_scores.tolist(), strict=True)
+        )
+
+    def _build_lazy_tables(self) -> None:
+        # For every two-base prefix, the amino acid mask and usage produced
+        # with each concrete third base. The mask of any degenerate codon is
+        # the OR of its prefix masks over the bases of its third position,
+        # and its usage is the sum.
+        self._prefix_masks: dict[str, dict[str, int]] = {}
+        self._prefix_usage: dict[str, dict[str, int]] = {}
+        for base1, bases1 in self.degenerate_bases.items():
+            for base2, bases2 in self.degenerate_bases.items():
+                prefix_masks = dict.fromkeys("ATGC", 0)
+                prefix_usage = dict.fromkeys("ATGC", 0)
+                for b1 in bases1:
+                    for b2 in bases2:
+                        for b3 in "ATGC":
+                            aa = self.codon_to_aa[b1 + b2 + b3]
+                            prefix_masks[b3] |= self.aa_bits[aa]
+                            prefix_usage[b3] += self.codon_usage[b1 + b2 + b3]
+                self._prefix_masks[base1 + base2] = prefix_masks
+                self._prefix_usage[base1 + base2] = prefix_usage
+
+        self.degenerate_codons = _LazyDegenerateCodons(self)
+        self.amino_acid_dict = _LazyAminoAcidDict(self)
+
+    def _ensure_index(self) -> None:
+        # Build the mask index of a lazy generator on first use
+        if self._index_ready:
+            return
+        with self._index_lock:
+            if self._index_ready:
+                return
+            codon_masks: dict[str, int] = {}
+            expanded_counts: dict[str, int] = {}
+            usage_scores: dict[str, int] = {}
+            for prefix, prefix_masks in self._prefix_masks.items():
+                prefix_usage = self._prefix_usage[prefix]
+                count = len(self.degenerate_bases[prefix[0]]) * len(
+                    self.degenerate_bases[prefix[1]]
+                )
+                for base3, bases3 in self.degenerate_bases.items():
+                    mask = 0
+                    usage = 0
+                    for b3 in bases3:
+                        mask |= prefix_masks[b3]
+                        usage += prefix_usage[b3]
+                    codon_masks[prefix + base3] = mask
+                    expanded_counts[prefix + base3] = count * len(bases3)
+                    usage_scores[prefix + base3] = usage
+            for name, block in self.trimers.items():
+                mask = 0
+                for normal_codon in block:
+                    mask |= self.aa_bits[self.codon_to_aa[normal_codon]]
+                codon_masks[name] = mask
+                expanded_counts[name] = sum(block.values())
+                usage_scores[name] = sum(
+                    self.codon_usage[normal_codon] * weight
+                    for normal_codon, weight in block.items()
+                )
+            self.codon_masks = codon_masks
+            self.expanded_counts = expanded_counts
+            self.usage_scores = usage_scores
+            self._build_mask_index()
+
+    def candidate_codons(self) -> Iterator[str]:
+        # Every degenerate codon the search chooses from: all combinations
+        # of three degenerate bases, then the trimer blocks
+        bases = self.degenerate_bases
+        for b1 in bases:
+            for b2 in bases:
+                for b3 in bases:
+                    yield b1 + b2 + b3
+        yield from self.trimers
 
     def get_normal_codons(self, degenerate_codon: str) -> list[str]:
         # Returns a list of all the normal codons that can be made
-        # from a degenerate codon
+        # from a degenerate codon. A trimer block lists each of its codons
+        # as often as its weight.
+        block = self.trimers.get(degenerate_codon)
+        if block is not None:
+            return [codon for codon, weight in block.items() for _ in range(weight)]
         normal_codons = []
         for b1 in self.degenerate_bases[degenerate_codon[0]]:
             for b2 in self.degenerate_bases[degenerate_codon[1]]:
@@ -84,76 +310,350 @@ class DegenerateCodonGenerator:
                     normal_codons.append(b1 + b2 + b3)
         return normal_codons
 
+    def fingerprint(self) -> str:
+        # Content hash of everything the query results depend on: the
+        # degenerate bases, the codon table and the ranking rule
+        inputs: dict[str, Any] = {
+            "ranking_version": RANKING_VERSION,
+            "degenerate_bases": self.degenerate_bases,
+            "codon_frequency": self.codon_frequency,
+        }
+        # Only present when used, so plain alphabets keep their fingerprint
+        if self.trimers:
+            inputs["trimers"] = self.trimers
+        payload = json.dumps(inputs, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_amino_acid_mask(self, amino_acids: str) -> int:
+        # Returns the amino acid set as an integer with one bit per amino acid
+        # (see AMINO_ACIDS_WITH_STOP). Order and repeats do not matter.
+        mask = 0
+        for aa in amino_acids:
+            bit = self.aa_bits.get(aa)
+            if bit is None:
+                raise ValueError(f"Unknown amino acid '{aa}'")
+            mask |= bit
+        return mask
+
+    def _rank_key(self, degenerate_codon: str) -> tuple[int, int, int, str]:
+        # Lower is better: fewest amino acids, then fewest permutations,
+        # then highest host usage of the normal codons. The usage score is
+        # an integer sum, and the codon itself breaks remaining ties, so the
+        # ranking is identical in every process.
+        return (
+            self.codon_masks[degenerate_codon].bit_count(),
+            self.expanded_counts[degenerate_codon],
+            -self.usage_scores[degenerate_codon],
+            degenerate_codon,
+        )
+
+    def _build_mask_index(self) -> None:
+        # Superset index: many degenerate codons share the same amino acid set,
+        # so only the best ranked codon per distinct mask is kept.
+        best_keys: dict[int, tuple[int, int, int, str]] = {}
+        for degenerate_codon, mask in self.codon_masks.items():
+            key = self._rank_key(degenerate_codon)
+            if mask not in best_keys or key < best_keys[mask]:
+                best_keys[mask] = key
+        self.mask_index: dict[int, str] = {
+            mask: key[-1] for mask, key in best_keys.items()
+        }
+
+        # The masks in ranking order, so the first superset of a query wins
+        self._ranked_masks: list[tuple[int, str]] = [
+            (mask, key[-1])
+            for mask, key in sorted(best_keys.items(), key=lambda item: item[1])
+        ]
+        self._aa_postings = postings_for(self._ranked_masks)
+        self._index_ready = True
+
+        for aa in VALID_AMINO_ACIDS:
+            bit = self.aa_bits[aa]
+            if any(mask & bit for mask in self.mask_index):
+                self.single_aa_codons[aa] = self._search(bit, aa)
+
+    def _search(self, target: int, amino_acids: str) -> str:
+        # Intersect the postings of the requested amino acids; the lowest
+        # remaining rank contains all of them and is the best codon. Costs
+        # one big-integer AND per amino acid, however many candidates the
+        # alphabet has.
+        self._ensure_index()
+        candidates = -1
+        postings = self._aa_postings
+        remaining = target
+        while remaining and candidates:
+            low = remaining & -remaining
+            candidates &= postings[low.bit_length() - 1]
+            remaining ^= low
+        if candidates:
+            rank = (candidates & -candidates).bit_length() - 1
+            return self._ranked_masks[rank][1]
+
+        # there's an NNN combo that should always work
+        raise ValueError(
+            f"No degenerate codon found for amino acids: {amino_acids}. "
+            "This should not happen as NNN should always work."
+        )
+
     def get_best_degenerate_codon(self, amino_acids: str) -> str:
         # Returns the best degenerate codon for a given list of amino acids
         # The best degenerate codon is the one that codes for all the
         # amino acids in the list and the fewest other amino acids.
         # If there is a tie, the one with the fewest permutations is chosen.
         # If there is still a tie, the one with the highest frequency is chosen.
+        single = self.single_aa_codons.get(amino_acids)
+        if single is not None:
+            return single
 
-        # For each aminoacid in the list, get the set of degenerate codons that
-        # code for it and OR the sets together to find the set of degenerate
-        # codons that code for all the amino acids in the list.
-        degenerate_codons = set(self.degenerate_codons.keys())
-        for aa in amino_acids:
-            degenerate_codons = degenerate_codons & self.amino_acid_dict[aa]
+        target = self.get_amino_acid_mask(amino_acids)
+        if self.memo_size == 0:
+            return self._search(target, amino_acids)
 
-        # there's an NNN combo that should always work
-        if not degenerate_codons:
-            raise ValueError(
-                f"No degenerate codon found for amino acids: {amino_acids}. "
-                "This should not happen as NNN should always work."
-            )
+        with self._memo_lock:
+            degenerate_codon = self._memo.get(target)
+            if degenerate_codon is not None:
+                self.memo_hits += 1
+                self._memo.move_to_end(target)
+                return degenerate_codon
+            self.memo_misses += 1
 
-        # Find the best degenerate codon
-        best_degenerate_codon: str | None = None
-        best_degenerate_codon_aas: int | None = None
-        best_degenerate_codon_expanded_codon_count: int | None = None
-        best_degenerate_codon_frequency: float | None = None
-        for degenerate_codon in degenerate_codons:
-            # Get the number of amino acids that the degenerate codon codes for
-            aas = self.degenerate_codons[degenerate_codon]["aas"]
-            num_aas = len(aas)
-
-            # Get the number of permutations of normal codons
-            # that the degenerate codon makes
-            expanded_codon_count = self.degenerate_codons[degenerate_codon][
-                "expanded_codon_count"
-            ]
-
-            # Get the frequency of the degenerate codon
-            frequency = 1.0  # self.codon_frequency[degenerate_codon]
-
-            # If the degenerate codon is better than the current best, replace it
-            if (
-                best_degenerate_codon is None
-                or (
-                    best_degenerate_codon_aas is not None
-                    and num_aas < best_degenerate_codon_aas
-                )
-                or (
-                    best_degenerate_codon_aas is not None
-                    and best_degenerate_codon_expanded_codon_count is not None
-                    and num_aas == best_degenerate_codon_aas
-                    and expanded_codon_count
-                    < best_degenerate_codon_expanded_codon_count
+        degenerate_codon = self._search(target, amino_acids)
+
+        with self._memo_lock:
+            self._memo[target] = degenerate_codon
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return degenerate_codon
+
+    def _ensure_candidate_index(self) -> dict[int, list[tuple[Any, ...]]]:
+        # Every degenerate codon grouped by amino acid mask, each group in
+        # ranking order, with the counts the objectives are computed from:
+        # (rank key, codon, amino acid counts, stop count)
+        if self._mask_candidates is not None:
+            return self._mask_candidates
+        self._ensure_index()
+        with self._index_lock:
+            if self._mask_candidates is None:
+                groups: dict[int, list[tuple[Any, ...]]] = defaultdict(list)
+                for codon, mask in self.codon_masks.items():
+                    aas = self.degenerate_codons[codon]["aas"]
+                    groups[mask].append(
+                        (self._rank_key(codon), codon, aas, aas.get("*", 0))
+                    )
+                for group in groups.values():
+                    group.sort()
+                self._mask_candidates = dict(groups)
+        return self._mask_candidates
+
+    def get_candidates(
+        self,
+        amino_acids: str,
+        k: int | None = 10,
+        objectives: Sequence[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        # Alternatives to get_best_degenerate_codon for the same amino acids.
+        # Without objectives, the k best codons in ranking order (the first
+        # one is get_best_degenerate_codon's answer). With objectives, the
+        # codons no other codon beats on every one of them (the Pareto
+        # front), in ranking order and cut to k unless k is None. Each
+        # candidate is a dictionary with "codon" and every objective of
+        # CANDIDATE_OBJECTIVES.
+        if k is not None and k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        if objectives is not None:
+            unknown = [o for o in objectives if o not in CANDIDATE_OBJECTIVES]
+            if unknown or not objectives:
+                available = ", ".join(CANDIDATE_OBJECTIVES)
+                raise ValueError(
+                    f"Unknown objectives {unknown}. Available: {available}"
                 )
-                or (
-                    best_degenerate_codon_aas is not None
-                    and best_degenerate_codon_expanded_codon_count is not None
-                    and best_degenerate_codon_frequency is not None
-                    and num_aas == best_degenerate_codon_aas
-                    and expanded_codon_count
-                    == best_degenerate_codon_expanded_codon_count
-                    and frequency > best_degenerate_codon_frequency
+
+        target = self.get_amino_acid_mask(amino_acids)
+        groups = self._ensure_candidate_index()
+
+        # Supersets of the target, in ranking order of their best codon
+        candidates = -1
+        remaining = target
+        while remaining and candidates:
+            low = remaining & -remaining
+            candidates &= self._aa_postings[low.bit_length() - 1]
+            remaining ^= low
+        candidates &= (1 << len(self._ranked_masks)) - 1
+
+        selected: list[tuple[Any, ...]] = []
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            group = groups[self._ranked_masks[low.bit_length() - 1][0]]
+            if objectives is None:
+                # Every later group starts behind this one's best codon
+                if k is not None and len(selected) >= k and group[0] >= selected[-1]:
+                    break
+                selected.extend(group if k is None else group[:k])
+                selected.sort()
+                if k is not None:
+                    del selected[k:]
+            else:
+                selected.extend(group)
+        if objectives is not None:
+            selected.sort()
+
+        entries = [self._candidate_entry(c, amino_acids) for c in selected]
+        if objectives is not None:
+            entries = _pareto_front(entries, objectives)
+            if k is not None:
+                del entries[k:]
+        return entries
+
+    def _candidate_entry(
+        self, candidate: tuple[Any, ...], amino_acids: str
+    ) -> dict[str, Any]:
+        key, codon, aas, stops = candidate
+        bits, expanded, negative_usage, _ = key
+        on_target = sum(count for aa, count in aas.items() if aa in amino_acids)
+        return {
+            "codon": codon,
+            "amino_acids": bits,
+            "expanded_codon_count": expanded,
+            "on_target": on_target / expanded,
+            "stop_fraction": stops / expanded,
+            "usage": -negative_usage,
+        }
+
+    def memo_info(self) -> dict[str, int]:
+        # Statistics of the query memo
+        with self._memo_lock:
+            return {
+                "hits": self.memo_hits,
+                "misses": self.memo_misses,
+                "size": len(self._memo),
+                "maxsize": self.memo_size,
+            }
+
+    def clear_memo(self) -> None:
+        # Forget all memoised queries and reset the statistics
+        with self._memo_lock:
+            self._memo.clear()
+            self.memo_hits = 0
+            self.memo_misses = 0
+
+
+def _pareto_front(
+    entries: list[dict[str, Any]], objectives: Sequence[str]
+) -> list[dict[str, Any]]:
+    # Entries no other entry matches or beats on every objective, keeping
+    # the input order; of identical entries only the first is kept. For
+    # each objective, the entries at least as good as a given one form a
+    # prefix of the sorted order, kept as a bit set; an entry is on the
+    # front when the intersection over all objectives is only itself.
+    signs = [-1 if o in MAXIMISED_OBJECTIVES else 1 for o in objectives]
+    first: dict[tuple[Any, ...], int] = {}
+    for index, entry in enumerate(entries):
+        vector = tuple(
+            sign * entry[o] for sign, o in zip(signs, objectives, strict=True)
+        )
+        first.setdefault(vector, index)
+    vectors = list(first)
+
+    count = len(vectors)
+    better = [(1 << count) - 1] * count
+    for position in range(len(objectives)):
+        order = sorted(range(count), key=lambda i: vectors[i][position])
+        prefix = 0
+        start = 0
+        while start < count:
+            value = vectors[order[start]][position]
+            end = start
+            while end < count and vectors[order[end]][position] == value:
+                prefix |= 1 << order[end]
+                end += 1
+            for i in order[start:end]:
+                better[i] &= prefix
+            start = end
+
+    return [
+        entries[first[vectors[i]]]
+        for i in sorted(range(count), key=lambda i: first[vectors[i]])
+        if better[i] == 1 << i
+    ]
+
+
+def postings_for(ranked_masks: list[tuple[int, str]]) -> list[int]:
+    # Inverted index of ranked amino acid masks: for every amino acid bit,
+    # an integer with bit r set when the mask of rank r contains it
+    positions: list[list[int]] = [[] for _ in AMINO_ACIDS_WITH_STOP]
+    for rank, (mask, _) in enumerate(ranked_masks):
+        while mask:
+            low = mask & -mask
+            positions[low.bit_length() - 1].append(rank)
+            mask ^= low
+    return [sum(1 << rank for rank in ranks) for ranks in positions]
+
+
+class _LazyDegenerateCodons(Mapping[str, dict[str, Any]]):
+    # degenerate_codons of a lazy generator: entries are expanded on first
+    # access and kept afterwards
+
+    def __init__(self, generator: DegenerateCodonGenerator) -> None:
+        self._generator = generator
+        self._entries: dict[str, dict[str, Any]] = {}
+
+    def __getitem__(self, degenerate_codon: str) -> dict[str, Any]:
+        entry = self._entries.get(degenerate_codon)
+        if entry is None:
+            if degenerate_codon not in self._generator.trimers and (
+                len(degenerate_codon) != 3
+                or any(
+                    base not in self._generator.degenerate_bases
+                    for base in degenerate_codon
                 )
             ):
-                best_degenerate_codon = degenerate_codon
-                best_degenerate_codon_aas = num_aas
-                best_degenerate_codon_expanded_codon_count = expanded_codon_count
-                best_degenerate_codon_frequency = frequency
-
-        # Return the best degenerate codon
-        if best_degenerate_codon is None:
-            raise ValueError("No suitable degenerate codon found")
-        return best_degenerate_codon
+                raise KeyError(degenerate_codon)
+            aas: dict[str, int] = defaultdict(int)
+            normal_codons = self._generator.get_normal_codons(degenerate_codon)
+            for normal_codon in normal_codons:
+                aas[self._generator.codon_to_aa[normal_codon]] += 1
+            entry = {"aas": aas, "expanded_codon_count": len(normal_codons)}
+            self._entries[degenerate_codon] = entry
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return self._generator.candidate_codons()
+
+    def __len__(self) -> int:
+        generator = self._generator
+        return len(generator.degenerate_bases) ** 3 + len(generator.trimers)
+
+
+class _LazyAminoAcidDict(Mapping[str, set[str]]):
+    # amino_acid_dict of a lazy generator: each amino acid's codon set is
+    # collected from the mask index the first time it is asked for
+
+    def __init__(self, generator: DegenerateCodonGenerator) -> None:
+        self._generator = generator
+        self._entries: dict[str, set[str]] = {}
+
+    def __getitem__(self, aa: str) -> set[str]:
+        entry = self._entries.get(aa)
+        if entry is None:
+            bit = self._generator.aa_bits.get(aa, 0)
+            self._generator._ensure_index()
+            entry = {
+                codon
+                for codon, mask in self._generator.codon_masks.items()
+                if mask & bit
+            }
+            if not entry:
+                raise KeyError(aa)
+            self._entries[aa] = entry
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        self._generator._ensure_index()
+        present = 0
+        for mask in self._generator.mask_index:
+            present |= mask
+        return (aa for aa, bit in self._generator.aa_bits.items() if present & bit)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
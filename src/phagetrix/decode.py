@@ -0,0 +1,408 @@
+"""
+Reverse decoding of degenerate oligos into amino acid distributions.
+
+The forward path picks degenerate codons for amino acids; this module goes
+the other way, for vendor orders and published libraries written in IUPAC
+letters. Every degenerate base stands for a set of concrete bases, which is
+a 4-bit mask, so a degenerate codon is one of 16 ** 3 mask triples. One
+table of amino acid counts for all of them, derived from the generator's
+``degenerate_bases`` and ``codon_to_aa``, translates whole batches of oligos
+with a single NumPy lookup. NumPy is an optional dependency; install it with
+``pip install phagetrix[numpy]``.
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections.abc import Iterable, Iterator
+from typing import IO, Any
+
+from . import api
+from .constants import AMINO_ACIDS_WITH_STOP
+from .core import DegenerateCodonGenerator
+from .diversity import library_diversity, position_distributions
+from .matrix import CONCRETE_BASES, require_numpy
+
+DEFAULT_BATCH_SIZE = 1024
+
+_STOP = AMINO_ACIDS_WITH_STOP.index("*")
+# Mask code of "A", used to pad short oligos: one codon of one amino acid
+# changes no product, entropy or stop fraction
+_PAD = 1
+
+
+def decode_oligo(
+    dna: str, company: str = "IDT", species: str = "e_coli"
+) -> dict[str, Any]:
+    """
+    Decode one degenerate DNA sequence.
+
+    Args:
+        dna: Degenerate DNA in the company's IUPAC letters, in frame;
+            a trimer block letter stands for a whole codon
+        company: DNA synthesis company whose letters the sequence uses
+        species: Species whose genetic code translates the codons
+
+    Returns:
+        Dictionary containing:
+        - "codons": Degenerate codon of every position
+        - "amino_acids": Amino acid (or "*") -> number of expanded codons,
+          for every position
+        - "efficiency": Percentage of expanded codons coding an amino acid
+          rather than a stop, for every position
+        - "diversity": Number of DNA combinations
+        - The amino acid level statistics of ``calculate_library_stats``
+          ("distinct_variants", "stop_fraction", "entropy_bits", ...)
+
+    Example:
+        >>> decode_oligo("GCTNNKTGG")["amino_acids"][1]["*"]
+        1
+    """
+    generator = api.get_generator(company, species)
+    codons = _split_codons(dna, generator)
+
+    amino_acids = []
+    efficiency = []
+    diversity = 1
+    for codon in codons:
+        meta = generator.degenerate_codons[codon]
+        counts = dict(meta["aas"])
+        total = meta["expanded_codon_count"]
+        amino_acids.append(counts)
+        efficiency.append(round(100 * (total - counts.get("*", 0)) / total))
+        diversity *= total
+
+    return {
+        "codons": codons,
+        "amino_acids": amino_acids,
+        "efficiency": efficiency,
+        "diversity": diversity,
+        **library_diversity(position_distributions(generator, codons)),
+    }
+
+
+def _split_codons(dna: str, generator: DegenerateCodonGenerator) -> list[str]:
+    """Check a degenerate sequence and cut it into codons."""
+    letters = set(generator.degenerate_bases) | set(generator.trimers)
+    # Block letters are kept as registered, everything else is upper-cased
+    dna = "".join(
+        letter if letter in letters else letter.upper()
+        for letter in "".join(dna.split())
+    )
+    if not dna:
+        raise ValueError("Sequence is empty")
+    unknown = sorted(set(dna) - letters)
+    if unknown:
+        raise ValueError(f"Unknown degenerate bases: {''.join(unknown)}")
+    if not generator.trimers:
+        if len(dna) % 3:
+            raise ValueError(f"Sequence length {len(dna)} is not a multiple of 3")
+        return [dna[i : i + 3] for i in range(0, len(dna), 3)]
+
+    # A trimer block letter is a whole codon, named under the same rule as
+    # register_vendor uses
+    for block_name in generator.trimers:
+        api._check_block_name(block_name, generator.degenerate_bases)
+    codons = []
+    i = 0
+    while i < len(dna):
+        if dna[i] in generator.trimers:
+            codons.append(dna[i])
+            i += 1
+            continue
+        codon = dna[i : i + 3]
+        if len(codon) < 3 or any(letter in generator.trimers for letter in codon):
+            raise ValueError(f"Incomplete codon at base {i + 1}")
+        codons.append(codon)
+        i += 3
+    return codons
+
+
+def read_sequences(stream: IO[str]) -> Iterator[tuple[str, str]]:
+    """
+    Read oligos from FASTA, or from plain text with one oligo per line.
+
+    Blank lines and lines starting with "#" are skipped. Plain lines are
+    named by their line number.
+
+    Args:
+        stream: Text stream to read
+
+    Yields:
+        (name, sequence) tuples
+    """
+    name = None
+    parts: list[str] = []
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(">"):
+            if name is not None:
+                yield name, "".join(parts)
+            name = line[1:].strip()
+            parts = []
+        elif name is not None:
+            parts.append(line)
+        else:
+            yield f"line_{number}", line
+    if name is not None:
+        yield name, "".join(parts)
+
+
+class _DecodeTables:
+    """Amino acid counts of every degenerate codon, by base mask triple."""
+
+    def __init__(self, generator: DegenerateCodonGenerator) -> None:
+        numpy = require_numpy()
+
+        # Mask code of every letter; 0 marks letters the company lacks
+        self.codes = numpy.zeros(256, dtype=numpy.uint8)
+        for symbol, bases in generator.degenerate_bases.items():
+            mask = 0
+            for base in bases:
+                mask |= 1 << CONCRETE_BASES.index(base)
+            for letter in {symbol.upper(), symbol.lower()}:
+                self.codes[ord(letter)] = mask
+
+        # Which concrete bases each mask code stands for
+        members = numpy.array(
+            [[(code >> bit) & 1 for bit in range(4)] for code in range(16)],
+            dtype=numpy.int64,
+        )
+        # Amino acid of every concrete codon, one-hot
+        concrete = numpy.zeros((64, len(AMINO_ACIDS_WITH_STOP)), dtype=numpy.int64)
+        for index in range(64):
+            codon = "".join(CONCRETE_BASES[(index >> shift) & 3] for shift in (4, 2, 0))
+            aa = generator.codon_to_aa[codon]
+            concrete[index, AMINO_ACIDS_WITH_STOP.index(aa)] = 1
+        expansion = numpy.einsum("ai,bj,ck->abcijk", members, members, members).reshape(
+            4096, 64
+        )
+        self.counts = (expansion @ concrete).astype(numpy.uint8)
+        self.expanded = self.counts.sum(axis=1, dtype=numpy.int64)
+
+    def translate(self, sequences: list[str]) -> tuple[Any, Any]:
+        """
+        Codon rows of a batch, padded to the longest oligo.
+
+        Returns:
+            (rows of count table indices, per oligo error message or None)
+        """
+        numpy = require_numpy()
+        errors: list[str | None] = [None] * len(sequences)
+        length = max(len(s) for s in sequences) // 3 if sequences else 0
+        letters = numpy.full((len(sequences), 3 * length), ord("A"), numpy.uint8)
+        for row, sequence in enumerate(sequences):
+            if not sequence:
+                errors[row] = "Sequence is empty"
+            elif len(sequence) % 3:
+                errors[row] = f"Sequence length {len(sequence)} is not a multiple of 3"
+            else:
+                letters[row, : len(sequence)] = numpy.frombuffer(
+                    sequence.encode("ascii", "replace"), dtype=numpy.uint8
+                )
+
+        codes = self.codes[letters]
+        for row in numpy.flatnonzero((codes == 0).any(axis=1)):
+            unknown = sorted(
+                {c for c in sequences[row] if ord(c) > 255 or not self.codes[ord(c)]}
+            )
+            errors[row] = f"Unknown degenerate bases: {''.join(unknown)}"
+        # Failed oligos become a single neutral codon
+        for row, error in enumerate(errors):
+            if error is not None:
+                codes[row] = _PAD
+
+        triples = codes.reshape(len(sequences), length, 3).astype(numpy.intp)
+        rows = (triples[..., 0] * 16 + triples[..., 1]) * 16 + triples[..., 2]
+        return rows, errors
+
+
+def iter_decoded(
+    records: Iterable[tuple[str, str]],
+    company: str = "IDT",
+    species: str = "e_coli",
+    positions: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """
+    Decode many degenerate oligos, a batch at a time.
+
+    Args:
+        records: (name, degenerate DNA) tuples, for example from
+            ``read_sequences``
+        company: DNA synthesis company whose letters the oligos use
+        species: Species whose genetic code translates the codons
+        positions: Also report "amino_acids" and "efficiency" for every
+            position, as ``decode_oligo`` does
+        batch_size: Oligos translated together
+
+    Yields:
+        For every oligo, in input order, a dictionary with "id", "codons"
+        (number of positions), "diversity" (DNA combinations),
+        "distinct_variants", "stop_fraction", "entropy_bits" and
+        "effective_diversity"; or "id" and "error" for an oligo that
+        cannot be decoded
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    numpy = require_numpy()
+    generator = api.get_generator(company, species)
+    if generator.trimers:
+        raise ValueError(
+            f"{company} sells trimer blocks; decode its oligos with decode_oligo"
+        )
+    tables = _DecodeTables(generator)
+
+    batch: list[tuple[str, str]] = []
+    for name, sequence in records:
+        batch.append((name, "".join(sequence.split()).upper()))
+        if len(batch) == batch_size:
+            yield from _decode_batch(numpy, tables, batch, positions)
+            batch = []
+    if batch:
+        yield from _decode_batch(numpy, tables, batch, positions)
+
+
+def _decode_batch(
+    numpy: Any,
+    tables: _DecodeTables,
+    batch: list[tuple[str, str]],
+    positions: bool,
+) -> Iterator[dict[str, Any]]:
+    rows, errors = tables.translate([sequence for _, sequence in batch])
+    counts = tables.counts[rows].astype(numpy.float64)  # oligos x codons x aas
+    expanded = tables.expanded[rows]
+    probabilities = counts / expanded[..., None]
+
+    distinct = (counts > 0).sum(axis=2)
+    coding = distinct - (counts[..., _STOP] > 0)
+    stop_free = 1.0 - probabilities[..., _STOP]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        logs = numpy.where(probabilities > 0, numpy.log2(probabilities), 0.0)
+    entropy = -(probabilities * logs).sum(axis=(1, 2))
+    stop_fraction = 1.0 - stop_free.prod(axis=1)
+
+    for row, (name, sequence) in enumerate(batch):
+        if errors[row] is not None:
+            yield {"id": name, "error": errors[row]}
+            continue
+        length = len(sequence) // 3
+        bits = float(entropy[row])
+        record: dict[str, Any] = {
+            "id": name,
+            "codons": length,
+            "diversity": math.prod(expanded[row, :length].tolist()),
+            "distinct_variants": math.prod(distinct[row, :length].tolist()),
+            "stop_free_variants": math.prod(coding[row, :length].tolist()),
+            "stop_fraction": float(stop_fraction[row]),
+            "entropy_bits": bits,
+            "effective_diversity": 2.0**bits if bits < 1024 else math.inf,
+        }
+        if positions:
+            record["amino_acids"] = [
+                {
+                    AMINO_ACIDS_WITH_STOP[i]: int(c)
+                    for i, c in enumerate(position_counts)
+                    if c
+                }
+                for position_counts in tables.counts[rows[row, :length]].tolist()
+            ]
+            record["efficiency"] = [
+                round(100 * float(p)) for p in stop_free[row, :length]
+            ]
+        yield record
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point of ``phagetrix decode``."""
+    parser = argparse.ArgumentParser(
+        prog="phagetrix decode",
+        description="Decode degenerate DNA oligos into amino acid distributions",
+    )
+    parser.add_argument(
+        "input",
+        type=argparse.FileType("r"),
+        nargs="?",
+        default="-",
+        metavar="INPUT_FILE",
+        help="FASTA file, or one oligo per line (default: stdin)",
+    )
+    parser.add_argument("-c", "--company", default="IDT", help="DNA synthesis company")
+    parser.add_argument("-s", "--species", default="e_coli", help="Genetic code")
+    parser.add_argument(
+        "--positions",
+        action="store_true",
+        help="Report every position's amino acid counts and efficiency",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Write one JSON object per oligo"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Oligos translated together",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        results = iter_decoded(
+            read_sequences(args.input),
+            args.company,
+            args.species,
+            positions=args.positions,
+            batch_size=args.batch_size,
+        )
+        write_results(results, sys.stdout, args.json, args.positions)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def write_results(
+    results: Iterable[dict[str, Any]],
+    outfile: IO[str],
+    as_json: bool = False,
+    positions: bool = False,
+) -> None:
+    """
+    Write ``iter_decoded`` results as JSON lines or tab-separated text.
+
+    Args:
+        results: Decoded oligos
+        outfile: Text stream to write to
+        as_json: One JSON object per oligo instead of a table
+        positions: Write one table row per position instead of per oligo
+    """
+    if not as_json:
+        header = (
+            "id\tposition\tefficiency\tamino_acids"
+            if positions
+            else "id\tcodons\tdiversity\tdistinct_variants\tstop_fraction\tentropy_bits"
+        )
+        outfile.write(header + "\n")
+
+    for result in results:
+        if as_json:
+            outfile.write(json.dumps(result) + "\n")
+        elif "error" in result:
+            print(f"{result['id']}: {result['error']}", file=sys.stderr)
+        elif positions:
+            for pos, (counts, efficiency) in enumerate(
+                zip(result["amino_acids"], result["efficiency"], strict=True),
+                start=1,
+            ):
+                shown = " ".join(
+                    f"{aa}:{n}"
+                    for aa, n in sorted(counts.items(), key=lambda item: -item[1])
+                )
+                outfile.write(f"{result['id']}\t{pos}\t{efficiency}\t{shown}\n")
+        else:
+            outfile.write(
+                f"{result['id']}\t{result['codons']}\t{result['diversity']}"
+                f"\t{result['distinct_variants']}\t{result['stop_fraction']:.4g}"
+                f"\t{result['entropy_bits']:.4g}\n"
+            )
@@ -0,0 +1,310 @@
+"""
+Amino-acid-level diversity of degenerate libraries.
+
+The number of DNA combinations overstates a library: several codons code for
+the same amino acid, and amino acids are not equally likely. Positions are
+independent, so per-position amino acid distributions give exact counts,
+entropies and Hill numbers as sums and products. The full distribution of
+variant probabilities is summarised by a histogram of log-probabilities
+built by dynamic programming over positions, which stays small however many
+variants the library has.
+"""
+
+import math
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+from .core import DegenerateCodonGenerator
+
+# Upper bound on histogram bins; the bin width doubles whenever it is reached
+DEFAULT_MAX_BINS = 2048
+# Initial bin width in natural log units (0.1% in probability)
+_INITIAL_RESOLUTION = 1e-3
+# Coverage fractions reported by library_coverage
+COVERAGE_TARGETS = (0.9, 0.95, 0.99)
+
+
+def codon_distribution(
+    generator: DegenerateCodonGenerator, codon: str
+) -> dict[str, float]:
+    """
+    Amino acid probabilities of one degenerate codon.
+
+    Args:
+        generator: The codon generator the codon comes from
+        codon: Degenerate codon
+
+    Returns:
+        Amino acid (or "*") -> probability
+    """
+    meta = generator.degenerate_codons[codon]
+    total = meta["expanded_codon_count"]
+    return {aa: count / total for aa, count in meta["aas"].items()}
+
+
+def position_distributions(
+    generator: DegenerateCodonGenerator,
+    codons: Sequence[str],
+    mixtures: Mapping[Any, Mapping[str, Any]] | None = None,
+) -> list[dict[str, float]]:
+    """
+    Amino acid probabilities at every position of a design.
+
+    Args:
+        generator: The codon generator the codons come from
+        codons: Degenerate codon of every position
+        mixtures: Position (1-based) -> codon mixture, as in the "mixtures"
+            entry of an ``optimize_codons`` result
+
+    Returns:
+        One amino acid -> probability dictionary per position
+    """
+    mixtures = {int(pos): mixture for pos, mixture in (mixtures or {}).items()}
+    distributions = []
+    for pos, codon in enumerate(codons, start=1):
+        mixture = mixtures.get(pos)
+        if mixture is None:
+            distributions.append(codon_distribution(generator, codon))
+            continue
+        combined: dict[str, float] = {}
+        for part, ratio in zip(mixture["codons"], mixture["ratios"], strict=True):
+            for aa, p in codon_distribution(generator, part).items():
+                combined[aa] = combined.get(aa, 0.0) + ratio * p
+        distributions.append(combined)
+    return distributions
+
+
+def log_probability_histogram(
+    distributions: Iterable[Mapping[str, float]],
+    max_bins: int = DEFAULT_MAX_BINS,
+) -> list[tuple[float, int]]:
+    """
+    Histogram of the variant probabilities of a library.
+
+    Variants are grouped into bins of similar log-probability. Each bin
+    records how many variants it holds (exactly, as an integer) and their
+    total probability, so the mean probability of a bin is exact even
+    though bins are approximate.
+
+    Args:
+        distributions: Amino acid -> probability for every position
+        max_bins: Most bins kept; the bin width is doubled when exceeded
+
+    Returns:
+        (mean variant probability, number of variants) per bin, most
+        likely bin first
+    """
+    resolution = _INITIAL_RESOLUTION
+    # Bin index -> (number of variants, total probability)
+    bins: dict[int, tuple[int, float]] = {0: (1, 1.0)}
+
+    for distribution in distributions:
+        probabilities = [p for p in distribution.values() if p > 0]
+        if len(probabilities) == 1:
+            continue  # Fixed position: every variant keeps its probability
+
+        # Amino acids of similar probability shift bins by the same amount
+        groups: dict[int, tuple[int, float]] = {}
+        for p in probabilities:
+            step = round(math.log(p) / resolution)
+            count, mass = groups.get(step, (0, 0.0))
+            groups[step] = (count + 1, mass + p)
+
+        convolved: dict[int, tuple[int, float]] = {}
+        for key, (variants, mass) in bins.items():
+            for step, (count, group_mass) in groups.items():
+                target = key + step
+                old_variants, old_mass = convolved.get(target, (0, 0.0))
+                convolved[target] = (
+                    old_variants + variants * count,
+                    old_mass + mass * group_mass,
+                )
+        bins = convolved
+
+        while len(bins) > max_bins:
+            resolution *= 2
+            merged: dict[int, tuple[int, float]] = {}
+            for key, (variants, mass) in bins.items():
+                old_variants, old_mass = merged.get(key >> 1, (0, 0.0))
+                merged[key >> 1] = (old_variants + variants, old_mass + mass)
+            bins = merged
+
+    # Variant counts can exceed the float range, so divide in log space
+    return [
+        (math.exp(math.log(mass) - math.log(variants)) if mass > 0 else 0.0, variants)
+        for _, (variants, mass) in sorted(bins.items(), reverse=True)
+    ]
+
+
+def library_diversity(
+    distributions: Sequence[Mapping[str, float]],
+    max_bins: int = DEFAULT_MAX_BINS,
+) -> dict[str, Any]:
+    """
+    Diversity statistics of a library at the amino acid level.
+
+    Args:
+        distributions: Amino acid -> probability for every position
+        max_bins: Histogram size used for the probability summary
+
+    Returns:
+        Dictionary containing:
+        - "distinct_variants": Exact number of distinct protein variants
+        - "stop_free_variants": Distinct variants without a stop codon
+        - "stop_fraction": Fraction of clones containing a stop codon
+        - "entropy_bits": Shannon entropy of the variant distribution
+        - "effective_diversity": 2 ** entropy, the number of equally likely
+          variants with the same entropy
+        - "inverse_simpson": 1 / probability that two clones are identical
+        - "probability": Largest, smallest and median variant probability
+    """
+    distinct = 1
+    stop_free = 1
+    no_stop = 1.0
+    entropy = 0.0
+    collision = 1.0
+    most_likely = 1.0
+    least_likely = 1.0
+
+    for distribution in distributions:
+        probabilities = [p for p in distribution.values() if p > 0]
+        distinct *= len(probabilities)
+        stop_free *= sum(1 for aa, p in distribution.items() if p > 0 and aa != "*")
+        no_stop *= 1.0 - distribution.get("*", 0.0)
+        entropy -= sum(p * math.log2(p) for p in probabilities)
+        collision *= sum(p * p for p in probabilities)
+        most_likely *= max(probabilities)
+        least_likely *= min(probabilities)
+
+    # Median variant: half of all variants are at least this likely
+    histogram = log_probability_histogram(distributions, max_bins)
+    median = 0.0
+    seen = 0
+    for probability, variants in histogram:
+        seen += variants
+        if 2 * seen >= distinct:
+            median = probability
+            break
+
+    return {
+        "distinct_variants": distinct,
+        "stop_free_variants": stop_free,
+        "stop_fraction": 1.0 - no_stop,
+        "entropy_bits": entropy,
+        "effective_diversity": 2.0**entropy if entropy < 1024 else math.inf,
+        "inverse_simpson": 1.0 / collision if collision > 0 else math.inf,
+        "probability": {
+            "max": most_likely,
+            "min": least_likely,
+            "median": median,
+        },
+    }
+
+
+def coverage_fraction(
+    histogram: Sequence[tuple[float, int]], transformants: float
+) -> float:
+    """
+    Expected fraction of distinct variants seen among N random clones.
+
+    A variant of probability p is seen with probability 1 - (1 - p) ** N.
+
+    Args:
+        histogram: Output of ``log_probability_histogram``
+        transformants: Number of clones N
+
+    Returns:
+        Expected fraction of all distinct variants observed
+    """
+    total = sum(variants for _, variants in histogram)
+    fraction = 0.0
+    for probability, variants in histogram:
+        if probability >= 1.0:
+            seen = 1.0 if transformants > 0 else 0.0
+        else:
+            seen = -math.expm1(transformants * math.log1p(-probability))
+        # True division of integers does not overflow for huge counts
+        fraction += variants / total * seen
+    return fraction
+
+
+def transformants_for_coverage(
+    histogram: Sequence[tuple[float, int]], coverage: float
+) -> float:
+    """
+    Smallest number of clones expected to cover a fraction of the variants.
+
+    Args:
+        histogram: Output of ``log_probability_histogram``
+        coverage: Target fraction of distinct variants (0 to 1, exclusive)
+
+    Returns:
+        Number of transformants, or infinity if the rarest variants are too
+        unlikely to be represented in floating point
+    """
+    if not 0 < coverage < 1:
+        raise ValueError(f"Coverage must be between 0 and 1, got {coverage}")
+
+    # Double until the target is reached, then bisect
+    high = 1.0
+    while coverage_fraction(histogram, high) < coverage:
+        high *= 2
+        if high > 1e300:
+            return math.inf
+    low = high / 2
+    while high - low > 0.5:
+        middle = (low + high) / 2
+        if coverage_fraction(histogram, middle) < coverage:
+            low = middle
+        else:
+            high = middle
+    return float(math.ceil(high))
+
+
+def library_coverage(
+    distributions: Sequence[Mapping[str, float]],
+    transformants: int,
+    targets: Sequence[float] = COVERAGE_TARGETS,
+    max_bins: int = DEFAULT_MAX_BINS,
+) -> dict[str, Any]:
+    """
+    Expected coverage of a library by a given number of transformants.
+
+    Unlike the uniform approximation, this accounts for every variant
+    having its own probability, so rare variants need more clones.
+
+    Args:
+        distributions: Amino acid -> probability for every position
+        transformants: Number of transformants N
+        targets: Coverage fractions to report the required N for
+        max_bins: Histogram size used for the calculation
+
+    Returns:
+        Dictionary containing:
+        - "transformants": N
+        - "distinct_variants": Exact number of distinct protein variants
+        - "expected_variants": Expected number of distinct variants seen
+        - "coverage": The same as a fraction of all variants
+        - "uniform_coverage": Coverage if all variants were equally likely
+        - "transformants_needed": Target fraction -> N needed to reach it
+    """
+    if transformants < 0:
+        raise ValueError(
+            f"Number of transformants must not be negative, got {transformants}"
+        )
+    histogram = log_probability_histogram(distributions, max_bins)
+    distinct = sum(variants for _, variants in histogram)
+    coverage = coverage_fraction(histogram, transformants)
+
+    return {
+        "transformants": transformants,
+        "distinct_variants": distinct,
+        "expected_variants": coverage * distinct
+        if distinct.bit_length() < 1000
+        else math.inf,
+        "coverage": coverage,
+        "uniform_coverage": -math.expm1(-transformants / distinct),
+        "transformants_needed": {
+            target: transformants_for_coverage(histogram, target) for target in targets
+        },
+    }
@@ -0,0 +1,251 @@
+"""
+Precomputed answer tables for degenerate codon queries.
+
+There are only 2**21 possible amino acid target sets (20 amino acids plus
+stop), so every answer of ``get_best_degenerate_codon`` can be solved once
+and stored in a flat array indexed by the amino acid mask. The array is
+written to a small binary file that is memory-mapped on load, which makes
+each query a single array lookup shared by every process on the machine.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from .cache import default_cache_dir
+from .constants import AMINO_ACIDS_WITH_STOP
+from .core import DegenerateCodonGenerator
+
+_MAGIC = b"PHGXLUT\0"
+_FORMAT_VERSION = 1
+# magic, format version, byte order, codon width, codon count, fingerprint
+_HEADER = struct.Struct("<8sHBBH64s")
+_NO_CODON = 0xFFFF
+_TABLE_SIZE = 1 << len(AMINO_ACIDS_WITH_STOP)
+_AA_BITS = {aa: 1 << i for i, aa in enumerate(AMINO_ACIDS_WITH_STOP)}
+
+
+class CodonLookupTable:
+    """Best degenerate codon for every amino acid set of one generator."""
+
+    def __init__(
+        self,
+        codons: list[str],
+        entries: "array[int] | memoryview",
+        fingerprint: str,
+        mapping: mmap.mmap | None = None,
+    ) -> None:
+        self.codons = codons
+        self.entries = entries
+        self.fingerprint = fingerprint
+        self._mapping = mapping
+
+    @classmethod
+    def build(cls, generator: DegenerateCodonGenerator) -> "CodonLookupTable":
+        """
+        Solve every amino acid set for a generator.
+
+        Args:
+            generator: The codon generator to precompute
+
+        Returns:
+            An in-memory lookup table
+        """
+        # Codons in ranking order, so a lower index is a better codon
+        generator._ensure_index()
+        codons = [codon for _, codon in generator._ranked_masks]
+        if len(codons) >= _NO_CODON:
+            raise ValueError(
+                f"Too many distinct codons for a lookup table: {len(codons)}"
+            )
+
+        table = [_NO_CODON] * _TABLE_SIZE
+        for index, (mask, _) in enumerate(generator._ranked_masks):
+            table[mask] = index
+
+        # Superset minimum transform: afterwards every entry holds the best
+        # codon whose mask contains that entry's mask. Low bits are strided
+        # slices, high bits are contiguous halves of each block.
+        for bit in range(len(AMINO_ACIDS_WITH_STOP)):
+            step = 1 << bit
+            block = step << 1
+            if step >= 64:
+                for start in range(0, _TABLE_SIZE, block):
+                    middle = start + step
+                    table[start:middle] = map(
+                        min, table[start:middle], table[middle : start + block]
+                    )
+            else:
+                for low in range(step):
+                    table[low::block] = list(
+                        map(min, table[low::block], table[low + step :: block])
+                    )
+
+        return cls(codons, array("H", table), generator.fingerprint())
+
+    @classmethod
+    def for_generator(
+        cls,
+        generator: DegenerateCodonGenerator,
+        cache_dir: str | Path | None = None,
+    ) -> "CodonLookupTable":
+        """
+        Open the cached table for a generator, building it if needed.
+
+        Args:
+            generator: The codon generator the table answers for
+            cache_dir: Directory holding table files (default: user cache)
+
+        Returns:
+            A memory-mapped lookup table
+        """
+        fingerprint = generator.fingerprint()
+        directory = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        path = directory / f"lookup-{fingerprint[:32]}.bin"
+
+        if path.exists():
+            try:
+                table = cls.open(path)
+            except ValueError:
+                pass  # Corrupt or written elsewhere; rebuild below
+            else:
+                if table.fingerprint == fingerprint:
+                    return table
+                table.close()
+
+        cls.build(generator).save(path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str | Path) -> "CodonLookupTable":
+        """
+        Memory-map a table file written by ``save``.
+
+        Args:
+            path: Path of the table file
+
+        Returns:
+            A lookup table backed by the mapped file
+        """
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(mapping) < _HEADER.size:
+                raise ValueError(f"Lookup table {path} is truncated")
+            magic, version, byteorder, width, count, fingerprint = _HEADER.unpack_from(
+                mapping
+            )
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError(f"Lookup table {path} has an unsupported format")
+            if byteorder != (sys.byteorder == "little"):
+                raise ValueError(f"Lookup table {path} has a foreign byte order")
+
+            offset = _HEADER.size
+            names = mapping[offset : offset + width * count]
+            codons = [
+                names[i : i + width].rstrip(b"\0").decode("utf-8")
+                for i in range(0, width * count, width)
+            ]
+            offset = _aligned(offset + width * count)
+            if len(mapping) != offset + 2 * _TABLE_SIZE:
+                raise ValueError(f"Lookup table {path} is truncated")
+            entries = memoryview(mapping)[offset:].cast("H")
+        except BaseException:
+            mapping.close()
+            raise
+
+        return cls(codons, entries, fingerprint.decode("ascii"), mapping)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the table to disk atomically.
+
+        Args:
+            path: Destination of the table file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Trimer block names may be any character, so names are stored as
+        # UTF-8 in fields as wide as the longest encoding
+        encoded = [codon.encode("utf-8") for codon in self.codons]
+        width = max((len(name) for name in encoded), default=1)
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            sys.byteorder == "little",
+            width,
+            len(self.codons),
+            self.fingerprint.encode("ascii"),
+        )
+        names = b"".join(name.ljust(width, b"\0") for name in encoded)
+        padding = b"\0" * (
+            _aligned(len(header) + len(names)) - len(header) - len(names)
+        )
+
+        # Write next to the destination and rename, so concurrent readers
+        # never see a partially written file
+        import tempfile
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(names)
+                f.write(padding)
+                f.write(bytes(self.entries))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def close(self) -> None:
+        """Release the memory mapping, if any."""
+        if self._mapping is not None:
+            if isinstance(self.entries, memoryview):
+                self.entries.release()
+            self._mapping.close()
+            self._mapping = None
+
+    def lookup_mask(self, mask: int) -> str:
+        """
+        Return the best degenerate codon for an amino acid mask.
+
+        Args:
+            mask: Amino acid set as produced by ``get_amino_acid_mask``
+
+        Returns:
+            The best degenerate codon
+        """
+        index = self.entries[mask]
+        if index == _NO_CODON:
+            raise ValueError(f"No degenerate codon found for amino acid mask {mask}")
+        return self.codons[index]
+
+    def get_best_degenerate_codon(self, amino_acids: str) -> str:
+        """
+        Return the best degenerate codon for a list of amino acids.
+
+        Args:
+            amino_acids: Amino acids the codon must code for
+
+        Returns:
+            The same codon ``DegenerateCodonGenerator`` would return
+        """
+        mask = 0
+        for aa in amino_acids:
+            bit = _AA_BITS.get(aa)
+            if bit is None:
+                raise ValueError(f"Unknown amino acid '{aa}'")
+            mask |= bit
+        return self.lookup_mask(mask)
+
+
+def _aligned(offset: int) -> int:
+    """Round an offset up to the alignment of the entry array."""
+    return (offset + 1) & ~1
@@ -0,0 +1,175 @@
+"""
+Vectorised NumPy representation of the degenerate codon tables.
+
+Every degenerate codon is a row in two dense matrices: an expansion matrix
+(degenerate codons x 64 concrete codons) and a count matrix (degenerate
+codons x amino acids). Per-candidate metrics for a query, such as
+efficiency, off-target counts and diversity, are single array expressions
+over those matrices. NumPy is an optional dependency; install it with
+``pip install phagetrix[numpy]``.
+"""
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy installed
+    np = None  # type: ignore[assignment]
+
+from .constants import AMINO_ACIDS_WITH_STOP
+
+# Concrete bases in the order used for the 64 codon columns
+CONCRETE_BASES = "ACGT"
+
+
+def require_numpy() -> Any:
+    """Return the numpy module, or raise a helpful error if it is missing."""
+    if np is None:
+        raise ImportError(
+            "The numpy backend requires NumPy. "
+            "Install it with: pip install phagetrix[numpy]"
+        )
+    return np
+
+
+class CodonMatrix:
+    """Dense count matrices for every degenerate codon of an alphabet."""
+
+    def __init__(
+        self,
+        degenerate_bases: dict[str, str],
+        codon_to_aa: dict[str, str],
+        codon_usage: dict[str, int] | None = None,
+    ) -> None:
+        """
+        Build the matrices.
+
+        Args:
+            degenerate_bases: Degenerate base symbol -> concrete bases
+            codon_to_aa: Concrete codon -> amino acid (or "*")
+            codon_usage: Concrete codon -> integer usage weight (default 1)
+        """
+        numpy = require_numpy()
+        symbols = list(degenerate_bases)
+
+        # Which concrete bases each degenerate base stands for
+        base_matrix = numpy.zeros((len(symbols), 4), dtype=numpy.int32)
+        for row, symbol in enumerate(symbols):
+            for base in degenerate_bases[symbol]:
+                if base not in CONCRETE_BASES:
+                    raise ValueError(
+                        f"Degenerate base '{symbol}' contains invalid base '{base}'"
+                    )
+                base_matrix[row, CONCRETE_BASES.index(base)] = 1
+
+        # Outer product of three base rows gives the 64 concrete codons
+        self.expansion = numpy.einsum(
+            "ia,jb,kc->ijkabc", base_matrix, base_matrix, base_matrix
+        ).reshape(len(symbols) ** 3, 64)
+        self.codons = [
+            b1 + b2 + b3 for b1 in symbols for b2 in symbols for b3 in symbols
+        ]
+        self.codon_index = {codon: i for i, codon in enumerate(self.codons)}
+
+        # Concrete codon -> amino acid column
+        self.amino_acids = AMINO_ACIDS_WITH_STOP
+        codon_aa = numpy.zeros((64, len(self.amino_acids)), dtype=numpy.int32)
+        usage = numpy.ones(64, dtype=numpy.int64)
+        for column, (b1, b2, b3) in enumerate(
+            (b1, b2, b3)
+            for b1 in CONCRETE_BASES
+            for b2 in CONCRETE_BASES
+            for b3 in CONCRETE_BASES
+        ):
+            aa = codon_to_aa[b1 + b2 + b3]
+            if aa not in self.amino_acids:
+                raise ValueError(f"Unknown amino acid '{aa}' in codon table")
+            codon_aa[column, self.amino_acids.index(aa)] = 1
+            if codon_usage is not None:
+                usage[column] = codon_usage[b1 + b2 + b3]
+
+        # Floating point products go through BLAS; the results are exact
+        self.counts = (
+            self.expansion.astype(numpy.float64) @ codon_aa.astype(numpy.float64)
+        ).astype(numpy.int32)
+        self.expanded_counts = self.expansion.sum(axis=1)
+        # Integer products keep usage sums exact
+        self.usage_scores = self.expansion.astype(numpy.int64) @ usage
+        bits = numpy.left_shift(
+            1, numpy.arange(len(self.amino_acids), dtype=numpy.int64)
+        )
+        self.masks = (self.counts > 0) @ bits
+
+    def target_columns(self, amino_acids: str) -> Any:
+        """Boolean column selector for a set of amino acids."""
+        numpy = require_numpy()
+        return numpy.array([aa in amino_acids for aa in self.amino_acids])
+
+    def on_target_counts(self, amino_acids: str) -> Any:
+        """Number of expanded codons that code for a target amino acid."""
+        return self.counts[:, self.target_columns(amino_acids)].sum(axis=1)
+
+    def off_target_counts(self, amino_acids: str) -> Any:
+        """Number of expanded codons that code for anything else."""
+        return self.expanded_counts - self.on_target_counts(amino_acids)
+
+    def efficiency(self, amino_acids: str) -> Any:
+        """Fraction of expanded codons on target, for every degenerate codon."""
+        return self.on_target_counts(amino_acids) / self.expanded_counts
+
+    def diversity(self) -> Any:
+        """Number of concrete codons behind every degenerate codon."""
+        return self.expanded_counts
+
+    def covers(self, mask: int) -> Any:
+        """Boolean row selector of degenerate codons coding for all of a mask."""
+        return (self.masks & mask) == mask
+
+    def amino_acid_codons(self) -> dict[str, set[str]]:
+        """Amino acid -> set of degenerate codons that can produce it."""
+        numpy = require_numpy()
+        codons = numpy.array(self.codons)
+        return {
+            aa: set(codons[self.counts[:, column] > 0].tolist())
+            for column, aa in enumerate(self.amino_acids)
+            if self.counts[:, column].any()
+        }
+
+
+class DegenerateCodonView(Mapping[str, dict[str, Any]]):
+    """
+    Read-only ``degenerate_codons`` mapping backed by a CodonMatrix.
+
+    Entries have the same shape as the dictionary built by the python
+    backend and are materialised on first access.
+    """
+
+    def __init__(self, matrix: CodonMatrix) -> None:
+        self._matrix = matrix
+        self._entries: dict[str, dict[str, Any]] = {}
+
+    def __getitem__(self, codon: str) -> dict[str, Any]:
+        entry = self._entries.get(codon)
+        if entry is None:
+            row = self._matrix.codon_index[codon]
+            counts = self._matrix.counts[row]
+            entry = {
+                "aas": {
+                    aa: int(counts[column])
+                    for column, aa in enumerate(self._matrix.amino_acids)
+                    if counts[column]
+                },
+                "expanded_codon_count": int(self._matrix.expanded_counts[row]),
+            }
+            self._entries[codon] = entry
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._matrix.codons)
+
+    def __len__(self) -> int:
+        return len(self._matrix.codons)
+
+    def __contains__(self, codon: object) -> bool:
+        return codon in self._matrix.codon_index
@@ -0,0 +1,183 @@
+"""
+Opt-in timings and cache statistics.
+
+Stages of the pipeline (parsing, codon table loading, generator building,
+codon selection, statistics and rendering) report their wall time here
+while collection is enabled; caches report their hit counts through a
+registered callable. Collection is off by default and costs a single flag
+check per stage.
+
+Example:
+    >>> from phagetrix import metrics
+    >>> metrics.enable()
+    >>> phagetrix.optimize_codons("ACDEF", {1: "AG"})
+    >>> metrics.snapshot()["stages"]["codon_selection"]["calls"]
+    5
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from types import TracebackType
+from typing import Any
+
+_enabled = False
+_lock = threading.Lock()
+# Stage -> [calls, total seconds, longest single measurement]
+_stages: dict[str, list[float]] = {}
+# Cache name -> callable returning at least "hits" and "misses"
+_caches: dict[str, Callable[[], dict[str, int]]] = {}
+
+
+def enable() -> None:
+    """Start collecting stage timings."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop collecting stage timings; collected data is kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Whether stage timings are being collected."""
+    return _enabled
+
+
+def reset() -> None:
+    """Forget all collected stage timings."""
+    with _lock:
+        _stages.clear()
+
+
+def record(
+    stage: str, seconds: float, calls: int = 1, longest: float | None = None
+) -> None:
+    """
+    Add a measurement to a stage.
+
+    Args:
+        stage: Name of the stage
+        seconds: Wall time spent
+        calls: Number of operations the time covers
+        longest: Wall time of the slowest of those operations
+            (default: ``seconds``)
+    """
+    if not _enabled:
+        return
+    if longest is None:
+        longest = seconds
+    with _lock:
+        entry = _stages.get(stage)
+        if entry is None:
+            _stages[stage] = [calls, seconds, longest]
+        else:
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] = max(entry[2], longest)
+
+
+class timer:
+    """
+    Context manager timing one stage.
+
+    Args:
+        stage: Name of the stage
+        calls: Number of operations the block performs
+    """
+
+    __slots__ = ("calls", "stage", "start")
+
+    def __init__(self, stage: str, calls: int = 1) -> None:
+        self.stage = stage
+        self.calls = calls
+        self.start = 0.0
+
+    def __enter__(self) -> "timer":
+        if _enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if _enabled and self.start:
+            record(self.stage, time.perf_counter() - self.start, self.calls)
+
+
+def register_cache(name: str, info: Callable[[], dict[str, int]]) -> None:
+    """
+    Report a cache's statistics in snapshots.
+
+    Args:
+        name: Name shown in snapshots
+        info: Callable returning a dictionary with "hits" and "misses"
+    """
+    _caches[name] = info
+
+
+def snapshot() -> dict[str, Any]:
+    """
+    Current timings and cache statistics.
+
+    Returns:
+        Dictionary containing:
+        - "enabled": Whether timings are being collected
+        - "stages": Stage -> calls, total_seconds, mean_seconds, max_seconds
+        - "caches": Cache -> its statistics plus "hit_rate" (None before
+          the first lookup)
+    """
+    with _lock:
+        stages = {
+            stage: {
+                "calls": int(calls),
+                "total_seconds": total,
+                "mean_seconds": total / calls if calls else 0.0,
+                "max_seconds": longest,
+            }
+            for stage, (calls, total, longest) in _stages.items()
+        }
+
+    caches = {}
+    for name, info in _caches.items():
+        stats: dict[str, Any] = dict(info())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        caches[name] = stats
+
+    return {"enabled": _enabled, "stages": stages, "caches": caches}
+
+
+def format_summary(data: dict[str, Any] | None = None) -> str:
+    """
+    Human-readable summary of a snapshot.
+
+    Args:
+        data: A ``snapshot()`` result (default: take one now)
+
+    Returns:
+        Multi-line text table
+    """
+    if data is None:
+        data = snapshot()
+
+    lines = [f"{'stage':20s} {'calls':>9s} {'total ms':>11s} {'max ms':>10s}"]
+    for stage, stats in sorted(
+        data["stages"].items(), key=lambda item: -item[1]["total_seconds"]
+    ):
+        lines.append(
+            f"{stage:20s} {stats['calls']:9d} "
+            f"{stats['total_seconds'] * 1000:11.3f} {stats['max_seconds'] * 1000:10.3f}"
+        )
+    for name, stats in data["caches"].items():
+        rate = stats["hit_rate"]
+        shown = "n/a" if rate is None else f"{rate:.1%}"
+        lines.append(
+            f"cache {name}: {stats['hits']} hits, {stats['misses']} misses ({shown})"
+        )
+    return "\n".join(lines)
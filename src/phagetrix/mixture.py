@@ -0,0 +1,397 @@
+"""
+Multi-codon mixtures for positions a single degenerate codon covers poorly.
+
+Some amino acid sets can only be reached by one degenerate codon that also
+produces many unwanted amino acids. Mixing a few degenerate codons
+(split-pool synthesis) can cover the same set with far less off-target
+material. Finding the smallest such mixture is a set cover problem over the
+degenerate codons, solved here by branch-and-bound on amino acid masks.
+"""
+
+import math
+import sys
+from typing import Any, Literal
+
+from .core import DegenerateCodonGenerator
+
+MAX_MIXTURE_CODONS = 4
+
+# Tolerance for comparing on-target fractions
+_EPSILON = 1e-12
+
+# Array format for each field width of the packed profile counts
+_FIELD_FORMATS: dict[int, Literal["B", "H", "I", "Q"]] = {
+    1: "B",
+    2: "H",
+    4: "I",
+    8: "Q",
+}
+
+
+def find_codon_mixture(
+    generator: DegenerateCodonGenerator,
+    amino_acids: str,
+    max_codons: int = MAX_MIXTURE_CODONS,
+    min_on_target: float = 1.0,
+) -> dict[str, Any]:
+    """
+    Find the smallest mixture of degenerate codons covering an amino acid set.
+
+    Each amino acid is attributed to the most on-target codon of the mixture
+    that produces it, and codons are mixed in proportion to the number of
+    amino acids attributed to them, so every requested amino acid is
+    represented about equally. Codons are listed most on-target first.
+    Mixtures are searched from one codon upwards; the first size whose best
+    mixture reaches ``min_on_target`` wins. If no size up to ``max_codons``
+    reaches it, the mixture with the highest on-target fraction is returned.
+
+    Args:
+        generator: The codon generator to draw codons from
+        amino_acids: Amino acids the mixture must produce
+        max_codons: Largest number of codons in the mixture (1 to 4)
+        min_on_target: On-target fraction (0 to 1) that is good enough
+
+    Returns:
+        Dictionary containing:
+        - "codons": Degenerate codons of the mixture
+        - "ratios": Mixing ratio of each codon (sums to 1)
+        - "on_target": Fraction of the mixture's products that are requested
+        - "efficiency": The same as a rounded percentage
+    """
+    if not 1 <= max_codons <= MAX_MIXTURE_CODONS:
+        raise ValueError(
+            f"max_codons must be between 1 and {MAX_MIXTURE_CODONS}, got {max_codons}"
+        )
+    target = generator.get_amino_acid_mask(amino_acids)
+    if target == 0:
+        raise ValueError("No amino acids given for the mixture")
+    size = target.bit_count()
+
+    # Codons producing nothing outside the set can only form exact mixtures;
+    # try those first, they are few and need no per-codon counts
+    generator._ensure_index()
+    exact = [
+        (1.0, mask, codon)
+        for mask, codon in generator.mask_index.items()
+        if mask & target and not mask & ~target
+    ]
+    best = None
+    if min_on_target >= 1.0:
+        best = _deepen(generator, exact, target, max_codons, min_on_target)
+    if best is None or best[0] < min_on_target - _EPSILON:
+        candidates = _candidates(generator, target)
+        found = _deepen(generator, candidates, target, max_codons, min_on_target)
+        if found is not None and (best is None or found[0] > best[0] + _EPSILON):
+            best = found
+
+    if best is None:
+        raise ValueError(
+            f"No mixture of up to {max_codons} codons covers amino acids: {amino_acids}"
+        )
+
+    on_target, chosen = best
+    return {
+        "codons": [codon for codon, _ in chosen],
+        "ratios": [covered / size for _, covered in chosen],
+        "on_target": on_target,
+        "efficiency": round(100 * on_target),
+    }
+
+
+def _deepen(
+    generator: DegenerateCodonGenerator,
+    candidates: list[tuple[float, int, str]],
+    target: int,
+    max_codons: int,
+    min_on_target: float,
+) -> tuple[float, list[tuple[str, int]]] | None:
+    """Best mixture of the smallest size reaching ``min_on_target``."""
+    # Most on-target first, so each amino acid is credited to the first
+    # chosen codon producing it
+    ordered = sorted(
+        candidates,
+        key=lambda c: (-c[0], -c[1].bit_count(), generator._rank_key(c[2])),
+    )
+    search = _Search(ordered, target, max_codons)
+
+    best = None
+    for depth in range(1, max_codons + 1):
+        # Only mixtures beating the best smaller one are of interest
+        found = search.run(depth, -1.0 if best is None else best[0])
+        if found is not None:
+            best = found
+        if best is not None and best[0] >= min_on_target - _EPSILON:
+            break
+    return best
+
+
+class _MixtureIndex:
+    """
+    Codon profiles of one generator, built once and kept with it.
+
+    Codons with the same amino acid mask and the same amino acid
+    proportions have the same on-target fraction for every target, so only
+    the best ranked of them is kept. The amino acid counts of all profiles
+    are packed into one integer per amino acid, a fixed-width field per
+    profile, so the on-target counts for a target are a handful of integer
+    additions instead of a loop over every codon.
+    """
+
+    def __init__(self, generator: DegenerateCodonGenerator) -> None:
+        generator._ensure_index()
+        profiles: dict[tuple[int, tuple[tuple[int, int], ...]], tuple[Any, ...]] = {}
+        for codon, mask in generator.codon_masks.items():
+            meta = generator.degenerate_codons[codon]
+            expanded = meta["expanded_codon_count"]
+            counts = tuple(
+                sorted((generator.aa_bits[aa], n) for aa, n in meta["aas"].items())
+            )
+            divisor = math.gcd(expanded, *(n for _, n in counts))
+            proportions = (
+                expanded // divisor,
+                *((bit, n // divisor) for bit, n in counts),
+            )
+            key = generator._rank_key(codon)
+            current = profiles.get((mask, proportions))
+            if current is None or key < current[0]:
+                profiles[(mask, proportions)] = (key, codon, expanded, counts)
+
+        # Profiles grouped by mask, best ranked first within each group
+        ordered = sorted(
+            (mask, key, codon, expanded, counts)
+            for (mask, _), (key, codon, expanded, counts) in profiles.items()
+        )
+        self.keys = [entry[1] for entry in ordered]
+        self.codons = [entry[2] for entry in ordered]
+        self.expanded = [entry[3] for entry in ordered]
+        self.groups: list[tuple[int, int, int]] = []
+        for index, (mask, *_) in enumerate(ordered):
+            if self.groups and self.groups[-1][0] == mask:
+                self.groups[-1] = (mask, self.groups[-1][1], index + 1)
+            else:
+                self.groups.append((mask, index, index + 1))
+
+        # Field width holding any sum of counts of one profile
+        self.width = next(
+            w for w in _FIELD_FORMATS if max(self.expanded) < 1 << (8 * w)
+        )
+        self.packed: dict[int, int] = {}
+        for index, (*_, counts) in enumerate(ordered):
+            for bit, n in counts:
+                shift = 8 * self.width * index
+                self.packed[bit] = self.packed.get(bit, 0) + (n << shift)
+
+    def on_target_counts(self, target: int) -> memoryview:
+        """Expanded codons of every profile producing a requested amino acid."""
+        total = sum(packed for bit, packed in self.packed.items() if bit & target)
+        data = total.to_bytes(self.width * len(self.codons), sys.byteorder)
+        return memoryview(data).cast(_FIELD_FORMATS[self.width])
+
+
+def _mixture_index(generator: DegenerateCodonGenerator) -> _MixtureIndex:
+    """The generator's mixture index, built by the first call."""
+    index: _MixtureIndex | None = generator._mixture_index
+    if index is None:
+        with generator._index_lock:
+            index = generator._mixture_index
+            if index is None:
+                index = generator._mixture_index = _MixtureIndex(generator)
+    return index
+
+
+def _candidates(
+    generator: DegenerateCodonGenerator, target: int
+) -> list[tuple[float, int, str]]:
+    """
+    Useful codons for a target as (on-target fraction, covered mask, codon).
+
+    Amino acids are credited to the most on-target codon producing them, so
+    of the codons covering the same requested amino acids one with a lower
+    on-target fraction never improves a mixture; only the best is kept.
+    """
+    index = _mixture_index(generator)
+    keys = index.keys
+    expanded = index.expanded
+    on_target = None
+    best: dict[int, tuple[float, int]] = {}
+    for mask, start, end in index.groups:
+        covered = mask & target
+        if not covered:
+            continue
+        if not mask & ~target:
+            # Every profile is fully on target; the first one ranks best
+            choice = (1.0, start)
+        else:
+            if on_target is None:
+                on_target = index.on_target_counts(target)
+            # Highest fraction, the best ranked profile on ties
+            fraction, negative = max(
+                (on_target[i] / expanded[i], -i) for i in range(start, end)
+            )
+            choice = (fraction, -negative)
+        current = best.get(covered)
+        if (
+            current is None
+            or choice[0] > current[0]
+            or (choice[0] == current[0] and keys[choice[1]] < keys[current[1]])
+        ):
+            best[covered] = choice
+    codons = index.codons
+    return [(fraction, covered, codons[i]) for covered, (fraction, i) in best.items()]
+
+
+class _Search:
+    """
+    Branch-and-bound over the candidates of one target, for each size.
+
+    Mixtures are built from candidates in falling on-target order, so a
+    codon added later never takes an amino acid from one added before it,
+    and what it adds is its fraction times the amino acids it newly covers.
+    """
+
+    def __init__(
+        self,
+        candidates: list[tuple[float, int, str]],
+        target: int,
+        max_codons: int,
+    ) -> None:
+        self.fractions = [fraction for fraction, _, _ in candidates]
+        self.covers = [covered for _, covered, _ in candidates]
+        self.codons = [codon for _, _, codon in candidates]
+        self.size = size = target.bit_count()
+        self.target = target
+        # Candidates producing each requested amino acid, as a bit set of
+        # their indices
+        self.by_bit: dict[int, int] = {}
+        for index, covered in enumerate(self.covers):
+            while covered:
+                lowest = covered & -covered
+                self.by_bit[lowest] = self.by_bit.get(lowest, 0) | 1 << index
+                covered ^= lowest
+        # A codon credited with n amino acids covers at least n of them, so
+        # it is no more on-target than the best codon that wide;
+        # most[r][n] bounds what r codons add for n amino acids
+        widest = [0.0] * (size + 2)
+        for fraction, covered in zip(self.fractions, self.covers, strict=True):
+            width = covered.bit_count()
+            widest[width] = max(widest[width], fraction)
+        for width in range(size, 0, -1):
+            widest[width] = max(widest[width], widest[width + 1])
+        self.widest = widest
+        self.most = [[0.0] + [-math.inf] * size]
+        for _ in range(max_codons):
+            previous = self.most[-1]
+            self.most.append(
+                [
+                    max(previous[n - w] + w * widest[w] for w in range(n + 1))
+                    for n in range(size + 1)
+                ]
+            )
+        # Candidates producing all of a set of amino acids, as a bit set
+        self.covering: dict[int, int] = {}
+
+    def bound(self, start: int, uncovered: int, remaining: int) -> float:
+        """Most ``remaining`` codons from ``start`` on can add to the score."""
+        limit = self.most[remaining][uncovered.bit_count()]
+        fractions, by_bit = self.fractions, self.by_bit
+        total = 0.0
+        while uncovered:
+            lowest = uncovered & -uncovered
+            left = by_bit.get(lowest, 0) >> start
+            if not left:
+                return -math.inf  # Nothing left produces this amino acid
+            # The first candidate left producing it is the most on target
+            total += fractions[start + (left & -left).bit_length() - 1]
+            uncovered ^= lowest
+        return min(total, limit) / self.size
+
+    def finish(self, uncovered: int, start: int) -> int | None:
+        """The best candidate from ``start`` on producing all of ``uncovered``."""
+        indices = self.covering.get(uncovered)
+        if indices is None:
+            indices = -1
+            rest = uncovered
+            while rest:
+                lowest = rest & -rest
+                indices &= self.by_bit.get(lowest, 0)
+                rest ^= lowest
+            self.covering[uncovered] = indices
+        left = indices >> start
+        return start + (left & -left).bit_length() - 1 if left else None
+
+    def run(
+        self, depth: int, floor: float = -1.0
+    ) -> tuple[float, list[tuple[str, int]]] | None:
+        """Best mixture of at most ``depth`` codons scoring above ``floor``."""
+        fractions, covers, codons = self.fractions, self.covers, self.codons
+        by_bit, size, widest = self.by_bit, self.size, self.widest
+        bound, finish = self.bound, self.finish
+        best_score = floor
+        best_choice: list[tuple[str, int]] = []
+        chosen: list[tuple[str, int]] = []
+
+        def record(score: float, extra: list[tuple[str, int]]) -> None:
+            nonlocal best_score, best_choice
+            if score > best_score + _EPSILON:
+                best_score = score
+                best_choice = chosen + extra
+
+        def visit(start: int, uncovered: int, score: float, remaining: int) -> None:
+            if not uncovered:
+                record(score, [])
+                return
+            count = uncovered.bit_count()
+            if remaining == 1:
+                last = finish(uncovered, start)
+                if last is not None:
+                    gain = fractions[last] * count / size
+                    record(score + gain, [(codons[last], count)])
+                return
+            if score + bound(start, uncovered, remaining) <= best_score + _EPSILON:
+                return
+
+            # Candidates from start on producing any of the uncovered
+            useful = 0
+            rest = uncovered
+            while rest:
+                lowest = rest & -rest
+                useful |= by_bit.get(lowest, 0)
+                rest ^= lowest
+            useful >>= start
+            while useful:
+                lowest = useful & -useful
+                useful ^= lowest
+                index = start + lowest.bit_length() - 1
+                fraction = fractions[index]
+                # No later candidate is more on target than this one
+                if score + fraction * count / size <= best_score + _EPSILON:
+                    break
+                added = covers[index] & uncovered
+                gain = fraction * added.bit_count() / size
+                rest = uncovered & ~added
+                if remaining == 2 and rest:
+                    # One codon must produce the rest, so it is at most as
+                    # on target as this one and the best codon that wide
+                    left = rest.bit_count()
+                    most = min(fraction, widest[left]) * left / size
+                    if score + gain + most <= best_score + _EPSILON:
+                        continue
+                    last = finish(rest, index + 1)
+                    if last is not None:
+                        total = gain + fractions[last] * left / size
+                        record(
+                            score + total,
+                            [
+                                (codons[index], added.bit_count()),
+                                (codons[last], left),
+                            ],
+                        )
+                    continue
+                chosen.append((codons[index], added.bit_count()))
+                visit(index + 1, rest, score + gain, remaining - 1)
+                chosen.pop()
+
+        visit(0, self.target, 0.0, depth)
+        if not best_choice:
+            return None
+        return best_score, best_choice
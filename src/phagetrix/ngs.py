@@ -0,0 +1,537 @@
+"""
+Counting protein variants in sequenced clones of a designed library.
+
+Reads are located by the two ends of the designed region, each turned into
+a regular expression that accepts every base the degenerate codons allow,
+so clones match whichever variant they carry. An in-frame region is
+translated and the amino acids at the varied positions form the variant's
+key in a sparse count table; reads whose ends sit at the wrong distance
+are counted as frameshifts or in-frame indels.
+
+FASTQ files are memory-mapped and cut into byte ranges that start at
+record boundaries, and worker processes count the ranges independently.
+Each worker keeps at most ``max_table_size`` variants in memory and spills
+sorted runs of its table to disk beyond that; the runs are merged in key
+order at the end, so a library with more distinct variants than fit in
+memory can be written out as a stream.
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from functools import partial
+from pathlib import Path
+from typing import IO, Any
+
+from . import api
+from .diversity import position_distributions
+
+# Bytes of FASTQ per task
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+# Distinct variants a worker keeps in memory before spilling to disk
+DEFAULT_MAX_TABLE_SIZE = 1_000_000
+# Spilled runs read at once while merging
+MERGE_FAN_IN = 64
+# Bases matched at each end of the designed region to locate it
+ANCHOR_LENGTH = 15
+
+# What happened to a read, in the order they are reported
+OUTCOMES = ("in_frame", "frameshift", "in_frame_indel", "truncated", "unlocated")
+
+_COMPLEMENT = bytes.maketrans(b"ACGTN", b"TGCAN")
+
+
+class _Plan:
+    """What a worker needs to count the reads of one design; picklable."""
+
+    def __init__(self, result: dict[str, Any]) -> None:
+        generator = api.get_generator(result["company"], result["species"])
+        mixtures = {int(pos): m for pos, m in result.get("mixtures", {}).items()}
+
+        # Regular expression for every base of the region
+        pattern = []
+        for pos, codon in enumerate(result["degenerate_codons"], start=1):
+            parts = mixtures[pos]["codons"] if pos in mixtures else [codon]
+            concrete = {c for part in parts for c in generator.get_normal_codons(part)}
+            for i in range(3):
+                bases = sorted({c[i] for c in concrete})
+                pattern.append(bases[0] if len(bases) == 1 else f"[{''.join(bases)}]")
+        if not pattern:
+            raise ValueError("The design has no codons")
+
+        self.length = len(pattern)
+        self.anchor = min(ANCHOR_LENGTH, self.length)
+        self.start_pattern = "".join(pattern[: self.anchor]).encode("ascii")
+        self.end_pattern = "".join(pattern[-self.anchor :]).encode("ascii")
+        self.codon_table = {
+            codon.encode("ascii"): aa for codon, aa in generator.codon_to_aa.items()
+        }
+        # Amino acids expected at every position of the protein
+        variations = {int(pos): aas for pos, aas in result["variations"].items()}
+        self.varied = sorted(variations)
+        self.expected = [
+            set(variations.get(pos, aa))
+            for pos, aa in enumerate(result["sequence"], start=1)
+        ]
+
+
+class _Counter:
+    """Read outcomes, per-position amino acids and the variant table."""
+
+    def __init__(self, plan: _Plan, max_table_size: int, spill_dir: str) -> None:
+        self.plan = plan
+        self.max_table_size = max_table_size
+        self.spill_dir = spill_dir
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.ambiguous = 0
+        self.stops = 0
+        self.off_target = 0
+        self.observed: list[dict[str, int]] = [{} for _ in plan.varied]
+        self.table: dict[str, int] = {}
+        self.runs: list[str] = []
+        self._start = re.compile(plan.start_pattern)
+        self._end = re.compile(plan.end_pattern)
+
+    def add(self, read: bytes) -> None:
+        """Count one read, trying the reverse strand if needed."""
+        outcome, region = self._locate(read)
+        if outcome == "unlocated":
+            outcome, region = self._locate(read.translate(_COMPLEMENT)[::-1])
+        self.outcomes[outcome] += 1
+        if region is not None:
+            self._translate(region)
+
+    def _locate(self, read: bytes) -> tuple[str, bytes | None]:
+        plan = self.plan
+        start = self._start.search(read)
+        if start is None:
+            return "unlocated", None
+        begin = start.start()
+        expected = begin + plan.length - plan.anchor
+        if self._end.match(read, expected):
+            return "in_frame", read[begin : begin + plan.length]
+        end = self._end.search(read, start.end())
+        if end is not None:
+            shift = end.start() - expected
+            return ("in_frame_indel" if shift % 3 == 0 else "frameshift"), None
+        if len(read) < begin + plan.length:
+            return "truncated", None
+        return "unlocated", None
+
+    def _translate(self, region: bytes) -> None:
+        plan = self.plan
+        table = plan.codon_table
+        protein = [table.get(region[i : i + 3], "X") for i in range(0, plan.length, 3)]
+        if "X" in protein:  # Uncalled bases
+            self.ambiguous += 1
+            return
+        if "*" in protein:
+            self.stops += 1
+        if any(
+            aa not in expected
+            for aa, expected in zip(protein, plan.expected, strict=True)
+        ):
+            self.off_target += 1
+
+        key = "".join(protein[pos - 1] for pos in plan.varied)
+        for observed, aa in zip(self.observed, key, strict=True):
+            observed[aa] = observed.get(aa, 0) + 1
+        self.table[key] = self.table.get(key, 0) + 1
+        if len(self.table) > self.max_table_size:
+            self.spill()
+
+    def spill(self) -> None:
+        """Write the in-memory variant table to a sorted run file."""
+        if not self.table:
+            return
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix=".variants")
+        with os.fdopen(fd, "w") as f:
+            for key in sorted(self.table):
+                f.write(f"{key}\t{self.table[key]}\n")
+        self.runs.append(path)
+        self.table = {}
+
+
+def _record_start(mm: mmap.mmap, offset: int) -> int:
+    """First FASTQ record starting at or after a byte offset."""
+    if offset <= 0:
+        return 0
+    # Quality lines may start with "@" too; a header is the "@" line whose
+    # record has a "+" separator two lines further
+    mm.seek(offset - 1)
+    mm.readline()
+    while True:
+        position = mm.tell()
+        line = mm.readline()
+        if not line:
+            return position
+        if line.startswith(b"@"):
+            after = mm.tell()
+            mm.readline()
+            if mm.readline().startswith(b"+"):
+                return position
+            mm.seek(after)
+
+
+def fastq_chunks(
+    path: str | Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """
+    Split a FASTQ file into byte ranges that start at record boundaries.
+
+    Args:
+        path: Uncompressed FASTQ file
+        chunk_size: Approximate bytes per range
+
+    Returns:
+        (start, end) byte ranges covering every record once
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        starts = sorted(
+            {_record_start(mm, offset) for offset in range(0, size, chunk_size)}
+        )
+    ends = [*starts[1:], size]
+    return [
+        (start, end) for start, end in zip(starts, ends, strict=True) if start < end
+    ]
+
+
+def _fastq_reads(path: str, start: int | None, end: int | None) -> Iterator[bytes]:
+    """Sequences of the records starting in a byte range, or of a gzip file."""
+    if start is None or end is None:
+        with gzip.open(path, "rb") as stream:
+            # An incomplete last record is ignored
+            for header, sequence, _, _ in zip(
+                stream, stream, stream, stream, strict=False
+            ):
+                if not header.startswith(b"@"):
+                    raise ValueError(f"{path} is not a FASTQ file")
+                yield sequence.rstrip().upper()
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        mm.seek(start)
+        while mm.tell() < end:
+            position = mm.tell()
+            header = mm.readline()
+            if not header.startswith(b"@"):
+                raise ValueError(f"{path} is not a FASTQ file (byte {position})")
+            sequence = mm.readline()
+            mm.readline()
+            mm.readline()
+            yield sequence.rstrip().upper()
+
+
+def _count_range(
+    task: tuple[str, int | None, int | None],
+    plan: _Plan,
+    max_table_size: int,
+    spill_dir: str,
+    spill_all: bool,
+) -> dict[str, Any]:
+    # One task: count a byte range (or a whole gzip file) and return the
+    # counts, with the variant table in memory or as spilled runs
+    path, start, end = task
+    counter = _Counter(plan, max_table_size, spill_dir)
+    for read in _fastq_reads(path, start, end):
+        counter.add(read)
+    if spill_all:
+        counter.spill()
+    return {
+        "outcomes": counter.outcomes,
+        "ambiguous": counter.ambiguous,
+        "stops": counter.stops,
+        "off_target": counter.off_target,
+        "observed": counter.observed,
+        "table": counter.table,
+        "runs": counter.runs,
+    }
+
+
+def _read_run(path: str) -> Iterator[tuple[str, int]]:
+    """(variant, count) pairs of a spilled run, in key order."""
+    with open(path) as f:
+        for line in f:
+            key, _, count = line.rstrip("\n").partition("\t")
+            yield key, int(count)
+
+
+def _sum_runs(runs: Sequence[str]) -> Iterator[tuple[str, int]]:
+    """Sum the counts of sorted runs into one stream in key order."""
+    current = None
+    total = 0
+    for key, count in heapq.merge(*(_read_run(run) for run in runs)):
+        if key != current:
+            if current is not None:
+                yield current, total
+            current, total = key, 0
+        total += count
+    if current is not None:
+        yield current, total
+
+
+def _merge_runs(runs: Sequence[str], spill_dir: str) -> Iterator[tuple[str, int]]:
+    """Merge any number of sorted runs, at most MERGE_FAN_IN files at a time."""
+    runs = list(runs)
+    while len(runs) > MERGE_FAN_IN:
+        merged = []
+        for i in range(0, len(runs), MERGE_FAN_IN):
+            group = runs[i : i + MERGE_FAN_IN]
+            fd, path = tempfile.mkstemp(dir=spill_dir, suffix=".variants")
+            with os.fdopen(fd, "w") as f:
+                for key, count in _sum_runs(group):
+                    f.write(f"{key}\t{count}\n")
+            for run in group:
+                os.unlink(run)
+            merged.append(path)
+        runs = merged
+    yield from _sum_runs(runs)
+
+
+def count_variants(
+    result: dict[str, Any],
+    paths: Iterable[str | Path],
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_table_size: int = DEFAULT_MAX_TABLE_SIZE,
+    output: IO[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Count the protein variants in FASTQ reads of a designed library.
+
+    Args:
+        result: The ``optimize_codons`` result the library was made from
+        paths: FASTQ files of the sequenced clones; files ending in ".gz"
+            are read as gzip streams, one task per file
+        workers: Number of worker processes (default: number of CPUs);
+                 1 counts everything in the calling process
+        chunk_size: Bytes of uncompressed FASTQ per task
+        max_table_size: Distinct variants a worker keeps in memory before
+            spilling sorted runs to disk
+        output: Stream receiving the variant table as "variant<TAB>count"
+            lines sorted by variant; the table is then not kept in memory
+            and the result has no "variants" entry
+
+    Returns:
+        Dictionary containing:
+        - "reads": Number of reads
+        - "outcomes": Reads per outcome: "in_frame" (region found at the
+          designed length), "frameshift" and "in_frame_indel" (both ends
+          found at another distance), "truncated" (read ends inside the
+          region) and "unlocated"
+        - "ambiguous": In-frame reads with uncalled bases, not counted
+        - "positions": The varied positions, in the order of the amino
+          acids of variant keys
+        - "variants": Variant (amino acids at the varied positions) ->
+          number of reads
+        - "distinct_variants": Number of distinct variants seen
+        - "rates": Observed "stop" and "off_target" fractions of the counted
+          reads, and the "frameshift" fraction of the reads with both ends
+          found (None without reads)
+        - "predicted": The same "stop" and "off_target" fractions expected
+          from the design
+        - "position_counts": Position -> "observed" amino acid counts and
+          "predicted" amino acid probabilities
+
+    Example:
+        >>> design = optimize_codons("VLAYMVAQVQ", {3: "AGVIL", 4: "YFW"})
+        >>> counts = count_variants(design, ["clones.fastq"])
+        >>> counts["rates"]["stop"], counts["predicted"]["stop"]
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    if max_table_size < 1:
+        raise ValueError(f"max_table_size must be at least 1, got {max_table_size}")
+
+    plan = _Plan(result)
+    tasks: list[tuple[str, int | None, int | None]] = []
+    for path in map(str, paths):
+        if path.endswith(".gz"):
+            tasks.append((path, None, None))
+        else:
+            tasks.extend(
+                (path, start, end) for start, end in fastq_chunks(path, chunk_size)
+            )
+
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    totals = {"ambiguous": 0, "stops": 0, "off_target": 0}
+    observed: list[dict[str, int]] = [{} for _ in plan.varied]
+    variants: dict[str, int] = {}
+    distinct = 0
+
+    with tempfile.TemporaryDirectory(prefix="phagetrix-ngs-") as spill_dir:
+        count = partial(
+            _count_range,
+            plan=plan,
+            max_table_size=max_table_size,
+            spill_dir=spill_dir,
+            spill_all=output is not None,
+        )
+        runs: list[str] = []
+        for part in _run_tasks(count, tasks, workers):
+            for outcome, n in part["outcomes"].items():
+                outcomes[outcome] += n
+            for name in totals:
+                totals[name] += part[name]
+            for merged, counts in zip(observed, part["observed"], strict=True):
+                for aa, n in counts.items():
+                    merged[aa] = merged.get(aa, 0) + n
+            runs.extend(part["runs"])
+            for key, n in part["table"].items():
+                variants[key] = variants.get(key, 0) + n
+
+        if output is not None:
+            for key, n in _merge_runs(runs, spill_dir):
+                output.write(f"{key}\t{n}\n")
+                distinct += 1
+        else:
+            for run in runs:
+                for key, n in _read_run(run):
+                    variants[key] = variants.get(key, 0) + n
+            distinct = len(variants)
+
+    summary = _summary(result, plan, outcomes, totals, observed)
+    summary["distinct_variants"] = distinct
+    if output is None:
+        summary["variants"] = dict(sorted(variants.items()))
+    return summary
+
+
+def _run_tasks(
+    count: Any, tasks: list[tuple[str, int | None, int | None]], workers: int
+) -> Iterator[dict[str, Any]]:
+    """Results of the tasks, in the calling process or a process pool."""
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        yield from map(count, tasks)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(count, tasks)
+
+
+def _summary(
+    result: dict[str, Any],
+    plan: _Plan,
+    outcomes: dict[str, int],
+    totals: dict[str, int],
+    observed: list[dict[str, int]],
+) -> dict[str, Any]:
+    """Rates of the merged counts next to the design's predictions."""
+    generator = api.get_generator(result["company"], result["species"])
+    distributions = position_distributions(
+        generator, result["degenerate_codons"], result.get("mixtures")
+    )
+    predicted_stop = 1.0 - math.prod(1.0 - d.get("*", 0.0) for d in distributions)
+    predicted_on_target = math.prod(
+        sum(p for aa, p in d.items() if aa in expected)
+        for d, expected in zip(distributions, plan.expected, strict=True)
+    )
+
+    counted = outcomes["in_frame"] - totals["ambiguous"]
+    both_ends = (
+        outcomes["in_frame"] + outcomes["frameshift"] + outcomes["in_frame_indel"]
+    )
+    return {
+        "reads": sum(outcomes.values()),
+        "outcomes": outcomes,
+        "ambiguous": totals["ambiguous"],
+        "positions": plan.varied,
+        "rates": {
+            "stop": totals["stops"] / counted if counted else None,
+            "off_target": totals["off_target"] / counted if counted else None,
+            "frameshift": outcomes["frameshift"] / both_ends if both_ends else None,
+        },
+        "predicted": {
+            "stop": predicted_stop,
+            "off_target": 1.0 - predicted_on_target,
+        },
+        "position_counts": {
+            pos: {
+                "observed": dict(sorted(counts.items(), key=lambda item: -item[1])),
+                "predicted": distributions[pos - 1],
+            }
+            for pos, counts in zip(plan.varied, observed, strict=True)
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point of ``phagetrix count``."""
+    parser = argparse.ArgumentParser(
+        prog="phagetrix count",
+        description="Count protein variants in FASTQ reads of a designed library",
+    )
+    parser.add_argument("design", metavar="DESIGN_FILE", help="Phagetrix input file")
+    parser.add_argument(
+        "reads", nargs="+", metavar="FASTQ", help="FASTQ files (.gz allowed)"
+    )
+    parser.add_argument("-c", "--company", default="IDT", help="DNA synthesis company")
+    parser.add_argument("-s", "--species", default="e_coli", help="Codon usage")
+    parser.add_argument(
+        "--max-codons-per-position",
+        type=int,
+        default=1,
+        help="As used when designing the library",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="Worker processes"
+    )
+    parser.add_argument(
+        "--max-table-size",
+        type=int,
+        default=DEFAULT_MAX_TABLE_SIZE,
+        help="Distinct variants a worker keeps in memory before spilling",
+    )
+    parser.add_argument(
+        "--variants",
+        type=argparse.FileType("w"),
+        metavar="TSV_FILE",
+        help="Write the variant table here instead of into the JSON summary",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        sequence, variations, config = api.parse_phagetrix_file(args.design)
+        design = api.optimize_codons(
+            sequence,
+            variations,
+            args.company,
+            args.species,
+            int(config.get("offset", 0)),
+            max_codons_per_position=args.max_codons_per_position,
+        )
+        counts = count_variants(
+            design,
+            args.reads,
+            workers=args.workers,
+            max_table_size=args.max_table_size,
+            output=args.variants,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.variants is not None:
+            args.variants.close()
+    json.dump(counts, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -1,8 +1,11 @@
 """Output formatting for phagetrix results."""
 
-from quantiphy import Quantity
+import time
+from typing import Any
 
+from . import metrics
 from .core import DegenerateCodonGenerator
+from .diversity import library_diversity
 
 
 class OutputFormatter:
@@ -29,17 +32,21 @@ class OutputFormatter:
         """
         offset = int(config["offset"])
 
+        # Generate and analyze codons
+        codons, target_list, target_score = self._generate_codons(
+            seq, variations, generator
+        )
+        prob, diversity = self._statistics(target_list)
+
+        # Only printing counts as rendering
+        started = time.perf_counter()
+
         # Print header with position numbers
         print("".join([f"{int(i) + offset:4d}" for i in range(1, len(seq) + 1)]))
 
         # Print the original amino acid sequence
         print("".join([f"{aa:>4s}" for aa in seq]))
 
-        # Generate and analyze codons
-        codons, target_list, target_score = self._generate_codons(
-            seq, variations, generator
-        )
-
         # Print the degenerate codons
         print("".join([f"{codon:>4s}" for codon in codons]), "  degenerate codons")
 
@@ -50,12 +57,17 @@ class OutputFormatter:
         self._print_amino_acid_breakdown(target_list)
 
         # Print statistics
-        self._print_statistics(target_list, codons)
+        self._print_statistics(prob, diversity, codons)
+        metrics.record("render", time.perf_counter() - started)
 
     def _generate_codons(
         self, seq: str, variations: dict[int, str], generator: DegenerateCodonGenerator
     ) -> tuple[list[str], list[list[tuple[int, str]]], list[float]]:
         """Generate codons and analyze their efficiency."""
+        # Positions are timed one by one only while metrics are collected
+        timed = metrics.is_enabled()
+        longest = 0.0
+        started = previous = time.perf_counter()
         codons = []
         target_list = []
         target_score = []
@@ -93,7 +105,14 @@ class OutputFormatter:
             if len(off_target) > 0:
                 target_list[index].append((0, "-"))
                 target_list[index] += off_target
+            if timed:
+                now = time.perf_counter()
+                longest = max(longest, now - previous)
+                previous = now
 
+        metrics.record(
+            "codon_selection", time.perf_counter() - started, len(seq), longest
+        )
         return codons, target_list, target_score
 
     def _print_efficiency(self, seq: str, target_score: list[float]) -> None:
@@ -123,10 +142,11 @@ class OutputFormatter:
                     print("    ", end="")
             print()
 
-    def _print_statistics(
-        self, target_list: list[list[tuple[int, str]]], codons: list[str]
-    ) -> None:
-        """Print probability and material statistics."""
+    def _statistics(
+        self, target_list: list[list[tuple[int, str]]]
+    ) -> tuple[float, dict[str, Any]]:
+        """Probability of one outcome and protein-level diversity."""
+        started = time.perf_counter()
         probs_out_of = []
         for t in target_list:
             s = sum(i[0] for i in t)
@@ -137,9 +157,31 @@ class OutputFormatter:
             if x > 0:  # Avoid division by zero
                 prob /= x
 
+        # Protein-level diversity from the per-position amino acid counts
+        distributions = [
+            {aa: count / total for count, aa in t if count > 0}
+            for t, total in zip(target_list, probs_out_of, strict=True)
+            if total > 0
+        ]
+        diversity = library_diversity(distributions)
+        metrics.record("statistics", time.perf_counter() - started)
+        return prob, diversity
+
+    def _print_statistics(
+        self, prob: float, diversity: dict[str, Any], codons: list[str]
+    ) -> None:
+        """Print probability and material statistics."""
+        from quantiphy import Quantity
+
         print()
         print("Probability for any one outcome: ", Quantity(prob, ""), "=1/", 1 / prob)
 
+        print(
+            f"Distinct protein variants: {diversity['distinct_variants']},",
+            f"effective: {Quantity(diversity['effective_diversity'], '')},",
+            f"entropy: {diversity['entropy_bits']:.1f} bits",
+        )
+
         # Calculate material requirements
         one_particle_in_moles = 1.0 / self.avogadro
         print("Amount of material to get all the combinations, ")
@@ -1,67 +1,140 @@
 """Input parsing and validation for phagetrix."""
 
 import re
+from collections.abc import Iterable
 
+from . import metrics
 from .constants import VALID_AMINO_ACIDS
 
+# Default limits; pass None to the parser to lift either of them
+DEFAULT_MAX_LINES = 1000
+DEFAULT_MAX_SEQUENCE_LENGTH = 10000
+DEFAULT_MAX_ERRORS = 100
+
+_CONFIG_LINE = re.compile(r"#\s*\w+\s*=\s*\d+\.?\d*")
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+\.?\d*")
+_POSITION = re.compile(r"\d+")
+
+# Deletes every valid residue, so whatever survives translate() is invalid
+_STRIP_VALID = str.maketrans("", "", VALID_AMINO_ACIDS)
+
+
+class ParseError(ValueError):
+    """Invalid input; ``errors`` lists every problem found, in line order."""
+
+    def __init__(self, errors: list[str]) -> None:
+        self.errors = errors
+        if len(errors) == 1:
+            message = errors[0]
+        else:
+            message = f"{len(errors)} errors in input:\n" + "\n".join(errors)
+        super().__init__(message)
+
 
 class InputParser:
     """Parses and validates phagetrix input files."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_lines: int | None = DEFAULT_MAX_LINES,
+        max_sequence_length: int | None = DEFAULT_MAX_SEQUENCE_LENGTH,
+        max_errors: int = DEFAULT_MAX_ERRORS,
+    ) -> None:
+        """
+        Create a parser.
+
+        Args:
+            max_lines: Most input lines accepted (None for no limit)
+            max_sequence_length: Longest sequence accepted (None for no limit)
+            max_errors: Stop reading after this many errors
+        """
         self.valid_aas = VALID_AMINO_ACIDS
+        self.max_lines = max_lines
+        self.max_sequence_length = max_sequence_length
+        self.max_errors = max_errors
 
-    def parse(self, lines: list[str]) -> tuple[str, dict[int, str], dict[str, float]]:
+    def parse(
+        self, lines: Iterable[str]
+    ) -> tuple[str, dict[int, str], dict[str, float]]:
         """
         Parse input lines into sequence, variations, and configuration.
 
+        Lines are consumed one at a time, so a file object can be passed
+        directly without reading it into memory first. All problems are
+        collected and raised together as one ParseError.
+
         Args:
-            lines: List of input lines from file
+            lines: Input lines, for example a list or an open file
 
         Returns:
             Tuple of (sequence, variations_dict, config_dict)
         """
-        # Validate input size to prevent DoS
-        if len(lines) == 0:
-            raise ValueError("Input file is empty")
-        if len(lines) > 1000:  # Reasonable limit
-            raise ValueError(f"Input file too large: {len(lines)} lines (max 1000)")
-
-        # Get and validate the sequence
-        seq = lines[0].strip()
-        if not seq:
-            raise ValueError("First line (sequence) cannot be empty")
-        if len(seq) > 10000:  # Reasonable protein length limit
-            raise ValueError(f"Sequence too long: {len(seq)} amino acids (max 10000)")
-
-        # Validate sequence contains only valid amino acids
-        for i, aa in enumerate(seq):
-            if aa not in self.valid_aas:
-                raise ValueError(
-                    f"Invalid amino acid '{aa}' at position {i + 1} in sequence"
-                )
-
-        # Parse variations and configuration
+        with metrics.timer("parse"):
+            return self._parse(lines)
+
+    def _parse(
+        self, lines: Iterable[str]
+    ) -> tuple[str, dict[int, str], dict[str, float]]:
+        """Parse without timing; see ``parse``."""
+        errors: list[str] = []
         variations: dict[int, str] = {}
         config: dict[str, float] = {"offset": 0.0}
+        seq = ""
+
+        line_count = 0
+        for line_count, line in enumerate(lines, start=1):
+            # Validate input size to prevent DoS
+            if self.max_lines is not None and line_count > self.max_lines:
+                limit = self.max_lines
+                errors.append(f"Input file too large: more than {limit} lines")
+                break
 
-        for line in lines[1:]:
             line = line.strip()
-            if line == "":
-                continue
+            try:
+                if line_count == 1:
+                    seq = line
+                    self._check_sequence(seq)
+                elif line == "":
+                    continue
+                elif line.startswith("#"):
+                    self._parse_config_line(line, config)
+                else:
+                    self._parse_variation_line(line, seq, variations)
+            except ValueError as e:
+                errors.append(f"line {line_count}: {e}")
+                if len(errors) >= self.max_errors:
+                    errors.append(f"Stopped after {self.max_errors} errors")
+                    break
+
+        if line_count == 0:
+            raise ParseError(["Input file is empty"])
+        if errors:
+            raise ParseError(errors)
+        return seq, variations, config
 
-            if line.startswith("#"):
-                self._parse_config_line(line, config)
-            else:
-                self._parse_variation_line(line, seq, variations)
+    def _check_sequence(self, seq: str) -> None:
+        """Validate the sequence line."""
+        if not seq:
+            raise ValueError("First line (sequence) cannot be empty")
+        limit = self.max_sequence_length
+        if limit is not None and len(seq) > limit:
+            raise ValueError(f"Sequence too long: {len(seq)} amino acids (max {limit})")
 
-        return seq, variations, config
+        # Validate sequence contains only valid amino acids
+        invalid = seq.translate(_STRIP_VALID)
+        if invalid:
+            aa = invalid[0]
+            position = seq.index(aa) + 1
+            raise ValueError(
+                f"Invalid amino acid '{aa}' at position {position} in sequence"
+            )
 
     def _parse_config_line(self, line: str, config: dict[str, float]) -> None:
         """Parse a configuration line starting with #."""
-        if re.match(r"#\s*\w+\s*=\s*\d+\.?\d*", line):
+        if _CONFIG_LINE.match(line):
             # Get the name of the variable with validation
-            var_match = re.search(r"\w+", line[1:])
+            var_match = _WORD.search(line, 1)
             if not var_match:
                 raise ValueError(f"Invalid configuration line: {line}")
             var_name = var_match.group()
@@ -75,7 +148,7 @@ class InputParser:
                 )
 
             # Get the value of the variable with validation
-            val_match = re.search(r"\d+\.?\d*", line[1:])
+            val_match = _NUMBER.search(line, 1)
             if not val_match:
                 raise ValueError(f"Invalid configuration value in line: {line}")
             var_value = float(val_match.group())
@@ -103,7 +176,7 @@ class InputParser:
         original_aa = line[0]
 
         # Get the position number
-        pos_match = re.search(r"\d+", line[1:])
+        pos_match = _POSITION.search(line, 1)
         if not pos_match:
             raise ValueError(f"No position number found in line: {line}")
         position = int(pos_match.group())
@@ -116,7 +189,7 @@ class InputParser:
             )
 
         # Get the list of amino acids to be used for the degenerate codon
-        aas = line[1 + pos_match.end() :]
+        aas = line[pos_match.end() :]
 
         # Validate we have amino acids specified
         if not aas:
@@ -130,9 +203,9 @@ class InputParser:
             )
 
         # Check that all the amino acids in the list are valid
-        for aa in aas:
-            if aa not in self.valid_aas:
-                raise ValueError(f"Amino acid {aa} is not valid")
+        invalid = aas.translate(_STRIP_VALID)
+        if invalid:
+            raise ValueError(f"Amino acid {invalid[0]} is not valid")
 
         # Add the variation to the dictionary
         variations[position] = aas
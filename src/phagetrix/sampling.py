@@ -0,0 +1,226 @@
+"""
+Monte Carlo sampling of clones from an optimised design.
+
+Every position of a design is a distribution over the 64 concrete codons:
+each degenerate base stands for its concrete bases with equal probability,
+trimer blocks for their codons in proportion to their weights, and mixture
+positions weight their codons by the mixing ratios. Clones are
+drawn in batches with NumPy, one uniform random number per codon, and
+translated with the generator's codon table. NumPy is an optional
+dependency; install it with ``pip install phagetrix[numpy]``.
+"""
+
+from collections.abc import Iterator
+from typing import IO, Any
+
+from . import api
+from .core import DegenerateCodonGenerator
+from .matrix import CONCRETE_BASES, require_numpy
+
+DEFAULT_BATCH_SIZE = 100_000
+
+# Tolerance for comparing codon probabilities
+_EPSILON = 1e-12
+
+_CONCRETE_CODONS = [
+    b1 + b2 + b3
+    for b1 in CONCRETE_BASES
+    for b2 in CONCRETE_BASES
+    for b3 in CONCRETE_BASES
+]
+
+
+def _codon_weights(generator: DegenerateCodonGenerator, codon: str) -> list[float]:
+    """Probability of each of the 64 concrete codons for a degenerate codon."""
+    weights = [0.0] * 64
+    normal_codons = generator.get_normal_codons(codon)
+    share = 1.0 / len(normal_codons)
+    for normal_codon in normal_codons:
+        weights[_CONCRETE_CODONS.index(normal_codon)] += share
+    return weights
+
+
+def _position_tables(result: dict[str, Any]) -> tuple[Any, Any]:
+    """Codon probabilities per position and the amino acid table."""
+    numpy = require_numpy()
+    generator = api.get_generator(result["company"], result["species"])
+    mixtures = {int(pos): m for pos, m in result.get("mixtures", {}).items()}
+
+    rows = []
+    for pos, codon in enumerate(result["degenerate_codons"], start=1):
+        mixture = mixtures.get(pos)
+        if mixture is None:
+            rows.append(_codon_weights(generator, codon))
+            continue
+        row = [0.0] * 64
+        for part, ratio in zip(mixture["codons"], mixture["ratios"], strict=True):
+            for column, weight in enumerate(_codon_weights(generator, part)):
+                row[column] += ratio * weight
+        rows.append(row)
+
+    aa_bytes = numpy.frombuffer(
+        "".join(generator.codon_to_aa[c] for c in _CONCRETE_CODONS).encode("ascii"),
+        dtype=numpy.uint8,
+    )
+    return numpy.array(rows, dtype=numpy.float64), aa_bytes
+
+
+def iter_library_samples(
+    result: dict[str, Any],
+    n: int,
+    seed: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """
+    Draw random clones from a design, a batch at a time.
+
+    Args:
+        result: An ``optimize_codons`` result
+        n: Number of clones to draw
+        seed: Seed for reproducible samples (the same seed and batch size
+            give the same clones)
+        batch_size: Clones per batch
+
+    Yields:
+        Dictionaries containing, for the clones of one batch:
+        - "codons": uint8 array (clones x positions) of concrete codon
+          indices, 16 * first + 4 * second + third base in ACGT order
+        - "proteins": uint8 array (clones x positions) of amino acid
+          letters as ASCII codes
+    """
+    if n < 0:
+        raise ValueError(f"Number of clones must not be negative, got {n}")
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+    numpy = require_numpy()
+    weights, aa_bytes = _position_tables(result)
+    rng = numpy.random.default_rng(seed)
+    length = len(weights)
+
+    # A single degenerate codon makes its concrete codons equally likely,
+    # so a random number scales straight to one of them; only mixtures
+    # search cumulative probabilities. Fixed positions need no randomness.
+    fixed: list[tuple[int, int]] = []
+    uniform: list[tuple[int, Any]] = []
+    weighted: list[tuple[int, Any, Any]] = []
+    for column, row in enumerate(weights):
+        options = numpy.flatnonzero(row > _EPSILON)
+        if len(options) == 1:
+            fixed.append((column, int(options[0])))
+        elif numpy.ptp(row[options]) <= _EPSILON:
+            uniform.append((column, options.astype(numpy.uint8)))
+        else:
+            cumulative = numpy.cumsum(row[options])
+            # Rounding must never leave a random number past the last codon
+            cumulative[-1] = numpy.inf
+            weighted.append((column, options.astype(numpy.uint8), cumulative))
+
+    for start in range(0, n, batch_size):
+        size = min(batch_size, n - start)
+        codons = numpy.empty((size, length), dtype=numpy.uint8)
+        for column, codon in fixed:
+            codons[:, column] = codon
+        draws = rng.random((len(uniform) + len(weighted), size))
+        for row, (column, options) in enumerate(uniform):
+            index = (draws[row] * len(options)).astype(numpy.intp)
+            codons[:, column] = options[numpy.minimum(index, len(options) - 1)]
+        for row, (column, options, cumulative) in enumerate(weighted, len(uniform)):
+            index = numpy.searchsorted(cumulative, draws[row], side="right")
+            codons[:, column] = options[index]
+        yield {"codons": codons, "proteins": aa_bytes[codons]}
+
+
+def sample_library(
+    result: dict[str, Any],
+    n: int,
+    seed: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[str, Any]:
+    """
+    Draw random clones from a design.
+
+    Args:
+        result: An ``optimize_codons`` result
+        n: Number of clones to draw
+        seed: Seed for reproducible samples
+        batch_size: Clones drawn per NumPy batch
+
+    Returns:
+        Dictionary with "codons" and "proteins" arrays for all clones, as
+        yielded by ``iter_library_samples``. ``to_dna`` turns the codons
+        into DNA, and ``array.view(f"S{array.shape[1]}")`` gives one bytes
+        string per clone.
+
+    Example:
+        >>> result = optimize_codons("ACDEF", {1: "AG", 3: "DEF"})
+        >>> clones = sample_library(result, 1_000_000, seed=1)
+        >>> clones["proteins"].shape
+        (1000000, 5)
+    """
+    numpy = require_numpy()
+    batches = list(iter_library_samples(result, n, seed, batch_size))
+    length = len(result["degenerate_codons"])
+    if not batches:
+        empty = numpy.empty((0, length), dtype=numpy.uint8)
+        return {"codons": empty, "proteins": empty.copy()}
+    return {
+        "codons": numpy.concatenate([b["codons"] for b in batches]),
+        "proteins": numpy.concatenate([b["proteins"] for b in batches]),
+    }
+
+
+def to_dna(codons: Any) -> Any:
+    """
+    Concrete codon indices to DNA.
+
+    Args:
+        codons: uint8 array (clones x positions) from ``sample_library``
+
+    Returns:
+        uint8 array (clones x 3 * positions) of DNA bases as ASCII codes
+    """
+    numpy = require_numpy()
+    codon_bytes = numpy.frombuffer(
+        "".join(_CONCRETE_CODONS).encode("ascii"), dtype=numpy.uint8
+    ).reshape(64, 3)
+    return codon_bytes[codons].reshape(codons.shape[0], -1)
+
+
+def write_fasta(
+    result: dict[str, Any],
+    n: int,
+    outfile: IO[str],
+    seed: int | None = None,
+    molecule: str = "protein",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> None:
+    """
+    Stream random clones of a design to a FASTA file.
+
+    Only one batch of clones is held in memory at a time.
+
+    Args:
+        result: An ``optimize_codons`` result
+        n: Number of clones to draw
+        outfile: Text file to write to
+        seed: Seed for reproducible samples
+        molecule: "protein" or "dna"
+        batch_size: Clones per batch
+    """
+    if molecule not in ("protein", "dna"):
+        raise ValueError(f"Unknown molecule '{molecule}'. Available: protein, dna")
+
+    index = 0
+    for batch in iter_library_samples(result, n, seed, batch_size):
+        sequences = batch["proteins"]
+        if molecule == "dna":
+            sequences = to_dna(batch["codons"])
+        records = sequences.view(f"S{sequences.shape[1]}").ravel()
+        outfile.write(
+            "".join(
+                f">clone_{index + i}\n{record.decode('ascii')}\n"
+                for i, record in enumerate(records, start=1)
+            )
+        )
+        index += len(records)
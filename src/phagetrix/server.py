@@ -0,0 +1,403 @@
+"""
+Local HTTP/JSON service keeping codon generators warm between requests.
+
+``phagetrix serve`` starts an asyncio server on localhost. Generators are
+built once per (company, species) and shared by all requests, so clients
+pay neither interpreter start-up nor table construction per design. The
+work of each request runs in a thread pool, keeping the event loop free to
+accept concurrent connections.
+
+Endpoints (JSON request and response bodies):
+    GET  /health     Status and generator cache statistics
+    POST /optimize   Arguments of ``optimize_codons``
+    POST /stats      Arguments of ``calculate_library_stats``
+    POST /parse      {"text": <phagetrix file contents>}, optionally with
+                     max_lines and max_sequence_length below the defaults
+    POST /candidates Arguments of ``get_candidates``
+    POST /batch      {"designs": [...], "company": ..., "species": ...}
+
+Numbers too large for a float (such as the effective diversity of a very
+large library) are sent as null, keeping every response valid JSON.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from . import api
+from .parser import DEFAULT_MAX_LINES, DEFAULT_MAX_SEQUENCE_LENGTH
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 16 * 1024 * 1024
+# Largest number of designs in one batch request
+MAX_BATCH_SIZE = 10_000
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """Error answered with a status code and a JSON error message."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _variations(raw: Any) -> dict[int, str]:
+    """JSON object keys are strings; positions are integers."""
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("variations must be an object of position -> amino acids")
+    return {int(pos): aas for pos, aas in raw.items()}
+
+
+def _optimize(payload: dict[str, Any]) -> dict[str, Any]:
+    return api.optimize_codons(
+        sequence=payload["sequence"],
+        variations=_variations(payload.get("variations")),
+        company=payload.get("company", "IDT"),
+        species=payload.get("species", "e_coli"),
+        offset=int(payload.get("offset", 0)),
+        max_codons_per_position=int(payload.get("max_codons_per_position", 1)),
+    )
+
+
+def _stats(payload: dict[str, Any]) -> dict[str, Any]:
+    return api.calculate_library_stats(
+        sequence=payload["sequence"],
+        variations=_variations(payload.get("variations")),
+        company=payload.get("company", "IDT"),
+        species=payload.get("species", "e_coli"),
+    )
+
+
+def _limit(payload: dict[str, Any], key: str, default: int) -> int:
+    """A client-chosen input limit, which may only tighten the default."""
+    value = payload.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f"{key} must be a positive integer")
+    return min(value, default)
+
+
+def _parse(payload: dict[str, Any]) -> dict[str, Any]:
+    text = payload["text"]
+    if not isinstance(text, str):
+        raise ValueError("text must be a string")
+    sequence, variations, config = api.parse_lines(
+        text,
+        max_lines=_limit(payload, "max_lines", DEFAULT_MAX_LINES),
+        max_sequence_length=_limit(
+            payload, "max_sequence_length", DEFAULT_MAX_SEQUENCE_LENGTH
+        ),
+    )
+    return {"sequence": sequence, "variations": variations, "config": config}
+
+
+def _candidates(payload: dict[str, Any]) -> dict[str, Any]:
+    k = payload.get("k", 10)
+    return {
+        "candidates": api.get_candidates(
+            amino_acids=payload["amino_acids"],
+            k=None if k is None else int(k),
+            objectives=payload.get("objectives"),
+            company=payload.get("company", "IDT"),
+            species=payload.get("species", "e_coli"),
+        )
+    }
+
+
+def _batch(payload: dict[str, Any]) -> dict[str, Any]:
+    designs = payload["designs"]
+    if not isinstance(designs, list):
+        raise ValueError("designs must be a list")
+    if len(designs) > MAX_BATCH_SIZE:
+        raise ValueError(f"Too many designs: {len(designs)} (max {MAX_BATCH_SIZE})")
+
+    # Designs inherit company and species from the batch unless they set them
+    defaults: dict[str, Any] = {
+        key: payload[key]
+        for key in ("company", "species", "max_codons_per_position")
+        if key in payload
+    }
+    results = []
+    for index, design in enumerate(designs):
+        try:
+            if not isinstance(design, dict):
+                raise ValueError("design must be a JSON object")
+            result = _optimize({**defaults, **design})
+        except (KeyError, TypeError, ValueError) as e:
+            message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            result = {"error": f"design {index}: {message}"}
+        if isinstance(design, dict) and "id" in design:
+            result = {"id": design["id"], **result}
+        results.append(result)
+    return {"results": results}
+
+
+def _health(payload: dict[str, Any]) -> dict[str, Any]:
+    return {"status": "ok", "generators": api.generator_registry.info()}
+
+
+# (method, path) -> handler taking the JSON body
+ROUTES: dict[tuple[str, str], Callable[[dict[str, Any]], dict[str, Any]]] = {
+    ("GET", "/health"): _health,
+    ("POST", "/optimize"): _optimize,
+    ("POST", "/stats"): _stats,
+    ("POST", "/parse"): _parse,
+    ("POST", "/candidates"): _candidates,
+    ("POST", "/batch"): _batch,
+}
+
+
+def dispatch(method: str, path: str, body: bytes) -> tuple[int, dict[str, Any]]:
+    """
+    Answer one request.
+
+    Args:
+        method: HTTP method
+        path: Request path, without the query string
+        body: Raw request body
+
+    Returns:
+        Tuple of (status code, JSON response body)
+    """
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        if any(route_path == path for _, route_path in ROUTES):
+            return 405, {"error": f"Method {method} not allowed for {path}"}
+        return 404, {"error": f"Unknown endpoint {path}"}
+
+    try:
+        payload = json.loads(body) if body.strip() else {}
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return 400, {"error": f"Invalid JSON: {e}"}
+    if not isinstance(payload, dict):
+        return 400, {"error": "Request body must be a JSON object"}
+
+    try:
+        return 200, handler(payload)
+    except KeyError as e:
+        return 400, {"error": f"missing field {e}"}
+    except (TypeError, ValueError) as e:
+        return 400, {"error": str(e)}
+
+
+def _finite(value: Any) -> Any:
+    """Copy of a JSON value with infinite and NaN floats replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_finite(item) for item in value]
+    return value
+
+
+class PhagetrixServer:
+    """Asyncio HTTP/1.1 server answering JSON requests."""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        workers: int | None = None,
+        warm: list[tuple[str, str]] | None = None,
+    ) -> None:
+        """
+        Create the server; call ``start`` to begin listening.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            workers: Threads running requests (default: chosen by Python)
+            warm: (company, species) generators to build before listening
+        """
+        self.host = host
+        self.port = port
+        self.warm = warm if warm is not None else [("IDT", "e_coli")]
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        """Build the warm generators and start listening."""
+        loop = asyncio.get_running_loop()
+        for company, species in self.warm:
+            await loop.run_in_executor(
+                self._executor, api.get_generator, company, species
+            )
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Start if needed and answer requests until cancelled."""
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and shut down the worker threads."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # One connection: answer requests until the client closes it or
+        # asks for Connection: close
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                try:
+                    status, response = await loop.run_in_executor(
+                        self._executor, dispatch, method, path, body
+                    )
+                except Exception as e:  # Never let one request kill the server
+                    status, response = 500, {"error": f"Internal error: {e}"}
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            ValueError,  # Header line longer than the stream limit
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[str, str, bytes, bool] | None:
+        # Request line and headers; None when the client closed the connection
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line") from None
+
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length") from None
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, f"Request body larger than {MAX_BODY_SIZE} bytes")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = (
+            connection == "keep-alive"
+            if version == "HTTP/1.0"
+            else connection != "close"
+        )
+        return method.upper(), target.split("?", 1)[0], body, keep_alive
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        response: dict[str, Any],
+        keep_alive: bool,
+    ) -> None:
+        try:
+            text = json.dumps(response, allow_nan=False)
+        except ValueError:
+            text = json.dumps(_finite(response), allow_nan=False)
+        body = text.encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point of ``phagetrix serve``."""
+    parser = argparse.ArgumentParser(
+        prog="phagetrix serve",
+        description="Serve phagetrix over HTTP/JSON with warm codon generators",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Threads answering requests"
+    )
+    parser.add_argument(
+        "--warm",
+        action="append",
+        metavar="COMPANY:SPECIES",
+        help="Generator to build at start-up (repeatable, default: IDT:e_coli)",
+    )
+    parser.add_argument(
+        "--persist-tables",
+        action="store_true",
+        help="Write built codon tables to the cache directory for later runs",
+    )
+    args = parser.parse_args(argv)
+    if args.persist_tables:
+        api.generator_registry.persist = True
+
+    warm = None
+    if args.warm:
+        warm = []
+        for entry in args.warm:
+            company, _, species = entry.partition(":")
+            warm.append((company, species or "e_coli"))
+
+    server = PhagetrixServer(args.host, args.port, args.workers, warm)
+
+    async def run() -> None:
+        await server.start()
+        print(f"phagetrix serving on http://{server.host}:{server.port}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run())
@@ -0,0 +1,365 @@
+"""
+Persisted codon generator tables.
+
+Building a ``DegenerateCodonGenerator`` enumerates every degenerate codon,
+which every new process pays again. The per-codon amino acid masks,
+expanded codon counts and usage scores, together with the ranked mask
+index, are written once to a small binary file named after the generator's
+fingerprint. Later processes read the file back into flat arrays and answer
+queries from views over them, without enumerating anything.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import metrics
+from .cache import default_cache_dir
+from .constants import AMINO_ACIDS_WITH_STOP, VALID_AMINO_ACIDS
+
+if TYPE_CHECKING:
+    from .core import DegenerateCodonGenerator
+
+_MAGIC = b"PHGXGEN\0"
+_FORMAT_VERSION = 2
+# magic, format version, byte order, base count, codon count, ranked count,
+# fingerprint
+_HEADER = struct.Struct("<8sHBBII64s")
+# Placeholder for amino acids no codon codes for alone
+_NO_CODON = "---"
+
+# Loads answered from disk and tables built because no usable file existed
+_hits = 0
+_misses = 0
+
+
+def cache_info() -> dict[str, int]:
+    """Statistics of the persisted table cache in this process."""
+    return {"hits": _hits, "misses": _misses}
+
+
+metrics.register_cache("generator_tables", cache_info)
+
+
+class _CodonColumn(Mapping[str, int]):
+    # One per-codon integer array, looked up by degenerate codon
+
+    def __init__(self, tables: "GeneratorTables", values: "array[int]") -> None:
+        self._tables = tables
+        self._values = values
+
+    def __getitem__(self, degenerate_codon: str) -> int:
+        return self._values[self._tables.codon_index(degenerate_codon)]
+
+    def __iter__(self) -> Iterator[str]:
+        bases = self._tables.bases
+        return (b1 + b2 + b3 for b1 in bases for b2 in bases for b3 in bases)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class GeneratorTables:
+    """Per-codon tables and ranked mask index of one generator."""
+
+    def __init__(
+        self,
+        bases: str,
+        masks: "array[int]",
+        expanded_counts: "array[int]",
+        usage_scores: "array[int]",
+        ranked_masks: "array[int]",
+        ranked_codons: str,
+        postings: list[int],
+        single_codons: str,
+        fingerprint: str,
+    ) -> None:
+        self.bases = bases
+        self.masks = masks
+        self.expanded_counts = expanded_counts
+        self.usage_scores = usage_scores
+        # Distinct masks in ranking order and their codons, concatenated
+        self.ranked_masks = ranked_masks
+        self.ranked_codons = ranked_codons
+        # Per amino acid, the ranks whose mask contains it as a bit set
+        self.postings = postings
+        # Best codon for each amino acid of VALID_AMINO_ACIDS, concatenated
+        self.single_codons = single_codons
+        self.fingerprint = fingerprint
+        self._positions = {base: i for i, base in enumerate(bases)}
+
+    def codon_index(self, degenerate_codon: str) -> int:
+        """Position of a degenerate codon in the enumeration order."""
+        positions = self._positions
+        n = len(self.bases)
+        if len(degenerate_codon) != 3:
+            raise KeyError(degenerate_codon)
+        try:
+            return (
+                positions[degenerate_codon[0]] * n + positions[degenerate_codon[1]]
+            ) * n + positions[degenerate_codon[2]]
+        except KeyError:
+            raise KeyError(degenerate_codon) from None
+
+    @classmethod
+    def build(cls, generator: "DegenerateCodonGenerator") -> "GeneratorTables":
+        """
+        Collect the tables of a built generator.
+
+        Args:
+            generator: A generator whose mask index is built
+
+        Returns:
+            In-memory tables
+        """
+        generator._ensure_index()
+        bases = "".join(generator.degenerate_bases)
+        if len(bases) != len(generator.degenerate_bases):
+            raise ValueError("Only single-letter degenerate bases can be persisted")
+        tables = cls(
+            bases,
+            array("I"),
+            array("I"),
+            array("q"),
+            array("I", [mask for mask, _ in generator._ranked_masks]),
+            "".join(codon for _, codon in generator._ranked_masks),
+            generator._aa_postings,
+            "".join(
+                generator.single_aa_codons.get(aa, _NO_CODON)
+                for aa in VALID_AMINO_ACIDS
+            ),
+            generator.fingerprint(),
+        )
+        for b1 in bases:
+            for b2 in bases:
+                for b3 in bases:
+                    codon = b1 + b2 + b3
+                    tables.masks.append(generator.codon_masks[codon])
+                    tables.expanded_counts.append(generator.expanded_counts[codon])
+                    tables.usage_scores.append(generator.usage_scores[codon])
+        return tables
+
+    @classmethod
+    def open(cls, path: str | Path) -> "GeneratorTables":
+        """
+        Read a table file written by ``save``.
+
+        Args:
+            path: Path of the table file
+
+        Returns:
+            The stored tables
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if len(data) < _HEADER.size:
+            raise ValueError(f"Generator tables {path} are truncated")
+        magic, version, byteorder, base_count, count, ranked_count, fingerprint = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Generator tables {path} have an unsupported format")
+        if byteorder != (sys.byteorder == "little"):
+            raise ValueError(f"Generator tables {path} have a foreign byte order")
+        if count != base_count**3:
+            raise ValueError(f"Generator tables {path} are inconsistent")
+
+        offset = _HEADER.size
+        columns = []
+        for typecode, length in (
+            ("I", count),
+            ("I", count),
+            ("q", count),
+            ("I", ranked_count),
+        ):
+            column = array(typecode)
+            end = offset + column.itemsize * length
+            column.frombytes(data[offset:end])
+            columns.append(column)
+            offset = end
+        width = _posting_width(ranked_count)
+        postings = []
+        for _ in AMINO_ACIDS_WITH_STOP:
+            postings.append(int.from_bytes(data[offset : offset + width], "little"))
+            offset += width
+        text = data[offset:].decode("ascii")
+        single_length = 3 * len(VALID_AMINO_ACIDS)
+        if len(text) != base_count + 3 * ranked_count + single_length:
+            raise ValueError(f"Generator tables {path} are truncated")
+
+        masks, expanded_counts, usage_scores, ranked_masks = columns
+        return cls(
+            text[:base_count],
+            masks,
+            expanded_counts,
+            usage_scores,
+            ranked_masks,
+            text[base_count:-single_length],
+            postings,
+            text[-single_length:],
+            fingerprint.decode("ascii"),
+        )
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the tables to disk atomically.
+
+        Args:
+            path: Destination of the table file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            sys.byteorder == "little",
+            len(self.bases),
+            len(self.masks),
+            len(self.ranked_masks),
+            self.fingerprint.encode("ascii"),
+        )
+
+        # Write next to the destination and rename, so concurrent readers
+        # never see a partially written file
+        import tempfile
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                for column in (
+                    self.masks,
+                    self.expanded_counts,
+                    self.usage_scores,
+                    self.ranked_masks,
+                ):
+                    f.write(column.tobytes())
+                width = _posting_width(len(self.ranked_masks))
+                for posting in self.postings:
+                    f.write(posting.to_bytes(width, "little"))
+                f.write(
+                    (self.bases + self.ranked_codons + self.single_codons).encode(
+                        "ascii"
+                    )
+                )
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def install(self, generator: "DegenerateCodonGenerator") -> None:
+        """
+        Give a generator these tables instead of enumerating its codons.
+
+        ``degenerate_codons`` and ``amino_acid_dict`` become views that
+        expand entries on first access, as for lazy generators.
+
+        Args:
+            generator: Generator with the same fingerprint as the tables
+        """
+        from .core import _LazyAminoAcidDict, _LazyDegenerateCodons
+
+        generator.codon_masks = _CodonColumn(self, self.masks)
+        generator.expanded_counts = _CodonColumn(self, self.expanded_counts)
+        generator.usage_scores = _CodonColumn(self, self.usage_scores)
+        ranked = self.ranked_codons
+        generator._ranked_masks = list(
+            zip(
+                self.ranked_masks,
+                [ranked[i : i + 3] for i in range(0, len(ranked), 3)],
+                strict=True,
+            )
+        )
+        generator.mask_index = dict(generator._ranked_masks)
+        generator._aa_postings = list(self.postings)
+        single = self.single_codons
+        generator.single_aa_codons = {
+            aa: single[3 * i : 3 * i + 3]
+            for i, aa in enumerate(VALID_AMINO_ACIDS)
+            if single[3 * i : 3 * i + 3] != _NO_CODON
+        }
+        generator.degenerate_codons = _LazyDegenerateCodons(generator)
+        generator.amino_acid_dict = _LazyAminoAcidDict(generator)
+        generator._index_ready = True
+
+
+def _posting_width(ranked_count: int) -> int:
+    """Bytes holding one posting bit set."""
+    return (ranked_count + 7) // 8
+
+
+def table_path(
+    fingerprint: str, cache_dir: str | Path | None = None, bases: str = ""
+) -> Path:
+    """
+    Location of the table file for a generator fingerprint.
+
+    Args:
+        fingerprint: ``DegenerateCodonGenerator.fingerprint()``
+        cache_dir: Directory holding table files (default: user cache)
+        bases: The generator's degenerate bases, in order
+
+    Returns:
+        Path of the table file
+    """
+    directory = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+    # The fingerprint ignores the order of the bases, the tables do not;
+    # vendors selling the same bases in another order need their own file
+    key = hashlib.sha256(f"{fingerprint}:{bases}".encode()).hexdigest()
+    return directory / f"generator-{key[:32]}.bin"
+
+
+def load_tables(
+    generator: "DegenerateCodonGenerator", cache_dir: str | Path | None = None
+) -> bool:
+    """
+    Install persisted tables into a generator, if a matching file exists.
+
+    Args:
+        generator: Generator whose tables are not built yet
+        cache_dir: Directory holding table files (default: user cache)
+
+    Returns:
+        Whether tables were loaded; a missing, damaged or stale file
+        returns False
+    """
+    global _hits, _misses
+    fingerprint = generator.fingerprint()
+    bases = "".join(generator.degenerate_bases)
+    try:
+        tables = GeneratorTables.open(table_path(fingerprint, cache_dir, bases))
+    except (OSError, ValueError):
+        tables = None
+    if tables is None or tables.fingerprint != fingerprint or tables.bases != bases:
+        _misses += 1
+        return False
+    tables.install(generator)
+    _hits += 1
+    return True
+
+
+def save_tables(
+    generator: "DegenerateCodonGenerator", cache_dir: str | Path | None = None
+) -> None:
+    """
+    Persist the tables of a built generator for later processes.
+
+    The cache is an optimisation: unwritable directories and bases that
+    cannot be stored are silently skipped.
+
+    Args:
+        generator: Generator with built tables
+        cache_dir: Directory holding table files (default: user cache)
+    """
+    try:
+        tables = GeneratorTables.build(generator)
+        tables.save(table_path(tables.fingerprint, cache_dir, tables.bases))
+    except (OSError, ValueError):
+        pass
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _isolated_cache_dir(tmp_path_factory):
+    """Keep tables persisted by the tests out of the user's cache."""
+    previous = os.environ.get("PHAGETRIX_CACHE_DIR")
+    os.environ["PHAGETRIX_CACHE_DIR"] = str(tmp_path_factory.mktemp("cache"))
+    yield
+    if previous is None:
+        del os.environ["PHAGETRIX_CACHE_DIR"]
+    else:
+        os.environ["PHAGETRIX_CACHE_DIR"] = previous
@@ -1,7 +1,9 @@
 """Tests for the phagetrix API module."""
 
+import io
 import os
 import tempfile
+import threading
 
 import pytest
 
@@ -110,6 +112,28 @@ def test_parse_phagetrix_file_nonexistent():
         api.parse_phagetrix_file("/nonexistent/file.phagetrix")
 
 
+def test_parse_lines():
+    """Test parsing input from a string and from a list of lines."""
+    text = "VLAYMVAQVQ\nA3AGVIL\n#offset=5\n"
+
+    from_string = api.parse_lines(text)
+    from_lines = api.parse_lines(text.splitlines(keepends=True))
+
+    assert from_string == from_lines
+    assert from_string == ("VLAYMVAQVQ", {3: "AGVIL"}, {"offset": 5.0})
+
+
+def test_parse_stream(monkeypatch):
+    """Test parsing from a file object and from stdin."""
+    text = "VLAYMVAQVQ\nY4YFW\n"
+    expected = ("VLAYMVAQVQ", {4: "YFW"}, {"offset": 0.0})
+
+    assert api.parse_stream(io.StringIO(text)) == expected
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(text))
+    assert api.parse_stream("-") == expected
+
+
 def test_get_available_companies():
     """Test getting available companies."""
     companies = api.get_available_companies()
@@ -227,3 +251,201 @@ def test_api_convenience_aliases():
         assert config1 == config2
     finally:
         os.unlink(temp_path)
+
+
+def test_generator_registry_reuses_generators():
+    """Test that the registry shares one generator per company and species."""
+    registry = api.GeneratorRegistry(maxsize=2)
+
+    first = registry.get("IDT", "e_coli")
+    second = registry.get("IDT", "e_coli_316407")  # alias resolves to same key
+
+    assert first is second
+    assert registry.info() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "size": 1,
+        "maxsize": 2,
+    }
+
+
+def test_generator_registry_evicts_least_recently_used():
+    """Test that the registry stays within its size bound."""
+    registry = api.GeneratorRegistry(maxsize=1)
+
+    idt = registry.get("IDT")
+    registry.get("NEB")
+
+    assert registry.info()["evictions"] == 1
+    assert registry.get("IDT") is not idt
+
+    registry.clear()
+    assert registry.info()["size"] == 0
+    assert registry.info()["misses"] == 0
+
+
+def test_generator_registry_builds_outside_the_lock(monkeypatch):
+    """Test that a slow build blocks neither other keys nor builds twice."""
+    registry = api.GeneratorRegistry(persist=False)
+    idt = registry.get("IDT")
+    started, release = threading.Event(), threading.Event()
+    builds = []
+    build = api.DegenerateCodonGenerator
+
+    def slow_build(**kwargs):
+        builds.append(kwargs)
+        started.set()
+        release.wait(10)
+        return build(**kwargs)
+
+    monkeypatch.setattr(api, "DegenerateCodonGenerator", slow_build)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("NEB")))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    assert started.wait(10)
+    hit = threading.Thread(target=lambda: results.append(registry.get("IDT")))
+    hit.start()
+    hit.join(5)
+    assert results == [idt]  # Answered while NEB is still being built
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert results[1] is results[2]
+    assert registry.info()["misses"] == 2
+
+
+def test_generator_registry_rejects_unknown_inputs():
+    """Test that the registry validates company and species."""
+    registry = api.GeneratorRegistry()
+
+    with pytest.raises(ValueError, match="Unknown company"):
+        registry.get("InvalidCompany")
+    with pytest.raises(ValueError, match="Unknown species"):
+        registry.get("IDT", "invalid_species")
+
+
+def test_optimize_many_matches_optimize_codons():
+    """Test that batch results equal single results, in order."""
+    designs = [
+        ("ACDEF", {1: "AG", 3: "DEF"}),
+        ("VLAYMVAQVQ", {3: "AGVIL", 4: "YFW"}),
+        ("GHIKL", {2: "HK"}),
+    ]
+    expected = [api.optimize_codons(seq, variations) for seq, variations in designs]
+
+    assert api.optimize_many(designs, workers=1) == expected
+    assert api.optimize_many(designs, workers=2, chunksize=1) == expected
+
+
+def test_optimize_many_propagates_errors():
+    """Test that an invalid design fails the batch."""
+    with pytest.raises(ValueError, match="Invalid amino acid"):
+        api.optimize_many([("ACDEF", {}), ("ACXEF", {})], workers=1)
+
+
+@pytest.fixture
+def trimer_vendor():
+    """Register a vendor with trimer blocks for one test."""
+    api.register_vendor(
+        "TrimerCo",
+        api.get_degenerate_codons("IDT"),
+        trimers={"X": ["GCT", "GAT", "TTT"], "Z": {"GCT": 4, "GGT": 2}},
+    )
+    yield "TrimerCo"
+    api.degenerate.pop("TrimerCo")
+    api.trimer_blocks.pop("TrimerCo", None)
+    api.generator_registry.discard("TrimerCo")
+
+
+def test_register_vendor_with_trimers(trimer_vendor):
+    """Test that registered trimer blocks are chosen and counted."""
+    assert trimer_vendor in api.get_available_companies()
+    result = api.optimize_codons("ACDEF", {1: "ADF", 3: "AG"}, company=trimer_vendor)
+    # An equimolar pair beats the 2:1 blend for A and G
+    assert result["degenerate_codons"][:3] == ["X", "TGC", "GSC"]
+    # Weights are reduced to the smallest equivalent blend
+    assert api.trimer_blocks[trimer_vendor]["Z"] == {"GCT": 2, "GGT": 1}
+
+    stats = api.calculate_library_stats("ACDEF", {1: "ADF"}, company=trimer_vendor)
+    assert stats["distinct_variants"] == 3
+
+
+def test_register_vendor_replaces_cached_generator(trimer_vendor):
+    """Test that replacing a vendor drops generators built for it."""
+    assert api.get_generator(trimer_vendor).get_best_degenerate_codon("ADF") == "X"
+    with pytest.raises(ValueError, match="already exists"):
+        api.register_vendor(trimer_vendor)
+    api.register_vendor(trimer_vendor, {"N": "ACGT"}, replace=True)
+    assert api.get_generator(trimer_vendor).get_best_degenerate_codon("ADF") != "X"
+
+
+def test_lookup_table_with_many_trimer_blocks(tmp_path):
+    """Test that vendors with more blocks than ASCII letters get tables."""
+    codon_to_aa = api.get_generator().codon_to_aa
+    sense = [codon for codon, aa in codon_to_aa.items() if aa != "*"]
+    pairs = [
+        (first, second)
+        for i, first in enumerate(sense)
+        for second in sense[i + 1 :]
+        if codon_to_aa[first] != codon_to_aa[second]
+    ]
+    blocks = {chr(0x100 + i): list(pair) for i, pair in enumerate(pairs[::15])}
+    assert len(blocks) > 100
+    api.register_vendor("ManyBlockCo", api.get_degenerate_codons("IDT"), blocks)
+    try:
+        vendor = api.get_generator("ManyBlockCo")
+        table = api.get_lookup_table("ManyBlockCo", cache_dir=tmp_path)
+        try:
+            chosen = set()
+            for codons in blocks.values():
+                amino_acids = "".join(codon_to_aa[c] for c in codons)
+                best = vendor.get_best_degenerate_codon(amino_acids)
+                assert table.get_best_degenerate_codon(amino_acids) == best
+                chosen.add(best)
+            assert chosen & set(blocks)
+        finally:
+            table.close()
+    finally:
+        api.degenerate.pop("ManyBlockCo")
+        api.trimer_blocks.pop("ManyBlockCo", None)
+        api.generator_registry.discard("ManyBlockCo")
+
+
+@pytest.mark.parametrize(
+    "bases, trimers, message",
+    [
+        ({"RR": "AG"}, None, "single letter"),
+        ({"R": "AU"}, None, "some of A, C, G, T"),
+        ({"A": "AG"}, None, "cannot stand for"),
+        ({"N": "ACGT"}, {"NNA": ["GCT"]}, "single letter"),
+        (None, {"X2": ["GCT"]}, "single letter"),
+        (None, {"": ["GCT"]}, "single letter"),
+        ({"N": "ACGT"}, {"N": ["GCT"]}, "name of a degenerate base"),
+        (None, {"A": ["GCT"]}, "name of a degenerate base"),
+        (None, {"X": []}, "no codons"),
+        (None, {"X": ["GCU"]}, "invalid codon"),
+        (None, {"X": {"GCT": 0.5}}, "positive integer"),
+    ],
+)
+def test_register_vendor_rejects_invalid_alphabets(bases, trimers, message):
+    """Test that malformed vendor definitions are reported."""
+    with pytest.raises(ValueError, match=message):
+        api.register_vendor("BrokenCo", bases, trimers)
+    assert "BrokenCo" not in api.get_available_companies()
+
+
+def test_get_candidates():
+    """Test that candidates start with the codon optimize_codons picks."""
+    result = api.optimize_codons("ACDEF", {3: "AGVIL"})
+    candidates = api.get_candidates("AGVIL", k=3, company="IDT")
+    assert len(candidates) == 3
+    assert candidates[0]["codon"] == result["degenerate_codons"][2]
+    with pytest.raises(ValueError, match="Unknown amino acid"):
+        api.get_candidates("AX")
@@ -0,0 +1,102 @@
+"""Tests for the diversity-budget optimiser."""
+
+import itertools
+import math
+
+import pytest
+
+from phagetrix import api
+from phagetrix.budget import optimize_for_budget, position_options
+
+SEQUENCE = "ACDEFGHIKL"
+VARIATIONS = {2: "ACDEFGHIKLMNPQRSTVWY", 5: "FWYL", 7: "DEKR", 9: "AGVIL"}
+
+
+def _size(result, measure="dna"):
+    generator = api.get_generator()
+    if measure == "dna":
+        counts = [generator.expanded_counts[c] for c in result["degenerate_codons"]]
+    else:
+        counts = [
+            generator.codon_masks[c].bit_count() for c in result["degenerate_codons"]
+        ]
+    return math.prod(counts)
+
+
+def test_options_trade_size_for_amino_acids():
+    """Test that every option keeps more amino acids for a higher cost."""
+    options = position_options(api.get_generator(), "ACDEFGHIKLMNPQRSTVWY")
+    costs = [cost for cost, _, _, _ in options]
+    values = [value for _, value, _, _ in options]
+    assert costs == sorted(set(costs))
+    assert values == sorted(set(values))
+    assert options[0][:2] == (1, 1)
+    assert options[-1][1] == 20
+
+
+@pytest.mark.parametrize("budget", [1, 10, 1_000, 100_000])
+def test_budget_is_respected_and_optimal(budget):
+    """Test the solution against trying every combination of options."""
+    result = optimize_for_budget(SEQUENCE, VARIATIONS, budget)
+    assert result["budget"]["library_size"] == _size(result) <= budget
+
+    generator = api.get_generator()
+    choices = [position_options(generator, VARIATIONS[p]) for p in sorted(VARIATIONS)]
+    best = max(
+        math.prod(value for _, value, _, _ in combination)
+        for combination in itertools.product(*choices)
+        if math.prod(cost for cost, _, _, _ in combination) <= budget
+    )
+    assert result["budget"]["intended_variants"] == best
+
+
+def test_kept_variations_reproduce_the_codons():
+    """Test that the reduced variations give the same design on their own."""
+    result = optimize_for_budget(SEQUENCE, VARIATIONS, 5_000)
+    again = api.optimize_codons(SEQUENCE, result["variations"])
+    assert again["degenerate_codons"] == result["degenerate_codons"]
+    for pos, requested in VARIATIONS.items():
+        kept = result["variations"][pos]
+        assert sorted(kept + result["budget"]["dropped"].get(pos, "")) == sorted(
+            requested
+        )
+
+
+def test_large_budget_keeps_everything():
+    """Test that a design that fits is returned unchanged."""
+    result = optimize_for_budget(SEQUENCE, VARIATIONS, 10**12)
+    assert result["budget"]["coverage"] == 1.0
+    assert result["budget"]["dropped"] == {}
+    assert (
+        result["degenerate_codons"]
+        == api.optimize_codons(SEQUENCE, VARIATIONS)["degenerate_codons"]
+    )
+
+
+def test_front_and_protein_measure():
+    """Test the trade-off curve and the protein-variant limit."""
+    result = optimize_for_budget(SEQUENCE, VARIATIONS, 1_000, measure="protein")
+    assert _size(result, "protein") == result["budget"]["library_size"] <= 1_000
+    front = result["budget"]["front"]
+    assert [p["library_size"] for p in front] == sorted(
+        p["library_size"] for p in front
+    )
+    assert front[-1]["intended_variants"] == result["budget"]["intended_variants"]
+
+
+def test_hundreds_of_positions():
+    """Test that long designs are solved."""
+    sequence = "ACDEFGHIKLMNPQRSTVWY" * 15
+    variations = {pos: "AGVILFWY" for pos in range(1, len(sequence) + 1, 2)}
+    result = optimize_for_budget(sequence, variations, 10**9)
+    assert result["budget"]["library_size"] == _size(result) <= 10**9
+
+
+def test_invalid_budgets():
+    """Test that impossible requests are reported."""
+    with pytest.raises(ValueError, match="at least 1"):
+        optimize_for_budget(SEQUENCE, VARIATIONS, 0)
+    with pytest.raises(ValueError, match="Unknown measure"):
+        optimize_for_budget(SEQUENCE, VARIATIONS, 10, measure="rna")
+    with pytest.raises(ValueError, match="out of range"):
+        optimize_for_budget(SEQUENCE, {20: "AG"}, 10)
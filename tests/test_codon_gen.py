@@ -1,3 +1,9 @@
+import random
+
+import pytest
+import python_codon_tables as pct
+
+from phagetrix.constants import AMINO_ACIDS_WITH_STOP
 from phagetrix.core import DegenerateCodonGenerator
 
 
@@ -15,3 +21,269 @@ def test_pairs_of_aminoacid_codons():
     s = "FLIMVSPTAYHQNKDECWRSG"
 
     assert codon_gen.get_best_degenerate_codon(s) in ["NNS", "NNN", "NNK"]
+
+
+def test_mask_index_matches_full_scan():
+    codon_gen = DegenerateCodonGenerator()
+    rng = random.Random(1)
+    for _ in range(200):
+        target = "".join(rng.sample(AMINO_ACIDS_WITH_STOP, rng.randint(1, 8)))
+        candidates = [
+            codon
+            for codon, meta in codon_gen.degenerate_codons.items()
+            if set(target) <= set(meta["aas"])
+        ]
+        expected = min(candidates, key=codon_gen._rank_key)
+        assert codon_gen.get_best_degenerate_codon(target) == expected
+
+
+def test_query_ignores_order_and_repeats():
+    codon_gen = DegenerateCodonGenerator()
+    best = codon_gen.get_best_degenerate_codon("AGVIL")
+    assert codon_gen.get_best_degenerate_codon("LIVGA") == best
+    assert codon_gen.get_best_degenerate_codon("AAGVIL") == best
+
+
+def test_unknown_amino_acid_rejected():
+    codon_gen = DegenerateCodonGenerator()
+    with pytest.raises(ValueError, match="Unknown amino acid"):
+        codon_gen.get_best_degenerate_codon("AX")
+
+
+def test_memo_shares_equivalent_queries():
+    codon_gen = DegenerateCodonGenerator(memo_size=2)
+    for query in ["AGVIL", "LIVGA", "AAGVIL"]:
+        codon_gen.get_best_degenerate_codon(query)
+    assert codon_gen.memo_info() == {"hits": 2, "misses": 1, "size": 1, "maxsize": 2}
+
+    # Single amino acids resolve through the precomputed table
+    codon_gen.get_best_degenerate_codon("W")
+    assert codon_gen.memo_info()["size"] == 1
+
+    codon_gen.get_best_degenerate_codon("HQ")
+    codon_gen.get_best_degenerate_codon("DE")
+    assert codon_gen.memo_info()["size"] == 2
+    assert codon_gen.get_best_degenerate_codon("AGVIL") == codon_gen._search(
+        codon_gen.get_amino_acid_mask("AGVIL"), "AGVIL"
+    )
+
+
+def test_memo_can_be_disabled():
+    codon_gen = DegenerateCodonGenerator(memo_size=0)
+    assert codon_gen.get_best_degenerate_codon("HQ") in ["CAM", "CAK", "CAS", "CAW"]
+    assert codon_gen.memo_info()["size"] == 0
+
+
+def test_numpy_backend_matches_python_backend():
+    pytest.importorskip("numpy")
+    python_gen = DegenerateCodonGenerator()
+    numpy_gen = DegenerateCodonGenerator(backend="numpy")
+
+    assert numpy_gen._ranked_masks == python_gen._ranked_masks
+    assert numpy_gen.usage_scores == python_gen.usage_scores
+    assert numpy_gen.amino_acid_dict == python_gen.amino_acid_dict
+    assert len(numpy_gen.degenerate_codons) == len(python_gen.degenerate_codons)
+    for codon, meta in python_gen.degenerate_codons.items():
+        assert numpy_gen.degenerate_codons[codon]["aas"] == dict(meta["aas"])
+        assert (
+            numpy_gen.degenerate_codons[codon]["expanded_codon_count"]
+            == meta["expanded_codon_count"]
+        )
+
+
+def test_numpy_backend_vectorised_metrics():
+    pytest.importorskip("numpy")
+    codon_gen = DegenerateCodonGenerator(backend="numpy")
+    matrix = codon_gen.matrix
+
+    row = matrix.codon_index["NNK"]
+    assert matrix.diversity()[row] == 32
+    assert matrix.off_target_counts("*")[row] == 31
+    assert matrix.efficiency("FLIMVSPTAYHQNKDECWRG")[row] == 31 / 32
+    assert matrix.covers(codon_gen.get_amino_acid_mask("HQ"))[matrix.codon_index["CAK"]]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        DegenerateCodonGenerator(backend="fortran")
+
+
+def test_lazy_mode_matches_eager_mode():
+    eager_gen = DegenerateCodonGenerator()
+    lazy_gen = DegenerateCodonGenerator(lazy=True)
+
+    # Nothing beyond the per-base tables is built before the first query
+    assert not lazy_gen._index_ready
+    assert lazy_gen.get_best_degenerate_codon("HQ") == (
+        eager_gen.get_best_degenerate_codon("HQ")
+    )
+    assert lazy_gen._ranked_masks == eager_gen._ranked_masks
+    assert lazy_gen.usage_scores == eager_gen.usage_scores
+
+    assert lazy_gen.degenerate_codons["NNK"]["expanded_codon_count"] == 32
+    assert dict(lazy_gen.degenerate_codons["NNK"]["aas"]) == dict(
+        eager_gen.degenerate_codons["NNK"]["aas"]
+    )
+    assert set(lazy_gen.amino_acid_dict) == set(eager_gen.amino_acid_dict)
+    assert lazy_gen.amino_acid_dict["W"] == eager_gen.amino_acid_dict["W"]
+
+
+def test_species_codon_usage_breaks_ties():
+    e_coli_gen = DegenerateCodonGenerator(
+        codon_frequency=pct.get_codons_table("e_coli_316407")
+    )
+    human_gen = DegenerateCodonGenerator(
+        codon_frequency=pct.get_codons_table("h_sapiens_9606")
+    )
+
+    # Most used alanine codon of each host
+    assert e_coli_gen.get_best_degenerate_codon("A") == "GCG"
+    assert human_gen.get_best_degenerate_codon("A") == "GCC"
+    # Same amino acids and permutations, different preferred codon
+    assert e_coli_gen.get_best_degenerate_codon("HQ") == "CAK"
+    assert human_gen.get_best_degenerate_codon("HQ") == "CAS"
+
+
+def test_codon_table_without_frequencies_is_accepted():
+    table = pct.get_codons_table("e_coli_316407")
+    codon_gen = DegenerateCodonGenerator(
+        codon_frequency={aa: list(codons) for aa, codons in table.items()}
+    )
+    assert codon_gen.get_best_degenerate_codon("A") in ["GCT", "GCC", "GCA", "GCG"]
+
+
+# Trimer mix of one preferred E. coli codon per amino acid, without Cys
+TRIMER_19 = {
+    "X": [
+        "GCG", "GAT", "GAA", "TTT", "GGC", "CAT", "ATT", "AAA", "CTG", "ATG",
+        "AAC", "CCG", "CAG", "CGT", "AGC", "ACC", "GTG", "TGG", "TAT",
+    ],
+}  # fmt: skip
+
+
+def _trimer_generator(**kwargs):
+    trimers = {name: dict.fromkeys(codons, 1) for name, codons in TRIMER_19.items()}
+    trimers["AD"] = {"GCT": 2, "GAT": 1}
+    return DegenerateCodonGenerator(trimers=trimers, **kwargs)
+
+
+def test_trimer_blocks_are_candidates():
+    codon_gen = _trimer_generator()
+    # 19 amino acids without stop or Cys: NNK would add both
+    assert codon_gen.get_best_degenerate_codon("ADEFGHIKLMNPQRSTVWY") == "X"
+    # The 2:1 blend has more permutations than the equimolar GMT
+    assert codon_gen.get_best_degenerate_codon("AD") == "GMT"
+    assert codon_gen.degenerate_codons["AD"] == {
+        "aas": {"A": 2, "D": 1},
+        "expanded_codon_count": 3,
+    }
+    assert "X" in codon_gen.amino_acid_dict["W"]
+
+
+def test_trimer_search_matches_full_scan():
+    codon_gen = _trimer_generator()
+    rng = random.Random(4)
+    for _ in range(200):
+        target = "".join(rng.sample(AMINO_ACIDS_WITH_STOP, rng.randint(1, 20)))
+        candidates = [
+            codon
+            for codon, meta in codon_gen.degenerate_codons.items()
+            if set(target) <= set(meta["aas"])
+        ]
+        expected = min(candidates, key=codon_gen._rank_key)
+        assert codon_gen.get_best_degenerate_codon(target) == expected
+
+
+def test_lazy_generator_with_trimers_matches_eager():
+    eager = _trimer_generator()
+    lazy = _trimer_generator(lazy=True)
+    for target in ["ADEFGHIKLMNPQRSTVWY", "AD", "HQ", "FLIMVSPTAYHQNKDECWRSG"]:
+        assert lazy.get_best_degenerate_codon(
+            target
+        ) == eager.get_best_degenerate_codon(target)
+    assert lazy.degenerate_codons["X"] == eager.degenerate_codons["X"]
+    assert len(lazy.degenerate_codons) == len(eager.degenerate_codons)
+
+
+def test_trimers_change_the_fingerprint():
+    assert _trimer_generator().fingerprint() != DegenerateCodonGenerator().fingerprint()
+    with pytest.raises(ValueError, match="Trimer blocks"):
+        _trimer_generator(backend="numpy")
+
+
+def test_candidates_start_with_best_codon():
+    codon_gen = DegenerateCodonGenerator()
+    for target in ["A", "HQ", "AGVIL", "FLIMVSPTAYHQNKDECWRSG"]:
+        candidates = codon_gen.get_candidates(target, k=5)
+        assert candidates[0]["codon"] == codon_gen.get_best_degenerate_codon(target)
+        keys = [codon_gen._rank_key(c["codon"]) for c in candidates]
+        assert keys == sorted(keys)
+
+
+def test_top_k_matches_full_scan():
+    codon_gen = DegenerateCodonGenerator()
+    rng = random.Random(5)
+    for _ in range(50):
+        target = "".join(rng.sample(AMINO_ACIDS_WITH_STOP, rng.randint(1, 8)))
+        candidates = sorted(
+            (
+                codon
+                for codon, meta in codon_gen.degenerate_codons.items()
+                if set(target) <= set(meta["aas"])
+            ),
+            key=codon_gen._rank_key,
+        )
+        found = codon_gen.get_candidates(target, k=7)
+        assert [c["codon"] for c in found] == candidates[:7]
+    assert len(codon_gen.get_candidates("W", k=None)) == len(
+        codon_gen.amino_acid_dict["W"]
+    )
+
+
+def test_candidate_objectives():
+    codon_gen = DegenerateCodonGenerator()
+    (candidate,) = codon_gen.get_candidates("HQ", k=1)
+    assert candidate == {
+        "codon": "CAK",
+        "amino_acids": 2,
+        "expanded_codon_count": 2,
+        "on_target": 1.0,
+        "stop_fraction": 0.0,
+        "usage": codon_gen.usage_scores["CAK"],
+    }
+    nnk = codon_gen._candidate_entry(
+        codon_gen._ensure_candidate_index()[codon_gen.codon_masks["NNK"]][0], "A"
+    )
+    assert nnk["stop_fraction"] == 1 / 32
+
+
+def test_pareto_front_is_not_dominated():
+    codon_gen = DegenerateCodonGenerator()
+    objectives = ["amino_acids", "on_target", "stop_fraction"]
+    front = codon_gen.get_candidates("AGVIL", k=None, objectives=objectives)
+    everything = codon_gen.get_candidates("AGVIL", k=None)
+
+    def vector(c):
+        return (c["amino_acids"], -c["on_target"], c["stop_fraction"])
+
+    for member in front:
+        assert not any(
+            all(a <= b for a, b in zip(vector(other), vector(member), strict=True))
+            and vector(other) != vector(member)
+            for other in everything
+        )
+    # Every candidate is matched or beaten by a member of the front
+    for other in everything:
+        assert any(
+            all(a <= b for a, b in zip(vector(m), vector(other), strict=True))
+            for m in front
+        )
+    assert len(codon_gen.get_candidates("AGVIL", k=1, objectives=objectives)) == 1
+
+
+def test_candidate_arguments_are_checked():
+    codon_gen = DegenerateCodonGenerator()
+    with pytest.raises(ValueError, match="Unknown objectives"):
+        codon_gen.get_candidates("A", objectives=["price"])
+    with pytest.raises(ValueError, match="k must be"):
+        codon_gen.get_candidates("A", k=0)
@@ -1,6 +1,11 @@
+import io
+import json
 import os
 from subprocess import PIPE, STDOUT, Popen
 
+from phagetrix import api
+from phagetrix.cli import process_stream
+
 
 def test_commandline_installed():
     if os.name == "nt":
@@ -12,3 +17,50 @@ def test_commandline_installed():
     print("=" * 5, "Output:")
     print(niceout)
     assert "following arguments" in niceout
+
+
+def test_stream_mode_writes_one_result_per_record():
+    records = [
+        {"id": "a", "sequence": "VLAYMVAQVQ", "variations": {"3": "AGVIL"}},
+        {"id": "b", "sequence": "ACXDEF"},
+    ]
+    infile = io.StringIO("\n".join(json.dumps(r) for r in records) + "\n\n")
+    outfile = io.StringIO()
+
+    process_stream(infile, outfile)
+
+    results = [json.loads(line) for line in outfile.getvalue().splitlines()]
+    assert [r["id"] for r in results] == ["a", "b"]
+    assert (
+        results[0]["final_sequence"]
+        == api.optimize_codons("VLAYMVAQVQ", {3: "AGVIL"})["final_sequence"]
+    )
+    assert "Invalid amino acid" in results[1]["error"]
+
+
+def test_stream_mode_reads_stdin():
+    if os.name == "nt":
+        return  # The following does not work as a test on windows
+
+    p = Popen(["phagetrix", "--stream"], stdin=PIPE, stdout=PIPE, stderr=STDOUT)
+    out, _ = p.communicate(b'{"sequence": "ACDEF", "variations": {"1": "AG"}}\n')
+    result = json.loads(out.decode("utf-8"))
+    assert result["sequence"] == "ACDEF"
+
+
+def test_persist_tables_is_opt_in(tmp_path):
+    if os.name == "nt":
+        return  # The following does not work as a test on windows
+
+    path = tmp_path / "input.phagetrix"
+    path.write_text("VLAYMVAQVQ\nA3AGVIL\n")
+    cache = tmp_path / "cache"
+    env = {**os.environ, "PHAGETRIX_CACHE_DIR": str(cache)}
+    env.pop("PHAGETRIX_PERSIST", None)
+
+    Popen(["phagetrix", str(path)], stdout=PIPE, env=env).communicate()
+    assert not cache.exists()
+
+    command = ["phagetrix", "--persist-tables", str(path)]
+    Popen(command, stdout=PIPE, env=env).communicate()
+    assert [p.name[:10] for p in cache.iterdir()] == ["generator-"]
@@ -0,0 +1,157 @@
+"""Tests for decoding degenerate oligos into amino acid distributions."""
+
+import io
+import json
+import os
+import random
+from subprocess import PIPE, Popen
+
+import pytest
+
+from phagetrix import api
+from phagetrix.decode import decode_oligo, iter_decoded, read_sequences, write_results
+
+
+def test_decode_oligo_reports_positions():
+    """NNK codes for all amino acids and one stop in 32 codons."""
+    result = decode_oligo("gct NNK TGG")
+
+    assert result["codons"] == ["GCT", "NNK", "TGG"]
+    assert result["amino_acids"][0] == {"A": 1}
+    assert sum(result["amino_acids"][1].values()) == 32
+    assert result["amino_acids"][1]["*"] == 1
+    assert result["efficiency"] == [100, 97, 100]
+    assert result["diversity"] == 32
+    assert result["distinct_variants"] == 21
+    assert result["stop_free_variants"] == 20
+
+
+def test_decode_oligo_inverts_optimize_codons():
+    """Decoding an optimised design gives back its library statistics."""
+    design = api.optimize_codons("VLAYMVAQVQ", {3: "AGVIL", 5: "DE"})
+    result = decode_oligo("".join(design["degenerate_codons"]))
+    stats = api.calculate_library_stats("VLAYMVAQVQ", {3: "AGVIL", 5: "DE"})
+
+    assert result["distinct_variants"] == stats["distinct_variants"]
+    assert result["entropy_bits"] == pytest.approx(stats["entropy_bits"])
+
+
+@pytest.mark.parametrize(
+    "dna, message",
+    [("", "empty"), ("GCTN", "multiple of 3"), ("GCTXNN", "Unknown")],
+)
+def test_decode_oligo_rejects_invalid_sequences(dna, message):
+    with pytest.raises(ValueError, match=message):
+        decode_oligo(dna)
+
+
+def test_read_sequences_accepts_fasta_and_plain_lines():
+    fasta = io.StringIO(">first library\nGCTNNK\nTGG\n\n>second\nNNS\n")
+    assert list(read_sequences(fasta)) == [
+        ("first library", "GCTNNKTGG"),
+        ("second", "NNS"),
+    ]
+
+    plain = io.StringIO("# order\nGCTNNK\n\nNNS\n")
+    assert list(read_sequences(plain)) == [("line_2", "GCTNNK"), ("line_4", "NNS")]
+
+
+def test_iter_decoded_matches_decode_oligo():
+    """Batched translation agrees with decoding oligos one at a time."""
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    letters = "".join(api.get_generator().degenerate_bases)
+    records = [
+        (str(i), "".join(rng.choice(letters) for _ in range(3 * rng.randint(1, 12))))
+        for i in range(50)
+    ]
+
+    # A small batch size splits the records and pads oligos of mixed lengths
+    results = list(iter_decoded(records, positions=True, batch_size=16))
+
+    assert [r["id"] for r in results] == [name for name, _ in records]
+    for (_, dna), result in zip(records, results, strict=True):
+        expected = decode_oligo(dna)
+        assert result["codons"] == len(expected["codons"])
+        for key in ("diversity", "distinct_variants", "stop_free_variants"):
+            assert result[key] == expected[key]
+        for key in ("stop_fraction", "entropy_bits"):
+            assert result[key] == pytest.approx(expected[key])
+        assert result["amino_acids"] == expected["amino_acids"]
+        assert result["efficiency"] == expected["efficiency"]
+
+
+def test_iter_decoded_reports_bad_records_and_continues():
+    pytest.importorskip("numpy")
+    records = [("bad", "GCTN"), ("unknown", "GCTX&Y"), ("good", "NNK")]
+
+    results = list(iter_decoded(records))
+
+    assert "multiple of 3" in results[0]["error"]
+    assert results[1] == {"id": "unknown", "error": "Unknown degenerate bases: &X"}
+    assert results[2]["diversity"] == 32
+
+
+@pytest.fixture
+def trimer_vendor():
+    """Register a vendor with a trimer block for one test."""
+    api.register_vendor(
+        "DecodeCo",
+        api.get_degenerate_codons("IDT"),
+        trimers={"X": ["GCT", "GAT", "TTT"]},
+    )
+    yield "DecodeCo"
+    api.degenerate.pop("DecodeCo")
+    api.trimer_blocks.pop("DecodeCo", None)
+    api.generator_registry.discard("DecodeCo")
+
+
+def test_decode_oligo_reads_trimer_blocks(trimer_vendor):
+    """A trimer block letter is one codon of its blended amino acids."""
+    result = decode_oligo("XGCTX", company=trimer_vendor)
+
+    assert result["codons"] == ["X", "GCT", "X"]
+    assert result["amino_acids"][0] == {"A": 1, "D": 1, "F": 1}
+    assert result["diversity"] == 9
+
+    with pytest.raises(ValueError, match="Incomplete codon"):
+        decode_oligo("GCXT", company=trimer_vendor)
+    pytest.importorskip("numpy")
+    with pytest.raises(ValueError, match="trimer"):
+        list(iter_decoded([("x", "X")], company=trimer_vendor))
+
+
+def test_decode_oligo_round_trips_trimer_designs(trimer_vendor):
+    """A design's final sequence decodes back into its codons."""
+    variations = {1: "ADF", 3: "AG", 4: "HQ"}
+    design = api.optimize_codons("ACDEF", variations, company=trimer_vendor)
+    assert "X" in design["degenerate_codons"]
+
+    result = decode_oligo(design["final_sequence"], company=trimer_vendor)
+
+    assert result["codons"] == design["degenerate_codons"]
+    for position, amino_acids in variations.items():
+        assert set(result["amino_acids"][position - 1]) >= set(amino_acids)
+
+
+def test_write_results_table():
+    pytest.importorskip("numpy")
+    outfile = io.StringIO()
+
+    write_results(iter_decoded([("lib", "GCTNNK")]), outfile)
+
+    header, row = outfile.getvalue().splitlines()
+    assert header.split("\t")[:3] == ["id", "codons", "diversity"]
+    assert row.split("\t")[:4] == ["lib", "2", "32", "21"]
+
+
+def test_decode_command_reads_stdin():
+    pytest.importorskip("numpy")
+    if os.name == "nt":
+        return  # The following does not work as a test on windows
+
+    p = Popen(["phagetrix", "decode", "--json", "--positions"], stdin=PIPE, stdout=PIPE)
+    out, _ = p.communicate(b">cdr\nGCTNNK\n")
+    result = json.loads(out.decode("utf-8"))
+    assert result["id"] == "cdr"
+    assert result["efficiency"] == [100, 97]
@@ -0,0 +1,143 @@
+"""Tests for amino-acid-level library diversity."""
+
+import itertools
+import math
+import time
+
+import pytest
+
+from phagetrix import api
+from phagetrix.diversity import (
+    coverage_fraction,
+    library_coverage,
+    library_diversity,
+    log_probability_histogram,
+    position_distributions,
+    transformants_for_coverage,
+)
+
+
+def _enumerate(distributions):
+    """Probability of every variant, by brute force."""
+    variants = {}
+    for combo in itertools.product(*(d.items() for d in distributions)):
+        key = "".join(aa for aa, _ in combo)
+        variants[key] = math.prod(p for _, p in combo)
+    return variants
+
+
+def _design_distributions():
+    generator = api.get_generator()
+    codons = [
+        generator.get_best_degenerate_codon(aas)
+        for aas in ["AGVIL", "YFW", "DE", "K", "ACDEFGHIKLMNPQRSTVWY"]
+    ]
+    return position_distributions(generator, codons)
+
+
+def test_matches_enumeration():
+    """Counts, entropy and probabilities match brute force enumeration."""
+    distributions = _design_distributions()
+    variants = _enumerate(distributions)
+    stats = library_diversity(distributions)
+
+    assert stats["distinct_variants"] == len(variants)
+    assert stats["stop_free_variants"] == sum("*" not in v for v in variants)
+    assert stats["stop_fraction"] == pytest.approx(
+        sum(p for v, p in variants.items() if "*" in v)
+    )
+    assert stats["entropy_bits"] == pytest.approx(
+        -sum(p * math.log2(p) for p in variants.values())
+    )
+    assert stats["inverse_simpson"] == pytest.approx(
+        1 / sum(p * p for p in variants.values())
+    )
+    assert stats["probability"]["max"] == pytest.approx(max(variants.values()))
+    assert stats["probability"]["min"] == pytest.approx(min(variants.values()))
+    median = sorted(variants.values(), reverse=True)[(len(variants) - 1) // 2]
+    assert stats["probability"]["median"] == pytest.approx(median, rel=1e-2)
+
+
+def test_histogram_totals():
+    """The histogram holds every variant and all of the probability."""
+    distributions = _design_distributions()
+    histogram = log_probability_histogram(distributions)
+
+    assert sum(v for _, v in histogram) == pytest.approx(len(_enumerate(distributions)))
+    assert sum(p * v for p, v in histogram) == pytest.approx(1.0)
+    assert [p for p, _ in histogram] == sorted((p for p, _ in histogram), reverse=True)
+
+
+def test_large_library_is_tractable():
+    """A library of 10^60 variants is summarised quickly."""
+    generator = api.get_generator()
+    codon = generator.get_best_degenerate_codon("ACDEFGHIKLMNPQRSTVWY")
+    distributions = position_distributions(generator, [codon] * 60)
+
+    start = time.perf_counter()
+    stats = library_diversity(distributions)
+    assert time.perf_counter() - start < 5
+
+    assert stats["distinct_variants"] == 21**60
+    histogram = log_probability_histogram(distributions, max_bins=256)
+    assert len(histogram) <= 256
+    assert sum(p * v for p, v in histogram) == pytest.approx(1.0)
+
+
+def test_mixture_positions():
+    """Mixture positions combine their codons by ratio."""
+    generator = api.get_generator()
+    result = api.optimize_codons("ACDEF", {2: "DEKR"}, max_codons_per_position=2)
+    distributions = position_distributions(
+        generator, result["degenerate_codons"], result["mixtures"]
+    )
+    assert sum(distributions[1].values()) == pytest.approx(1.0)
+    if result["mixtures"]:
+        assert set(distributions[1]) == set("DEKR")
+
+
+def test_library_stats_report_protein_diversity():
+    """calculate_library_stats reports amino-acid-level diversity."""
+    stats = api.calculate_library_stats("ACDEF", {1: "AG", 3: "DEF"})
+    generator = api.get_generator()
+
+    assert stats["distinct_variants"] == math.prod(
+        len(generator.degenerate_codons[codon]["aas"]) for codon in stats["codons_used"]
+    )
+    assert stats["distinct_variants"] <= stats["diversity"]
+    assert stats["effective_diversity"] <= stats["distinct_variants"]
+    assert stats["entropy_bits"] > 0
+
+
+def test_coverage_matches_enumeration():
+    """Expected coverage matches the sum over every variant."""
+    distributions = _design_distributions()
+    variants = _enumerate(distributions)
+    coverage = library_coverage(distributions, 5000)
+
+    expected = sum(1 - (1 - p) ** 5000 for p in variants.values())
+    assert coverage["distinct_variants"] == len(variants)
+    assert coverage["expected_variants"] == pytest.approx(expected, rel=1e-3)
+    assert coverage["coverage"] == pytest.approx(expected / len(variants), rel=1e-3)
+
+
+def test_transformants_needed():
+    """The required N reaches its target and one clone fewer does not."""
+    distributions = _design_distributions()
+    histogram = log_probability_histogram(distributions)
+    needed = library_coverage(distributions, 0)["transformants_needed"]
+
+    assert needed[0.9] < needed[0.95] < needed[0.99]
+    for target, n in needed.items():
+        assert coverage_fraction(histogram, n) >= target
+        assert coverage_fraction(histogram, n - 1) < target
+
+
+def test_skewed_library_needs_more_than_uniform():
+    """Non-uniform variants need more transformants than the uniform estimate."""
+    result = api.optimize_codons("ACDEF", {2: "DEKR", 4: "AGVIL"})
+    coverage = api.expected_coverage(result, 100)
+
+    assert coverage["coverage"] < coverage["uniform_coverage"]
+    with pytest.raises(ValueError, match="Coverage"):
+        transformants_for_coverage([(1.0, 1)], 1.5)
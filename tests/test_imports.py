@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+import phagetrix
+
+# Generous enough for slow CI machines, tight enough to catch a heavy
+# dependency creeping back into module import
+IMPORT_BUDGET_SECONDS = 0.5
+
+HEAVY_MODULES = (
+    "python_codon_tables",
+    "quantiphy",
+    "numpy",
+    "concurrent.futures.process",
+    "importlib.metadata",
+)
+
+
+def _run(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def test_import_does_not_load_heavy_dependencies():
+    """Importing the package and CLI leaves heavy dependencies unloaded."""
+    code = (
+        "import sys, phagetrix, phagetrix.cli\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    assert _run(code).strip() == "[]"
+
+
+def test_import_time_budget():
+    """Importing the CLI stays within the start-up budget."""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import phagetrix.cli\n"
+        "print(time.perf_counter() - start)"
+    )
+    # Best of three runs, to ignore a cold file system cache
+    elapsed = min(float(_run(code)) for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_attributes():
+    """Public names and the version resolve on first access."""
+    assert phagetrix.optimize is phagetrix.optimize_codons
+    assert phagetrix.DegenerateCodonGenerator.__name__ == "DegenerateCodonGenerator"
+    assert isinstance(phagetrix.__version__, str)
+    assert set(phagetrix.__all__) <= set(dir(phagetrix))
+
+
+def test_unknown_attribute():
+    """Unknown names still raise AttributeError."""
+    with pytest.raises(AttributeError, match="no_such_name"):
+        phagetrix.no_such_name  # noqa: B018
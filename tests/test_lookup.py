@@ -0,0 +1,50 @@
+"""Tests for the precomputed codon lookup tables."""
+
+import random
+
+import pytest
+
+from phagetrix.constants import AMINO_ACIDS_WITH_STOP
+from phagetrix.core import DegenerateCodonGenerator
+from phagetrix.lookup import CodonLookupTable
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return DegenerateCodonGenerator()
+
+
+def test_lookup_table_matches_generator(generator, tmp_path):
+    """Test that every sampled answer equals the generator's answer."""
+    table = CodonLookupTable.for_generator(generator, cache_dir=tmp_path)
+    try:
+        rng = random.Random(2)
+        for _ in range(500):
+            target = "".join(rng.sample(AMINO_ACIDS_WITH_STOP, rng.randint(1, 21)))
+            assert table.get_best_degenerate_codon(
+                target
+            ) == generator.get_best_degenerate_codon(target)
+    finally:
+        table.close()
+
+
+def test_lookup_table_is_reused(generator, tmp_path):
+    """Test that a second open maps the existing file instead of rebuilding."""
+    CodonLookupTable.for_generator(generator, cache_dir=tmp_path).close()
+    (path,) = tmp_path.iterdir()
+    mtime = path.stat().st_mtime_ns
+
+    table = CodonLookupTable.for_generator(generator, cache_dir=tmp_path)
+    try:
+        assert table.fingerprint == generator.fingerprint()
+        assert path.stat().st_mtime_ns == mtime
+    finally:
+        table.close()
+
+
+def test_lookup_table_rejects_corrupt_file(tmp_path):
+    """Test that a damaged file is reported instead of misread."""
+    path = tmp_path / "broken.bin"
+    path.write_bytes(b"not a lookup table at all")
+    with pytest.raises(ValueError):
+        CodonLookupTable.open(path)
@@ -0,0 +1,104 @@
+"""Tests for the opt-in metrics layer."""
+
+import contextlib
+import io
+import os
+import time
+from subprocess import PIPE, Popen
+
+import pytest
+
+import phagetrix
+from phagetrix import api, metrics
+from phagetrix.output import OutputFormatter
+from phagetrix.parser import InputParser
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_by_default():
+    """Nothing is recorded unless metrics are enabled."""
+    metrics.reset()
+    api.optimize_codons("ACDEF", {1: "AG"})
+
+    data = phagetrix.metrics.snapshot()
+    assert data["enabled"] is False
+    assert data["stages"] == {}
+
+
+def test_stage_timings(enabled_metrics):
+    """Parse, codon selection and statistics stages are recorded."""
+    InputParser().parse(io.StringIO("ACDEF\nA1AG\n"))
+    api.optimize_codons("ACDEF", {1: "AG"})
+    api.optimize_codons("ACDEFG", {1: "AG"})
+    api.calculate_library_stats("ACDEF", {1: "AG"})
+
+    stages = metrics.snapshot()["stages"]
+    assert stages["parse"]["calls"] == 1
+    assert stages["codon_selection"]["calls"] == 11
+    assert stages["statistics"]["calls"] == 1
+    selection = stages["codon_selection"]
+    assert 0 < selection["max_seconds"] <= selection["total_seconds"]
+    assert selection["mean_seconds"] == pytest.approx(selection["total_seconds"] / 11)
+
+
+def test_render_stages_do_not_overlap(enabled_metrics):
+    """Rendering excludes codon selection and statistics, timed per position."""
+    sequence = "VLAYMVAQVQGHIKLMNPQR"
+    generator = api.get_generator()
+    metrics.reset()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        OutputFormatter().format_results(
+            sequence, {3: "AGVIL"}, {"offset": 0.0}, generator
+        )
+    elapsed = time.perf_counter() - started
+
+    stages = metrics.snapshot()["stages"]
+    assert set(stages) == {"codon_selection", "statistics", "render"}
+    assert sum(stage["total_seconds"] for stage in stages.values()) <= elapsed
+    selection = stages["codon_selection"]
+    assert selection["calls"] == len(sequence)
+    assert selection["max_seconds"] < selection["total_seconds"]
+
+
+def test_generator_build_and_cache_statistics(enabled_metrics):
+    """Building a generator is timed and registry lookups are counted."""
+    registry = api.GeneratorRegistry()
+    metrics.register_cache("test_registry", registry.info)
+    try:
+        registry.get("NEB")
+        registry.get("NEB")
+
+        data = metrics.snapshot()
+        assert data["stages"]["generator_build"]["calls"] >= 1
+        assert data["stages"]["codon_table"]["calls"] >= 1
+        assert data["caches"]["test_registry"]["hit_rate"] == 0.5
+        assert "codon_memo" in data["caches"]
+        assert "cache test_registry: 1 hits, 1 misses" in metrics.format_summary()
+    finally:
+        metrics._caches.pop("test_registry")
+
+
+def test_commandline_timings(tmp_path):
+    """--timings prints a summary on stderr and leaves stdout unchanged."""
+    if os.name == "nt":
+        return  # The following does not work as a test on windows
+
+    path = tmp_path / "input.phagetrix"
+    path.write_text("VLAYMVAQVQ\nA3AGVIL\n")
+    p = Popen(["phagetrix", "--timings", str(path)], stdout=PIPE, stderr=PIPE)
+    out, err = p.communicate()
+
+    assert "degenerate codons" in out.decode()
+    summary = err.decode()
+    for stage in ("parse", "generator_build", "codon_selection", "render"):
+        assert stage in summary
+    assert "cache generator_registry" in summary
@@ -0,0 +1,167 @@
+"""Tests for multi-codon mixtures."""
+
+import itertools
+import random
+
+import pytest
+
+from phagetrix import api
+from phagetrix.constants import VALID_AMINO_ACIDS
+from phagetrix.core import DegenerateCodonGenerator
+from phagetrix.mixture import find_codon_mixture
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return DegenerateCodonGenerator()
+
+
+def _products(generator, mixture):
+    """Amino acids produced by any codon of a mixture."""
+    produced = set()
+    for codon in mixture["codons"]:
+        produced |= set(generator.degenerate_codons[codon]["aas"])
+    return produced
+
+
+def test_mixture_covers_target_exactly(generator):
+    """Test that a two-codon mixture removes the off-target products."""
+    single = generator.get_best_degenerate_codon("AGVIL")
+    assert set(generator.degenerate_codons[single]["aas"]) != set("AGVIL")
+
+    mixture = find_codon_mixture(generator, "AGVIL")
+
+    assert len(mixture["codons"]) == 2
+    assert _products(generator, mixture) == set("AGVIL")
+    assert mixture["efficiency"] == 100
+    assert sum(mixture["ratios"]) == pytest.approx(1.0)
+
+
+def test_mixture_prefers_fewest_codons(generator):
+    """Test that one codon is returned when it is already exact."""
+    mixture = find_codon_mixture(generator, "HQ")
+
+    assert mixture["codons"] == [generator.get_best_degenerate_codon("HQ")]
+    assert mixture["ratios"] == [1.0]
+
+
+def test_mixture_reports_best_effort(generator):
+    """Test that the on-target optimum is returned below the threshold."""
+    mixture = find_codon_mixture(
+        generator, "ACDEFGHIKLMNPQRSTVWY", max_codons=1, min_on_target=1.0
+    )
+
+    assert len(mixture["codons"]) == 1
+    assert 0.9 < mixture["on_target"] < 1.0
+    assert _products(generator, mixture) >= set("ACDEFGHIKLMNPQRSTVWY")
+
+
+def _on_target(generator, mixture, amino_acids):
+    """On-target fraction of a mixture, recomputed from the codon tables."""
+    total = 0.0
+    for codon, ratio in zip(mixture["codons"], mixture["ratios"], strict=True):
+        meta = generator.degenerate_codons[codon]
+        wanted = sum(n for aa, n in meta["aas"].items() if aa in amino_acids)
+        total += ratio * wanted / meta["expanded_codon_count"]
+    return total
+
+
+def test_mixture_of_large_sets(generator):
+    """Test mixtures for many requested amino acids, most of them inexact."""
+    rng = random.Random(5)
+    for _ in range(12):
+        amino_acids = "".join(rng.sample(VALID_AMINO_ACIDS, rng.randint(8, 20)))
+        previous = 0.0
+        for max_codons in range(1, 5):
+            mixture = find_codon_mixture(generator, amino_acids, max_codons)
+
+            assert len(mixture["codons"]) <= max_codons
+            assert _products(generator, mixture) >= set(amino_acids)
+            assert mixture["on_target"] == pytest.approx(
+                _on_target(generator, mixture, amino_acids)
+            )
+            # More codons never make the best mixture worse
+            assert mixture["on_target"] >= previous - 1e-9
+            previous = mixture["on_target"]
+            if max_codons == 1:
+                single = generator.get_best_degenerate_codon(amino_acids)
+                assert mixture["on_target"] >= _on_target(
+                    generator, {"codons": [single], "ratios": [1.0]}, amino_acids
+                )
+
+    # The codon profiles are built once and kept with the generator
+    index = generator._mixture_index
+    find_codon_mixture(generator, "ACDEFGHIKLMNPQRSTVWY", min_on_target=0.9)
+    assert generator._mixture_index is index
+
+
+def _best_pair(generator, amino_acids):
+    """Best on-target fraction of up to two codons, trying every pair."""
+    wanted = set(amino_acids)
+    # A codon is only ever outdone by one producing the same requested
+    # amino acids more on target
+    best: dict[frozenset[str], float] = {}
+    for meta in generator.degenerate_codons.values():
+        covered = frozenset(meta["aas"]) & wanted
+        if covered:
+            on = sum(n for aa, n in meta["aas"].items() if aa in wanted)
+            fraction = on / meta["expanded_codon_count"]
+            best[covered] = max(best.get(covered, 0.0), fraction)
+    options = [*best.items(), (frozenset(), 0.0)]
+    scores = [
+        sum(max(f for c, f in pair if aa in c) for aa in wanted) / len(wanted)
+        for pair in itertools.combinations(options, 2)
+        if pair[0][0] | pair[1][0] == wanted
+    ]
+    return max(scores)
+
+
+@pytest.mark.parametrize(
+    ("amino_acids", "expected"),
+    [("CPRGAQK", 19 / 21), ("WHTILV", 17 / 24)],
+)
+def test_mixture_credits_most_on_target_codon(generator, amino_acids, expected):
+    """Test that each amino acid counts for the best codon producing it."""
+    mixture = find_codon_mixture(generator, amino_acids, max_codons=2)
+
+    assert mixture["on_target"] == pytest.approx(expected)
+    assert mixture["on_target"] == pytest.approx(
+        _on_target(generator, mixture, amino_acids)
+    )
+
+
+def test_mixture_pairs_are_optimal(generator):
+    """Test two-codon mixtures against trying every pair of codons."""
+    rng = random.Random(11)
+    for _ in range(8):
+        amino_acids = "".join(rng.sample(VALID_AMINO_ACIDS, rng.randint(2, 12)))
+        mixture = find_codon_mixture(generator, amino_acids, max_codons=2)
+
+        assert mixture["on_target"] == pytest.approx(_best_pair(generator, amino_acids))
+        assert mixture["on_target"] == pytest.approx(
+            _on_target(generator, mixture, amino_acids)
+        )
+
+
+def test_mixture_rejects_bad_size(generator):
+    """Test that mixture sizes outside 1 to 4 are rejected."""
+    with pytest.raises(ValueError, match="max_codons"):
+        find_codon_mixture(generator, "AG", max_codons=5)
+
+
+def test_optimize_codons_with_mixtures():
+    """Test the opt-in mixture mode of optimize_codons."""
+    result = api.optimize_codons(
+        "VLAYMVAQVQ", {3: "AGVIL", 4: "YFW", 7: "HQ"}, max_codons_per_position=2
+    )
+
+    assert set(result["mixtures"]) == {3, 4}
+    assert result["mixtures"][3]["efficiency"] == 100
+    single = api.optimize_codons("VLAYMVAQVQ", {3: "AGVIL", 4: "YFW", 7: "HQ"})
+    assert single["mixtures"] == {}
+
+    # Efficiency follows the mixture; the sequence keeps the single codon
+    for pos, mixture in result["mixtures"].items():
+        assert result["efficiency"][pos - 1] == mixture["efficiency"]
+        assert result["efficiency"][pos - 1] > single["efficiency"][pos - 1]
+    assert result["final_sequence"] == single["final_sequence"]
@@ -0,0 +1,192 @@
+"""Tests for counting protein variants in sequenced clones."""
+
+import gzip
+import io
+import itertools
+import json
+import os
+import random
+from subprocess import PIPE, Popen
+
+import pytest
+
+from phagetrix import api, ngs
+from phagetrix.ngs import count_variants, fastq_chunks
+
+SEQUENCE = "VLAYMVAQVQGHIK"
+VARIATIONS = {3: "AGVIL", 5: "DE", 9: "FWY"}
+FLANK_5, FLANK_3 = "GGATCC", "AAGCTT"
+
+
+def _reverse_complement(dna):
+    return dna.translate(str.maketrans("ACGT", "TGCA"))[::-1]
+
+
+@pytest.fixture(scope="module")
+def design():
+    return api.optimize_codons(SEQUENCE, VARIATIONS)
+
+
+def _clone(design, rng):
+    generator = api.get_generator()
+    return "".join(
+        rng.choice(generator.get_normal_codons(codon))
+        for codon in design["degenerate_codons"]
+    )
+
+
+def _write_fastq(path, reads):
+    with open(path, "w") as f:
+        for i, read in enumerate(reads):
+            # "@" quality lines make record boundaries harder to find
+            f.write(f"@read{i}\n{read}\n+\n@{'I' * (len(read) - 1)}\n")
+
+
+@pytest.fixture(scope="module")
+def reads(design, tmp_path_factory):
+    """Simulated clones, some reversed, shifted, truncated or unrelated."""
+    rng = random.Random(3)
+    reads = []
+    variants: dict[str, int] = {}
+    expected = {"frameshift": 0, "truncated": 0, "unlocated": 0}
+    for i in range(600):
+        clone = _clone(design, rng)
+        read = FLANK_5 + clone + FLANK_3
+        kind = i % 10
+        if kind == 1:
+            read = _reverse_complement(read)
+        elif kind == 2:  # One base lost in the middle of the region
+            read = read[:27] + read[28:]
+            expected["frameshift"] += 1
+            reads.append(read)
+            continue
+        elif kind == 3:
+            read = read[:30]
+            expected["truncated"] += 1
+            reads.append(read)
+            continue
+        elif kind == 4:
+            read = "ACGT" * 15
+            expected["unlocated"] += 1
+            reads.append(read)
+            continue
+        protein = "".join(
+            api.get_generator().codon_to_aa[clone[j : j + 3]]
+            for j in range(0, len(clone), 3)
+        )
+        key = "".join(protein[pos - 1] for pos in sorted(VARIATIONS))
+        variants[key] = variants.get(key, 0) + 1
+        reads.append(read)
+
+    path = tmp_path_factory.mktemp("ngs") / "reads.fastq"
+    _write_fastq(path, reads)
+    return path, {"variants": variants, **expected}
+
+
+def test_count_variants_classifies_reads(design, reads):
+    path, expected = reads
+    counts = count_variants(design, [path], workers=1)
+
+    assert counts["reads"] == 600
+    assert counts["outcomes"]["frameshift"] == expected["frameshift"]
+    assert counts["outcomes"]["truncated"] == expected["truncated"]
+    assert counts["outcomes"]["unlocated"] == expected["unlocated"]
+    assert counts["variants"] == expected["variants"]
+    assert counts["distinct_variants"] == len(expected["variants"])
+    assert counts["positions"] == [3, 5, 9]
+    assert set(counts["position_counts"][5]["observed"]) <= {"D", "E"}
+
+
+def test_count_variants_rates_follow_the_design(design, reads):
+    """Observed stop and off-target rates approach the predicted ones."""
+    path, _ = reads
+    counts = count_variants(design, [path], workers=1)
+    stats = api.calculate_library_stats(SEQUENCE, VARIATIONS)
+
+    assert counts["predicted"]["stop"] == pytest.approx(stats["stop_fraction"])
+    for rate in ("stop", "off_target"):
+        assert counts["rates"][rate] == pytest.approx(
+            counts["predicted"][rate], abs=0.08
+        )
+    assert counts["rates"]["frameshift"] == pytest.approx(60 / 480)
+
+
+def test_fastq_chunks_start_at_records(reads):
+    path, _ = reads
+    chunks = fastq_chunks(path, chunk_size=1000)
+
+    assert len(chunks) > 10
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == os.path.getsize(path)
+    data = path.read_bytes()
+    for (start, end), (next_start, _) in itertools.pairwise(chunks):
+        assert end == next_start
+        assert data[start : start + 5] == b"@read"
+
+
+def test_count_variants_workers_and_spilling_agree(design, reads):
+    """Process pools, small chunks and spilled tables give the same counts."""
+    path, _ = reads
+    single = count_variants(design, [path], workers=1)
+
+    spilled = count_variants(
+        design, [path], workers=2, chunk_size=2000, max_table_size=4
+    )
+
+    assert spilled == single
+
+
+def test_count_variants_streams_the_table(design, reads, monkeypatch):
+    """Many spilled runs are merged in several passes into one sorted table."""
+    path, expected = reads
+    monkeypatch.setattr(ngs, "MERGE_FAN_IN", 3)
+    output = io.StringIO()
+
+    counts = count_variants(
+        design, [path], workers=1, chunk_size=5000, max_table_size=2, output=output
+    )
+
+    assert "variants" not in counts
+    lines = output.getvalue().splitlines()
+    assert lines == sorted(lines)
+    table = {key: int(n) for key, n in (line.split("\t") for line in lines)}
+    assert table == expected["variants"]
+    assert counts["distinct_variants"] == len(table)
+
+
+def test_count_variants_reads_gzip(design, reads, tmp_path):
+    path, _ = reads
+    compressed = tmp_path / "reads.fastq.gz"
+    compressed.write_bytes(gzip.compress(path.read_bytes()))
+
+    counts = count_variants(design, [compressed, path], workers=1)
+
+    assert counts["reads"] == 1200
+
+
+def test_count_variants_rejects_other_files(design, tmp_path):
+    path = tmp_path / "reads.fasta"
+    path.write_text(">read\nACGT\n")
+
+    with pytest.raises(ValueError, match="not a FASTQ file"):
+        count_variants(design, [path], workers=1)
+
+
+def test_count_command(reads, tmp_path):
+    if os.name == "nt":
+        return  # The following does not work as a test on windows
+
+    path, expected = reads
+    design_file = tmp_path / "design.phagetrix"
+    design_file.write_text(
+        SEQUENCE
+        + "\n"
+        + "\n".join(f"{SEQUENCE[pos - 1]}{pos}{aas}" for pos, aas in VARIATIONS.items())
+    )
+
+    p = Popen(
+        ["phagetrix", "count", str(design_file), str(path), "-w", "1"], stdout=PIPE
+    )
+    out, _ = p.communicate()
+    counts = json.loads(out.decode("utf-8"))
+    assert counts["variants"] == expected["variants"]
@@ -0,0 +1,72 @@
+"""Tests for the phagetrix input parser."""
+
+import io
+
+import pytest
+
+from phagetrix.parser import InputParser, ParseError
+
+
+def test_parse_file_object():
+    """A file object is parsed line by line."""
+    text = "VLAYMVAQVQ\nA3AGVIL\n\n# offset = 10\nY4YFW\n"
+    seq, variations, config = InputParser().parse(io.StringIO(text))
+
+    assert seq == "VLAYMVAQVQ"
+    assert variations == {3: "AGVIL", 4: "YFW"}
+    assert config == {"offset": 10.0}
+
+
+def test_empty_input():
+    """Empty input is rejected."""
+    with pytest.raises(ParseError, match="empty"):
+        InputParser().parse([])
+
+
+def test_all_errors_reported():
+    """Every invalid line is reported, not just the first."""
+    lines = ["VLAYMVAQVQ", "A3AGVIL", "A4AG", "Y40YFW", "#bogus=1", "A7AVIZ"]
+    with pytest.raises(ParseError) as info:
+        InputParser().parse(lines)
+
+    errors = info.value.errors
+    assert len(errors) == 4
+    assert errors[0].startswith("line 3: Amino acid in sequence at position 4")
+    assert errors[1].startswith("line 4: Position 40 is out of bounds")
+    assert errors[2].startswith("line 5: Configuration variable 'bogus'")
+    assert errors[3] == "line 6: Amino acid Z is not valid"
+    assert isinstance(info.value, ValueError)
+
+
+def test_invalid_sequence_position():
+    """The first invalid residue of the sequence is located."""
+    with pytest.raises(ParseError, match="Invalid amino acid 'X' at position 3"):
+        InputParser().parse(["ACXDXF"])
+
+
+def test_default_limits():
+    """The default limits still apply."""
+    with pytest.raises(ParseError, match="more than 1000 lines"):
+        InputParser().parse(["ACDEF"] + ["A1AG"] * 1000)
+    with pytest.raises(ParseError, match="Sequence too long"):
+        InputParser().parse(["A" * 10001])
+
+
+def test_unlimited():
+    """Limits of None accept large designs."""
+    seq = "ACDEFGHIKLMNPQRSTVWY" * 1000
+    lines = [seq] + [f"{aa}{i + 1}{aa}G" for i, aa in enumerate(seq)]
+    parser = InputParser(max_lines=None, max_sequence_length=None)
+
+    _, variations, _ = parser.parse(iter(lines))
+    assert len(variations) == len(seq)
+    assert variations[20000] == "YG"
+
+
+def test_max_errors():
+    """Parsing stops once max_errors is reached."""
+    lines = ["ACDEF"] + ["Z1AG"] * 50
+    with pytest.raises(ParseError) as info:
+        InputParser(max_errors=5).parse(lines)
+    assert len(info.value.errors) == 6
+    assert info.value.errors[-1] == "Stopped after 5 errors"
@@ -0,0 +1,80 @@
+"""Tests for Monte Carlo sampling of designed libraries."""
+
+import io
+
+import pytest
+
+from phagetrix import api
+from phagetrix.diversity import position_distributions
+
+np = pytest.importorskip("numpy")
+
+from phagetrix.sampling import sample_library, to_dna, write_fasta  # noqa: E402
+
+
+def _design():
+    return api.optimize_codons("VLAYMVAQVQ", {3: "AGVIL", 4: "YFW", 7: "AVIL"})
+
+
+def test_sample_shapes_and_reproducibility():
+    """Samples have one row per clone and repeat for the same seed."""
+    result = _design()
+    first = sample_library(result, 1000, seed=7, batch_size=300)
+    second = sample_library(result, 1000, seed=7, batch_size=300)
+
+    assert first["codons"].shape == (1000, 10)
+    assert first["proteins"].dtype == np.uint8
+    assert np.array_equal(first["codons"], second["codons"])
+    assert sample_library(result, 0)["proteins"].shape == (0, 10)
+
+
+def test_samples_follow_the_design():
+    """DNA matches the degenerate codons and translates to the proteins."""
+    result = _design()
+    generator = api.get_generator()
+    clones = sample_library(result, 200, seed=1)
+    dna = to_dna(clones["codons"]).view("S30").ravel()
+    proteins = clones["proteins"].view("S10").ravel()
+
+    for sequence, protein in zip(dna, proteins, strict=True):
+        sequence = sequence.decode()
+        codons = [sequence[i : i + 3] for i in range(0, 30, 3)]
+        for codon, degenerate in zip(codons, result["degenerate_codons"], strict=True):
+            for base, symbol in zip(codon, degenerate, strict=True):
+                assert base in generator.degenerate_bases[symbol]
+        assert "".join(generator.codon_to_aa[c] for c in codons) == protein.decode()
+
+
+def test_amino_acid_frequencies():
+    """Amino acid frequencies match the codon distributions."""
+    result = api.optimize_codons(
+        "ACDEF", {2: "DEKR", 4: "ACDEFGHIKLMNPQRSTVWY"}, max_codons_per_position=2
+    )
+    generator = api.get_generator()
+    distributions = position_distributions(
+        generator, result["degenerate_codons"], result["mixtures"]
+    )
+    proteins = sample_library(result, 200_000, seed=3)["proteins"]
+
+    for column, distribution in enumerate(distributions):
+        letters, counts = np.unique(proteins[:, column], return_counts=True)
+        observed = {
+            chr(c): n / len(proteins) for c, n in zip(letters, counts, strict=True)
+        }
+        assert set(observed) <= set(distribution)
+        for aa, p in distribution.items():
+            assert observed.get(aa, 0.0) == pytest.approx(p, abs=0.01)
+
+
+def test_write_fasta():
+    """FASTA output has one record per clone."""
+    result = _design()
+    out = io.StringIO()
+    write_fasta(result, 5, out, seed=2, molecule="dna", batch_size=2)
+
+    lines = out.getvalue().splitlines()
+    assert lines[0::2] == [f">clone_{i}" for i in range(1, 6)]
+    assert all(len(line) == 30 for line in lines[1::2])
+
+    with pytest.raises(ValueError, match="Unknown molecule"):
+        write_fasta(result, 5, out, molecule="rna")
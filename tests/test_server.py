@@ -0,0 +1,231 @@
+"""Tests for the HTTP/JSON service."""
+
+import asyncio
+import json
+
+from phagetrix import api
+from phagetrix.parser import DEFAULT_MAX_SEQUENCE_LENGTH
+from phagetrix.server import PhagetrixServer, dispatch
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def _post(path, payload):
+    return dispatch("POST", path, json.dumps(payload).encode())
+
+
+def test_optimize_endpoint_matches_api():
+    """/optimize answers like optimize_codons."""
+    status, result = _post(
+        "/optimize", {"sequence": "VLAYMVAQVQ", "variations": {"3": "AGVIL"}}
+    )
+    assert status == 200
+    assert (
+        result["final_sequence"]
+        == api.optimize_codons("VLAYMVAQVQ", {3: "AGVIL"})["final_sequence"]
+    )
+
+
+def test_stats_and_parse_endpoints():
+    """/stats and /parse wrap the library functions."""
+    status, stats = _post("/stats", {"sequence": "ACDEF", "variations": {"1": "AG"}})
+    assert status == 200
+    assert (
+        stats["diversity"]
+        == api.calculate_library_stats("ACDEF", {1: "AG"})["diversity"]
+    )
+
+    status, parsed = _post("/parse", {"text": "VLAYMVAQVQ\nA3AGVIL\n# offset = 5\n"})
+    assert status == 200
+    assert parsed == {
+        "sequence": "VLAYMVAQVQ",
+        "variations": {3: "AGVIL"},
+        "config": {"offset": 5.0},
+    }
+
+
+def test_parse_limits_only_tighten():
+    """Clients may lower the /parse input limits but not lift them."""
+    text = "A" * (DEFAULT_MAX_SEQUENCE_LENGTH + 1) + "\n"
+    for limit in (None, DEFAULT_MAX_SEQUENCE_LENGTH * 10):
+        status, response = _post("/parse", {"text": text, "max_sequence_length": limit})
+        assert status == 400
+        assert "error" in response
+    status, response = _post("/parse", {"text": text, "max_sequence_length": 0})
+    assert status == 400
+    assert "positive integer" in response["error"]
+
+    status, response = _post(
+        "/parse", {"text": "VLAYMVAQVQ\nA3AGVIL\n", "max_lines": 1}
+    )
+    assert status == 400
+    status, response = _post("/parse", {"text": "VLAYMVAQVQ\n", "max_lines": 1})
+    assert status == 200
+    assert response["sequence"] == "VLAYMVAQVQ"
+
+
+def test_candidates_endpoint():
+    """/candidates lists alternatives, best first."""
+    status, response = _post("/candidates", {"amino_acids": "HQ", "k": 2})
+    assert status == 200
+    assert [c["codon"] for c in response["candidates"]] == ["CAK", "CAS"]
+    status, response = _post(
+        "/candidates", {"amino_acids": "HQ", "objectives": ["cost"]}
+    )
+    assert status == 400
+
+
+def test_batch_endpoint_reports_errors_per_design():
+    """A bad design does not fail the rest of the batch."""
+    status, response = _post(
+        "/batch",
+        {
+            "company": "NEB",
+            "designs": [
+                {"id": "a", "sequence": "ACDEF", "variations": {"1": "AG"}},
+                {"id": "b", "sequence": "ACXDEF"},
+                {"variations": {}},
+            ],
+        },
+    )
+    assert status == 200
+    first, second, third = response["results"]
+    assert first["id"] == "a"
+    assert first["company"] == "NEB"
+    assert second["id"] == "b"
+    assert "Invalid amino acid" in second["error"]
+    assert third["error"] == "design 2: missing field 'sequence'"
+
+
+def test_stats_endpoint_uses_species():
+    """/stats picks codons for the requested species."""
+    payload = {"sequence": "ACDEF", "variations": {"2": "LR"}}
+    for species in ("e_coli", "h_sapiens_9606"):
+        status, stats = _post("/stats", {**payload, "species": species})
+        assert status == 200
+        assert (
+            stats["codons_used"]
+            == api.calculate_library_stats("ACDEF", {2: "LR"}, species=species)[
+                "codons_used"
+            ]
+        )
+
+
+def test_request_errors():
+    """Bad requests get 4xx answers with an error message."""
+    assert dispatch("GET", "/nowhere", b"")[0] == 404
+    assert dispatch("GET", "/optimize", b"")[0] == 405
+    assert dispatch("POST", "/optimize", b"{not json")[0] == 400
+    assert dispatch("POST", "/optimize", b"[1, 2]")[0] == 400
+    status, response = _post("/optimize", {"sequence": "AC", "company": "Nobody"})
+    assert status == 400
+    assert "Unknown company" in response["error"]
+
+
+async def _request(port, method, path, payload=None, connection="close"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {connection}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        data = await reader.readexactly(int(headers["content-length"]))
+        return int(status_line.split()[1]), json.loads(
+            data, parse_constant=_reject_constant
+        )
+    finally:
+        writer.close()
+
+
+def test_server_answers_concurrent_requests():
+    """The asyncio server answers several clients at once."""
+
+    async def run():
+        server = PhagetrixServer(port=0, workers=4)
+        await server.start()
+        try:
+            health = await _request(server.port, "GET", "/health")
+            designs = [
+                {"sequence": "VLAYMVAQVQ", "variations": {str(pos): "AGVIL"}}
+                for pos in range(1, 11)
+            ]
+            answers = await asyncio.gather(
+                *(_request(server.port, "POST", "/optimize", d) for d in designs)
+            )
+            return health, answers
+        finally:
+            await server.close()
+
+    (status, health), answers = asyncio.run(run())
+    assert status == 200
+    assert health["status"] == "ok"
+    assert health["generators"]["size"] >= 1
+    assert [s for s, _ in answers] == [200] * 10
+    assert len({a["final_sequence"] for _, a in answers}) == 10
+
+
+def test_server_keeps_connections_alive():
+    """Several requests can share one connection."""
+
+    async def run():
+        server = PhagetrixServer(port=0, warm=[])
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            statuses = []
+            for _ in range(3):
+                writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                await writer.drain()
+                statuses.append(int((await reader.readline()).split()[1]))
+                length = 0
+                while (line := await reader.readline()) != b"\r\n":
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+            writer.close()
+            return statuses
+        finally:
+            await server.close()
+
+    assert asyncio.run(run()) == [200, 200, 200]
+
+
+def test_server_sends_valid_json_and_rejects_bad_lengths():
+    """Infinite statistics become null; a negative body length is a 400."""
+    sequence = "A" * 300
+    variations = {str(pos): "ACDEFGHIKLMNPQRSTVWY" for pos in range(1, 301)}
+
+    async def run():
+        server = PhagetrixServer(port=0, warm=[])
+        await server.start()
+        try:
+            stats = await _request(
+                server.port,
+                "POST",
+                "/stats",
+                {"sequence": sequence, "variations": variations},
+            )
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"POST /stats HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+            await writer.drain()
+            status_line = await reader.readline()
+            writer.close()
+            return stats, status_line
+        finally:
+            await server.close()
+
+    (status, stats), status_line = asyncio.run(run())
+    assert status == 200
+    assert stats["effective_diversity"] is None
+    assert stats["entropy_bits"] > 1024
+    assert status_line.split()[1] == b"400"
@@ -0,0 +1,120 @@
+"""Tests for the persisted generator tables."""
+
+import random
+
+import python_codon_tables as pct
+
+from phagetrix import api, tables
+from phagetrix.constants import AMINO_ACIDS_WITH_STOP, degenerate
+from phagetrix.core import DegenerateCodonGenerator
+
+
+def _generator(cache_dir=None, codon_frequency=None, company="IDT"):
+    return DegenerateCodonGenerator(
+        dict(degenerate[company]),
+        codon_frequency or pct.get_codons_table("e_coli_316407"),
+        cache_dir=cache_dir,
+    )
+
+
+def test_loaded_generator_matches_built_generator(tmp_path):
+    """Test that tables read from disk answer exactly like a fresh build."""
+    _generator(tmp_path)
+    hits = tables.cache_info()["hits"]
+    loaded = _generator(tmp_path)
+    assert tables.cache_info()["hits"] == hits + 1
+
+    built = _generator()
+    rng = random.Random(3)
+    for _ in range(500):
+        target = "".join(rng.sample(AMINO_ACIDS_WITH_STOP, rng.randint(1, 21)))
+        assert loaded.get_best_degenerate_codon(
+            target
+        ) == built.get_best_degenerate_codon(target)
+    assert loaded.mask_index == built.mask_index
+    assert loaded.single_aa_codons == built.single_aa_codons
+    assert dict(loaded.codon_masks) == built.codon_masks
+    assert loaded.degenerate_codons == built.degenerate_codons
+    assert dict(loaded.amino_acid_dict) == built.amino_acid_dict
+
+
+def test_tables_are_reused(tmp_path):
+    """Test that a second generator reads the file instead of rewriting it."""
+    _generator(tmp_path)
+    (path,) = tmp_path.iterdir()
+    mtime = path.stat().st_mtime_ns
+    _generator(tmp_path)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_changed_codon_table_gets_new_tables(tmp_path):
+    """Test that different inputs never load each other's tables."""
+    _generator(tmp_path)
+    table = pct.get_codons_table("e_coli_316407")
+    changed = {aa: dict(codons) for aa, codons in table.items()}
+    changed["L"] = dict.fromkeys(changed["L"], 1 / len(changed["L"]))
+    generator = _generator(tmp_path, changed)
+
+    assert len(list(tmp_path.iterdir())) == 2
+    assert generator.single_aa_codons == _generator(None, changed).single_aa_codons
+
+
+def test_vendors_with_reordered_bases_keep_separate_tables(tmp_path):
+    """Test that vendors differing only in base order both stay cached."""
+    assert list(degenerate["IDT"]) != list(degenerate["Eurofins"])
+    _generator(tmp_path, company="IDT")
+    _generator(tmp_path, company="Eurofins")
+    assert len(list(tmp_path.iterdir())) == 2
+
+    hits = tables.cache_info()["hits"]
+    for company in ("IDT", "Eurofins", "IDT", "Eurofins"):
+        generator = _generator(tmp_path, company=company)
+        assert generator.get_best_degenerate_codon("HQ") == "CAK"
+    assert tables.cache_info()["hits"] == hits + 4
+
+
+def test_corrupt_tables_are_rebuilt(tmp_path):
+    """Test that a damaged file is replaced instead of misread."""
+    _generator(tmp_path)
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(path.read_bytes()[:100])
+
+    generator = _generator(tmp_path)
+    assert generator.get_best_degenerate_codon("HQ") == "CAK"
+    assert tables.GeneratorTables.open(path).fingerprint == generator.fingerprint()
+
+
+def test_unwritable_cache_is_ignored(tmp_path):
+    """Test that a cache directory that cannot be created does not fail."""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    generator = _generator(blocker / "cache")
+    assert generator.get_best_degenerate_codon("HQ") == "CAK"
+
+
+def test_registry_persists_tables(tmp_path, monkeypatch):
+    """Test that the registry writes tables to the user cache directory."""
+    monkeypatch.setenv("PHAGETRIX_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("PHAGETRIX_PERSIST", raising=False)
+    api.GeneratorRegistry().get("NEB")
+    api.GeneratorRegistry(persist=False).get("NEB")
+    assert list(tmp_path.iterdir()) == []
+    api.GeneratorRegistry(persist=True).get("NEB")
+    assert [p.name[:10] for p in tmp_path.iterdir()] == ["generator-"]
+
+
+def test_registry_persists_when_asked_by_environment(tmp_path, monkeypatch):
+    """Test that PHAGETRIX_PERSIST opts the default registry in."""
+    monkeypatch.setenv("PHAGETRIX_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("PHAGETRIX_PERSIST", "1")
+    api.GeneratorRegistry().get("Eurofins")
+    assert [p.name[:10] for p in tmp_path.iterdir()] == ["generator-"]
+
+
+def test_registry_skips_unwritable_cache(tmp_path, monkeypatch):
+    """Test that persisting to a directory that cannot be written still works."""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("PHAGETRIX_CACHE_DIR", str(blocker / "cache"))
+    generator = api.GeneratorRegistry(persist=True).get("NEB")
+    assert generator.get_best_degenerate_codon("HQ") == "CAK"